@@ -6,6 +6,7 @@ admin.site.register(Classwork)
 admin.site.register(Resource)
 admin.site.register(Submission)
 admin.site.register(Attachment)
+admin.site.register(AttachmentBlob)
 admin.site.register(ClassworkHasAttachment)
 admin.site.register(ClassworkHasSubmission)
 admin.site.register(ResourceHasAttachment)
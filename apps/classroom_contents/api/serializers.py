@@ -125,10 +125,11 @@ class AttachmentSerializer(serializers.ModelSerializer):
     """"""
 
     attachment = serializers.FileField()
+    plagiarism_status = serializers.CharField(read_only=True)
 
     class Meta:
         model = Attachment
-        fields = ["attachment", "mime_type"]
+        fields = ["attachment", "mime_type", "plagiarism_status"]
 
 
 class ReadAttachmentSerializer(serializers.ModelSerializer):
@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.db.models import Q
 from drf_spectacular.utils import extend_schema
 from rest_framework.response import Response
@@ -447,13 +448,15 @@ class ClassworkSubmissionViewSet(ModelViewSet):
             serializer = self.create_serializer_class(data=self.request.data)
             serializer.is_valid(raise_exception=True)
 
-            created_submission = serializer.save(_created_by=requesting_user)
+            # analysis jobs are queued on commit, once the submission is complete
+            with transaction.atomic():
+                created_submission = serializer.save(_created_by=requesting_user)
 
-            ClassworkHasSubmission.objects.create(
-                submission=created_submission, classwork=classwork_instance
-            )
+                ClassworkHasSubmission.objects.create(
+                    submission=created_submission, classwork=classwork_instance
+                )
 
-            check_and_handle_attachments(self.request, created_submission)
+                check_and_handle_attachments(self.request, created_submission)
 
             # TODO send Email/Notification
 
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0005_alter_attachment_model_dump_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachment",
+            name="plagiarism_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("Q", "QUEUED"),
+                    ("R", "RUNNING"),
+                    ("D", "DONE"),
+                    ("F", "FAILED"),
+                ],
+                max_length=1,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:49
+
+import apps.classroom_contents.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0006_attachment_plagiarism_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttachmentBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_at", models.DateTimeField(auto_now_add=True)),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("sha256", models.CharField(db_index=True, max_length=64)),
+                ("size", models.BigIntegerField()),
+                ("reference_count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="attachment",
+            name="attachment",
+            field=models.FileField(
+                storage=apps.classroom_contents.storage.ContentAddressedStorage(),
+                upload_to="attachments/",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:26
+
+import apps.classroom_contents.storage
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0007_attachmentblob_alter_attachment_attachment"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="attachment",
+            name="attachment",
+            field=apps.classroom_contents.storage.BlobFileField(
+                storage=apps.classroom_contents.storage.ContentAddressedStorage(),
+                upload_to="attachments/",
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from apps.classroom_contents.storage import BlobFileField, attachment_storage
+
 # from apps.classrooms.models import Classroom
 
 #########################
@@ -108,15 +110,40 @@ class Submission(models.Model):
         return f"{self.id}: {self._created_by} -> {self.answer}"
 
 
+class AttachmentBlob(models.Model):
+    """a stored attachment file shared by every attachment with the same contents"""
+
+    _created_at = models.DateTimeField(auto_now_add=True)
+
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    reference_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return self.name
+
+
 class Attachment(models.Model):
     """"""
 
+    class PlagiarismStatusChoices(models.TextChoices):
+        """Plagiarism analysis job states"""
+
+        QUEUED = "Q", "QUEUED"
+        RUNNING = "R", "RUNNING"
+        DONE = "D", "DONE"
+        FAILED = "F", "FAILED"
+
     _created_at = models.DateTimeField(auto_now_add=True)
 
-    attachment = models.FileField(upload_to="attachments/")
+    attachment = BlobFileField(upload_to="attachments/", storage=attachment_storage)
     mime_type = models.CharField(max_length=100, null=True, blank=True)
     tokenized_dump = models.CharField(max_length=1000, null=True, blank=True)
     model_dump = models.CharField(max_length=1000, null=True, blank=True)
+    plagiarism_status = models.CharField(
+        max_length=1, choices=PlagiarismStatusChoices.choices, null=True, blank=True
+    )
 
     def __str__(self) -> str:
         return self.attachment.path
@@ -1,19 +1,16 @@
-from venv import create
-from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from apps.classroom_contents.models import Attachment, SubmissionHasAttachment
-
-from apps.plagiarism_detector.utils import (
-    check_plagiarism,
-    create_model,
-    joblib_dump,
-    open_file,
+from apps.classroom_contents.models import (
+    Attachment,
+    Submission,
+    SubmissionHasAttachment,
 )
+from apps.classroom_contents.storage import release_blob
+from apps.plagiarism_detector.jobs import enqueue_answer_job, enqueue_plagiarism_job
 from configs.definitions import DEBUG
 
-
 # @receiver(post_save, sender=Attachment)
 # def profile_post_save(sender, instance, created, **kwargs):
 #     """
@@ -51,22 +48,73 @@ def profile_post_save(sender, instance, created, **kwargs):
         print("Attachment `post_save` signal received!")
 
     if created:
-        attachment = instance.attachment
-        submission = instance.submission
+        # analysed out of band by `manage.py plagiarism_worker`
+        enqueue_plagiarism_job(instance.attachment, instance.submission)
 
-        attachment_path = attachment.attachment.path
-        content_type = attachment.mime_type
 
-        text = open_file(attachment_path, content_type)
-        tokenized_data, model = create_model(text)
-        dump_tokenized_filepath = joblib_dump(tokenized_data)
-        dump_model_filepath = joblib_dump(model)
+@receiver(pre_save, sender=Attachment)
+def attachment_pre_save(sender, instance, **kwargs):
+    """
+    Reciever function for Attachment model pre save
+    """
 
-        attachment.tokenized_dump = dump_tokenized_filepath
-        attachment.model_dump = dump_model_filepath
-        attachment.save()
+    # stored file, whose blob is released once a new file is saved over it
+    instance._previous_attachment = (
+        Attachment.objects.filter(pk=instance.pk)
+        .values_list("attachment", flat=True)
+        .first()
+        if instance.pk is not None
+        else None
+    )
 
-        check_plagiarism(attachment, submission)
-        
 
-        print("Done")
+@receiver(post_save, sender=Attachment)
+def attachment_post_save(sender, instance, created, **kwargs):
+    """
+    Reciever function for Attachment model post save
+    """
+
+    previous = instance.__dict__.pop("_previous_attachment", None)
+    # also when the new file is the same blob, which took another reference
+    if instance.__dict__.pop("_blob_referenced", False) and previous:
+        release_blob(previous)
+
+
+@receiver(post_delete, sender=Attachment)
+def attachment_post_delete(sender, instance, **kwargs):
+    """
+    Reciever function for Attachment model post delete
+    """
+
+    if instance.attachment.name:
+        release_blob(instance.attachment.name)
+
+
+@receiver(pre_save, sender=Submission)
+def submission_pre_save(sender, instance, **kwargs):
+    """
+    Reciever function for Submission model pre save
+    """
+
+    # grading saves submissions too, only changed answers are analysed again
+    instance._answer_changed = (
+        instance.pk is None
+        or not Submission.objects.filter(
+            pk=instance.pk, answer=instance.answer
+        ).exists()
+    )
+
+
+@receiver(post_save, sender=Submission)
+def submission_post_save(sender, instance, created, **kwargs):
+    """
+    Reciever function for Submission model post save
+    """
+
+    if DEBUG:
+        print("Submission `post_save` signal received!")
+
+    # an emptied answer is analysed to remove its earlier results
+    if getattr(instance, "_answer_changed", False) and (instance.answer or not created):
+        # not before the transaction saving its classwork relation is committed
+        transaction.on_commit(lambda: enqueue_answer_job(instance))
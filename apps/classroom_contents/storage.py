@@ -0,0 +1,148 @@
+"""
+Content-addressed storage of attachment files.
+
+Every uploaded file is stored once under the SHA-256 of its contents, sharded
+as `attachments/ab/cd/<sha256>.<extension>`, so identical files uploaded by many
+users share one blob. Each blob is an `AttachmentBlob` counting the attachments
+referencing it, taken when the file is saved and released when an attachment
+is deleted or its file replaced or deleted. The file goes once the last release
+is committed, so a rolled back deletion still finds it, unless the blob was
+referenced again meanwhile.
+"""
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from django.utils.deconstruct import deconstructible
+
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def get_blob_name(sha256, name, prefix="attachments") -> str:
+    """sharded name of a blob, keeping the extension of the uploaded name"""
+
+    extension = os.path.splitext(name)[1].lower()
+    return f"{prefix}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+
+def get_blob_hash(name):
+    """SHA-256 of the contents of a file stored by name, None for legacy names"""
+
+    sha256 = os.path.splitext(os.path.basename(name))[0]
+    if len(sha256) != 64 or name != get_blob_name(sha256, name):
+        return None
+    return sha256
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files by the hash of their contents, writing each blob once and
+    referencing it on every save
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        file_hash = hashlib.sha256()
+        for chunk in content.chunks(_READ_CHUNK_SIZE):
+            file_hash.update(chunk)
+        content.seek(0)
+
+        sha256 = file_hash.hexdigest()
+        name = get_blob_name(sha256, name)
+
+        AttachmentBlob = apps.get_model("classroom_contents", "AttachmentBlob")
+        with transaction.atomic():
+            # locked, so a concurrent release can't delete the file meanwhile
+            blob, _ = AttachmentBlob.objects.select_for_update().get_or_create(
+                name=name, defaults=dict(sha256=sha256, size=content.size)
+            )
+            if not self.exists(name):
+                name = self._save(name, content)
+
+            AttachmentBlob.objects.filter(id=blob.id).update(
+                reference_count=F("reference_count") + 1
+            )
+
+        return name
+
+    def delete(self, name):
+        """
+        releases a reference to a blob e.g. on `FieldFile.delete()`, deleting
+        files stored before content addressing right away
+        """
+
+        if not release_blob(name):
+            super().delete(name)
+
+    def delete_blob(self, name):
+        """deletes the file of a blob, whatever references it"""
+
+        super().delete(name)
+
+
+def _delete_unreferenced_blob(name):
+    """deletes a released blob, unless it was referenced again meanwhile"""
+
+    AttachmentBlob = apps.get_model("classroom_contents", "AttachmentBlob")
+    with transaction.atomic():
+        blob = (
+            AttachmentBlob.objects.select_for_update()
+            .filter(name=name, reference_count=0)
+            .first()
+        )
+        if blob is None:
+            return
+
+        blob.delete()
+        attachment_storage.delete_blob(name)
+
+
+def release_blob(name) -> bool:
+    """
+    drops a reference to a stored blob, deleting it once the last one is
+    committed. Returns False for names stored before content addressing
+    """
+
+    AttachmentBlob = apps.get_model("classroom_contents", "AttachmentBlob")
+    with transaction.atomic():
+        blob = AttachmentBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:  # stored before content addressing
+            return False
+
+        AttachmentBlob.objects.filter(id=blob.id, reference_count__gt=0).update(
+            reference_count=F("reference_count") - 1
+        )
+        if blob.reference_count <= 1:
+            transaction.on_commit(lambda: _delete_unreferenced_blob(name))
+
+    return True
+
+
+class BlobFieldFile(FieldFile):
+    """
+    file of a content-addressed field, flagging its instance when a new blob
+    reference is taken so the replaced one is released on save
+    """
+
+    def save(self, name, content, save=True):
+        self.instance._blob_referenced = True
+        super().save(name, content, save)
+
+
+class BlobFileField(models.FileField):
+    """file field whose files are blobs of `attachment_storage`"""
+
+    attr_class = BlobFieldFile
+
+
+attachment_storage = ContentAddressedStorage()
@@ -1,3 +1,93 @@
-from django.test import TestCase
+import os
+import tempfile
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+
+from apps.classroom_contents.models import Attachment, AttachmentBlob
+from apps.classroom_contents.storage import attachment_storage, get_blob_hash
+
+
+class AttachmentStorageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        settings = override_settings(MEDIA_ROOT=self.media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.media_root.cleanup)
+
+    def create_attachment(self, name, contents):
+        attachment = Attachment(mime_type="text/plain")
+        attachment.attachment.save(name, ContentFile(contents))
+        return attachment
+
+    def test_identical_files_share_one_blob(self):
+        first = self.create_attachment("essay.txt", b"same contents")
+        second = self.create_attachment("copy.TXT", b"same contents")
+        other = self.create_attachment("essay.txt", b"other contents")
+
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        self.assertNotEqual(first.attachment.name, other.attachment.name)
+
+        sha256 = get_blob_hash(first.attachment.name)
+        self.assertEqual(
+            first.attachment.name,
+            f"attachments/{sha256[:2]}/{sha256[2:4]}/{sha256}.txt",
+        )
+        self.assertEqual(AttachmentBlob.objects.get(sha256=sha256).reference_count, 2)
+
+        path = first.attachment.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(AttachmentBlob.objects.get(sha256=sha256).reference_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(AttachmentBlob.objects.filter(sha256=sha256).exists())
+        self.assertTrue(attachment_storage.exists(other.attachment.name))
+
+    def test_replaced_and_deleted_files_released(self):
+        first = self.create_attachment("essay.txt", b"first draft")
+        shared = self.create_attachment("essay.txt", b"first draft")
+        name, path = first.attachment.name, first.attachment.path
+
+        # still used by the other attachment
+        with self.captureOnCommitCallbacks(execute=True):
+            shared.attachment.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(AttachmentBlob.objects.get(name=name).reference_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.attachment.save("essay.txt", ContentFile(b"second draft"))
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(AttachmentBlob.objects.filter(name=name).exists())
+
+        # the same file saved again takes a reference and releases one
+        with self.captureOnCommitCallbacks(execute=True):
+            first.attachment = ContentFile(b"second draft", name="essay.txt")
+            first.save()
+        blob = AttachmentBlob.objects.get(name=first.attachment.name)
+        self.assertEqual(blob.reference_count, 1)
+        self.assertTrue(attachment_storage.exists(blob.name))
+
+    def test_file_kept_when_deletion_rolled_back(self):
+        attachment = self.create_attachment("essay.txt", b"contents")
+        path = attachment.attachment.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    Attachment.objects.get(id=attachment.id).delete()
+                    raise IntegrityError
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(
+            AttachmentBlob.objects.get(name=attachment.attachment.name).reference_count,
+            1,
+        )
+
+    def test_legacy_names_have_no_hash(self):
+        self.assertIsNone(get_blob_hash("attachments/essay.pdf"))
@@ -195,6 +195,14 @@ class SelfReferenceError(CustomBaseError):
     pass
 
 
+class TimeLimitExceededError(CustomBaseError):
+    """
+    Exception raised when a task takes longer than its time limit
+    """
+
+    pass
+
+
 class UnknownModelFieldsError(CustomBaseError):
     """
     Exception raised when model fields dont exist
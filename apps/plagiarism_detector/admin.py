@@ -1,7 +1,65 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import PlagiarismInfo
+from .heatmap import invalidate_heatmaps
+from .models import (
+    ClassworkBoilerplate,
+    ClassworkHeatmap,
+    CollusionAnalysis,
+    CollusionCluster,
+    ExtractedText,
+    MatchedSpans,
+    PipelineMetrics,
+    PlagiarismInfo,
+    PlagiarismJob,
+    PlagiarismRescan,
+    SubmissionDocument,
+    TextCacheStats,
+)
 
 
-admin.site.register(PlagiarismInfo)
+class PlagiarismInfoAdmin(admin.ModelAdmin):
+    """bulk deletes send no signal, so the heatmaps are invalidated here"""
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_heatmaps([obj.submission_agent_id, obj.submission_target_id])
+
+    def delete_queryset(self, request, queryset):
+        submission_ids = set()
+        for agent, target in queryset.values_list(
+            "submission_agent", "submission_target"
+        ):
+            submission_ids.update([agent, target])
+
+        super().delete_queryset(request, queryset)
+        invalidate_heatmaps(submission_ids)
+
+
+class PipelineMetricsAdmin(admin.ModelAdmin):
+    list_display = (
+        "attachment",
+        "succeeded",
+        "token_count",
+        "file_size",
+        "peak_rss",
+        "candidate_count",
+        "pruned_count",
+        "_modified_date",
+    )
+    list_filter = ("succeeded",)
+    ordering = ("-_modified_date",)
+
+
+admin.site.register(PlagiarismInfo, PlagiarismInfoAdmin)
+admin.site.register(PlagiarismJob)
+admin.site.register(ExtractedText)
+admin.site.register(TextCacheStats)
+admin.site.register(PipelineMetrics, PipelineMetricsAdmin)
+admin.site.register(PlagiarismRescan)
+admin.site.register(ClassworkHeatmap)
+admin.site.register(MatchedSpans)
+admin.site.register(ClassworkBoilerplate)
+admin.site.register(SubmissionDocument)
+admin.site.register(CollusionAnalysis)
+admin.site.register(CollusionCluster)
@@ -0,0 +1,116 @@
+"""
+Plagiarism detection of inline submission answers.
+
+Answers are at most a few thousand characters and a quiz classwork has thousands
+of them, so they skip the language model. Each answer's character shingles are
+MinHashed into the classwork's LSH buckets, candidates whose estimated
+similarity is too low are dropped from their signatures alone, and only the
+rest are compared shingle by shingle. Shingles of the classwork's own title and
+description, quoted by many answers, are ignored.
+"""
+import numpy as np
+from django.db.models import Q
+
+from apps.plagiarism_detector.heatmap import invalidate_heatmaps
+from apps.plagiarism_detector.minhash import (
+    estimate_jaccard,
+    get_candidate_submission_ids,
+    get_character_shingles,
+    get_signature,
+    index_signature,
+)
+from apps.plagiarism_detector.models import PlagiarismInfo, SubmissionSignature
+from apps.plagiarism_detector.scores import upsert_plagiarism_infos
+from apps.plagiarism_detector.utils import PUNCTUATION_PATTERN
+
+ANSWER_MIN_LENGTH = 50  # characters, shorter answers e.g. "yes" or "42" aren't compared
+ANSWER_MIN_JACCARD = 0.2  # estimated similarity below which candidates are skipped
+
+Source = SubmissionSignature.SourceChoices
+
+
+def normalize_answer(answer) -> str:
+    """lowercase words of an answer without punctuation, single spaced"""
+
+    return " ".join(PUNCTUATION_PATTERN.sub("", answer).lower().split())
+
+
+def clear_answer_plagiarism(submission):
+    """removes the signature and scores of a submission's answer"""
+
+    SubmissionSignature.objects.filter(
+        submission=submission, source=Source.ANSWER
+    ).delete()
+    PlagiarismInfo.objects.filter(
+        Q(submission_agent=submission) | Q(submission_target=submission),
+        method=PlagiarismInfo.MethodChoices.ANSWER_SHINGLES,
+    ).delete()
+    invalidate_heatmaps([submission.id])
+
+
+def get_answer_shingles(answer, ignored) -> np.ndarray:
+    """character shingles of an answer without the ignored ones"""
+
+    shingles = get_character_shingles(normalize_answer(answer))
+    return np.setdiff1d(shingles, ignored, assume_unique=True)
+
+
+def analyse_answer(submission):
+    """
+    Indexes a submission's answer and scores it against the answers of its
+    classwork sharing an LSH bucket with it. The score of a pair is the
+    percentage of the target's shingles found in the agent's answer
+    """
+
+    relation = submission.submission_classwork.first()
+    text = normalize_answer(submission.answer)
+
+    if relation is None or len(text) < ANSWER_MIN_LENGTH:
+        clear_answer_plagiarism(submission)
+        return
+
+    classwork = relation.classwork
+    ignored = get_character_shingles(
+        normalize_answer(f"{classwork.title} {classwork.description}")
+    )
+    shingles = get_answer_shingles(submission.answer, ignored)
+    if len(shingles) == 0:  # nothing but the question
+        clear_answer_plagiarism(submission)
+        return
+
+    signature_instance = index_signature(submission, classwork, shingles, Source.ANSWER)
+    signature = get_signature(signature_instance)
+
+    candidates = SubmissionSignature.objects.filter(
+        submission__in=get_candidate_submission_ids(signature_instance),
+        source=Source.ANSWER,
+    ).select_related("submission")
+
+    scores, similar_ids = {}, []
+    for candidate in candidates:
+        # early exit, most candidates of a quiz only share boilerplate
+        if estimate_jaccard(signature, get_signature(candidate)) < ANSWER_MIN_JACCARD:
+            continue
+
+        target_shingles = get_answer_shingles(candidate.submission.answer, ignored)
+        if len(target_shingles) == 0:
+            continue
+
+        shared = len(np.intersect1d(shingles, target_shingles, assume_unique=True))
+
+        scores[submission.id, candidate.submission_id] = (
+            shared / len(target_shingles) * 100
+        )
+        scores[candidate.submission_id, submission.id] = shared / len(shingles) * 100
+        similar_ids.append(candidate.submission_id)
+
+    # pairs no longer similar since the answer changed
+    PlagiarismInfo.objects.filter(
+        method=PlagiarismInfo.MethodChoices.ANSWER_SHINGLES
+    ).filter(
+        (Q(submission_agent=submission) & ~Q(submission_target__in=similar_ids))
+        | (Q(submission_target=submission) & ~Q(submission_agent__in=similar_ids))
+    ).delete()
+    invalidate_heatmaps([submission.id])
+
+    upsert_plagiarism_infos(scores, method=PlagiarismInfo.MethodChoices.ANSWER_SHINGLES)
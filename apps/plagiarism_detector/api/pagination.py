@@ -0,0 +1,44 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+from apps.core.exceptions import UrlParameterError
+
+
+class PlagiarismCursorPagination(CursorPagination):
+    """
+    Pages of plagiarism pairs annotated with their `score`, highest first unless
+    `?ordering=score`. The cursor is a position in that ordering. Paging
+    `SubmissionPairs`, each side of the pairs is read from a range of its own
+    score index, limited to the rows the page can take from it, however deep
+    the page is
+    """
+
+    orderings = {"-score": ("-score", "-id"), "score": ("score", "id")}
+    ordering = orderings["-score"]
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get("ordering", "-score")
+
+        if ordering not in self.orderings:
+            raise UrlParameterError(
+                cause="ordering in URL",
+                status_code=400,
+                message="URL parameter wrong",
+                verbose=f"[ordering] must be one of {', '.join(self.orderings)}!",
+            )
+
+        return self.orderings[ordering]
+
+    def decode_cursor(self, request):
+        try:
+            return super().decode_cursor(request)
+
+        except NotFound:
+            raise UrlParameterError(
+                cause="cursor in URL",
+                status_code=400,
+                message="URL parameter wrong",
+                verbose="[cursor] is invalid!",
+            )
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from apps.plagiarism_detector.models import PlagiarismInfo
+from apps.plagiarism_detector.models import CollusionCluster, PlagiarismInfo
 from apps.classroom_contents.api.serializers import ReadSubmissionSerializer
 
 
@@ -9,7 +9,16 @@ class PlagiarismSerializer(serializers.ModelSerializer):
 
     submission_agent = ReadSubmissionSerializer(read_only=True)
     submission_target = ReadSubmissionSerializer(read_only=True)
+    score = serializers.FloatField(read_only=True)
 
     class Meta:
         model = PlagiarismInfo
         fields = "__all__"
+
+
+class CollusionClusterSerializer(serializers.ModelSerializer):
+    """"""
+
+    class Meta:
+        model = CollusionCluster
+        exclude = ["analysis"]
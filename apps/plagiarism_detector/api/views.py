@@ -1,32 +1,176 @@
-from django.db.models import Q
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.classroom_contents.utils import get_url_id_classwork_or_raise
+from apps.classrooms.utils import get_url_id_classroom_or_raise
 from apps.core.decorators import try_except_http_error_decorator
 from apps.core.permissions import IsAuthenticatedCustom
-from apps.plagiarism_detector.api.serializer import PlagiarismSerializer
-from apps.plagiarism_detector.models import PlagiarismInfo
+from apps.plagiarism_detector.api.pagination import PlagiarismCursorPagination
+from apps.plagiarism_detector.api.serializer import (
+    CollusionClusterSerializer,
+    PlagiarismSerializer,
+)
+from apps.plagiarism_detector.clusters import (
+    get_classroom_clusters,
+    get_classwork_clusters,
+)
+from apps.plagiarism_detector.heatmap import get_classwork_heatmap
+from apps.plagiarism_detector.metrics import get_stage_percentiles
+from apps.plagiarism_detector.models import PLAGIARISM_SCORE, PlagiarismInfo
+from apps.plagiarism_detector.scores import SubmissionPairs
+from apps.plagiarism_detector.spans import get_plagiarism_spans
+from apps.plagiarism_detector.text_cache import get_cache_stats
+from apps.plagiarism_detector.utils import (
+    get_query_min_score_or_raise,
+    get_url_id_plagiarism_or_raise,
+)
 
 
 class PlagiarismListView(APIView):
     """ """
 
     serializer_class = PlagiarismSerializer
+    pagination_class = PlagiarismCursorPagination
     permission_classes = [IsAuthenticatedCustom]
 
     @try_except_http_error_decorator
     def get(self, request, *args, **kwargs):
-        """ """
+        """
+        pairs of a submission by score, a page at a time. Query parameters:
+        min_score, ordering (score or -score), page_size and cursor
+        """
 
         url_submissionId = kwargs.get("submission_id", None)
+        min_score = get_query_min_score_or_raise(request.query_params.get("min_score"))
+
+        plagiarism_list = SubmissionPairs(
+            url_submissionId,
+            PlagiarismInfo.objects.annotate(score=PLAGIARISM_SCORE).select_related(
+                "submission_agent___created_by", "submission_target___created_by"
+            ),
+        )
+        if min_score is not None:
+            plagiarism_list = plagiarism_list.filter(score__gte=min_score)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(plagiarism_list, request, view=self)
+        serializer = self.serializer_class(page, many=True)
+
+        return Response(
+            dict(
+                plagiarism=serializer.data,
+                next=paginator.get_next_link(),
+                previous=paginator.get_previous_link(),
+            ),
+            status=status.HTTP_200_OK,
+        )
+
+
+class PlagiarismSpansView(APIView):
+    """Passages of the target found in the agent of a plagiarism pair, to highlight"""
+
+    permission_classes = [IsAuthenticatedCustom]
 
-        if url_submissionId:
-            plagiarism_list = PlagiarismInfo.objects.filter(
-                Q(submission_agent=url_submissionId)
-                | Q(submission_target=url_submissionId)
+    @try_except_http_error_decorator
+    def get(self, request, *args, **kwargs):
+        """ """
+
+        plagiarism_info = get_url_id_plagiarism_or_raise(kwargs.get("plagiarism_id"))
+        spans = get_plagiarism_spans(plagiarism_info)
+
+        # an attachment is being analysed, retry later
+        if spans is None:
+            return Response(
+                dict(plagiarism=plagiarism_info.id, spans=None, pending=True),
+                status=status.HTTP_202_ACCEPTED,
             )
 
-            serializer = self.serializer_class(plagiarism_list, many=True)
+        return Response(
+            dict(plagiarism=plagiarism_info.id, spans=spans, pending=False),
+            status=status.HTTP_200_OK,
+        )
+
+
+class PlagiarismHeatmapView(APIView):
+    """
+    Similarity matrix of all submissions of a classwork per detection method,
+    served from cache until one of its scores changes
+    """
+
+    permission_classes = [IsAuthenticatedCustom]
+
+    @try_except_http_error_decorator
+    def get(self, request, *args, **kwargs):
+        """ """
+
+        classwork = get_url_id_classwork_or_raise(kwargs.get("classwork_id"))
+
+        return Response(
+            dict(heatmap=get_classwork_heatmap(classwork)), status=status.HTTP_200_OK
+        )
+
+
+class PlagiarismClassworkClustersView(APIView):
+    """
+    Groups of submissions of a classwork sharing work, linked by scores of at
+    least PLAGIARISM_CLUSTER_THRESHOLD percent
+    """
+
+    serializer_class = CollusionClusterSerializer
+    permission_classes = [IsAuthenticatedCustom]
+
+    @try_except_http_error_decorator
+    def get(self, request, *args, **kwargs):
+        """ """
+
+        classwork = get_url_id_classwork_or_raise(kwargs.get("classwork_id"))
+        serializer = self.serializer_class(get_classwork_clusters(classwork), many=True)
+
+        return Response(dict(clusters=serializer.data), status=status.HTTP_200_OK)
+
+
+class PlagiarismClassroomClustersView(APIView):
+    """
+    Groups of submissions of all classworks of a classroom sharing work, linked by
+    scores of at least PLAGIARISM_CLUSTER_THRESHOLD percent
+    """
+
+    serializer_class = CollusionClusterSerializer
+    permission_classes = [IsAuthenticatedCustom]
+
+    @try_except_http_error_decorator
+    def get(self, request, *args, **kwargs):
+        """ """
+
+        classroom = get_url_id_classroom_or_raise(kwargs.get("classroom_id"))
+        serializer = self.serializer_class(get_classroom_clusters(classroom), many=True)
+
+        return Response(dict(clusters=serializer.data), status=status.HTTP_200_OK)
+
+
+class PlagiarismTextCacheView(APIView):
+    """Extracted text cache size and hit rate, for monitoring"""
+
+    permission_classes = [IsAuthenticatedCustom, IsAdminUser]
+
+    @try_except_http_error_decorator
+    def get(self, request, *args, **kwargs):
+        """ """
+
+        return Response(dict(text_cache=get_cache_stats()), status=status.HTTP_200_OK)
+
+
+class PlagiarismPipelineMetricsView(APIView):
+    """p50/p95 time of every pipeline stage over recent attachments, for monitoring"""
+
+    permission_classes = [IsAuthenticatedCustom, IsAdminUser]
+
+    @try_except_http_error_decorator
+    def get(self, request, *args, **kwargs):
+        """ """
 
-        return Response(dict(plagiarism=serializer.data), status=status.HTTP_200_OK)
+        return Response(
+            dict(pipeline_metrics=get_stage_percentiles()), status=status.HTTP_200_OK
+        )
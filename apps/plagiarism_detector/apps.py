@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PlagiarismDetectorConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.plagiarism_detector"
+
+    def ready(self):
+        import apps.plagiarism_detector.signals
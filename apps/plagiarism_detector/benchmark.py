@@ -0,0 +1,308 @@
+"""
+Benchmarks of the plagiarism pipeline stages on synthetic corpora.
+
+Documents are random walks over the word bigrams of `notebook/Original.txt`,
+every document sharing a contiguous passage of a common source document. Size
+and overlap are controlled, and a fixed seed gives the same corpus on every
+commit so results can be compared. Run through `manage.py plagiarism_benchmark`.
+
+Every stage runs in a transaction rolled back once it is measured, so the
+submissions and scores it writes never outlive the benchmark.
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from apps.classroom_contents.models import (
+    Attachment,
+    Classwork,
+    ClassworkHasSubmission,
+    Submission,
+    SubmissionHasAttachment,
+)
+from apps.plagiarism_detector.models import PlagiarismInfo, SubmissionSignature
+from apps.plagiarism_detector.utils import (
+    Ngram_N,
+    calculate_scores,
+    check_plagiarism,
+    clean_html,
+    clean_text,
+    create_model,
+    joblib_dump,
+    ngram_model_dump,
+    open_file,
+    score_per_token,
+)
+from apps.users.models import CustomUser
+
+SEED_TEXT_PATH = os.path.join(os.path.dirname(__file__), "notebook", "Original.txt")
+
+STAGES = [
+    "open_file",
+    "clean_text",
+    "create_model",
+    "calculate_scores",
+    "calculate_scores_per_token",
+    "check_plagiarism",
+]
+
+_WORDS_PER_LINE = 15
+
+
+class SyntheticCorpus:
+    """seeded generator of documents resembling the seed text"""
+
+    def __init__(self, seed=0, seed_text_path=SEED_TEXT_PATH):
+        with open(seed_text_path, encoding="utf-8") as f:
+            self.words = f.read().split()
+
+        self.successors = defaultdict(list)
+        for word, successor in zip(self.words, self.words[1:]):
+            self.successors[word].append(successor)
+
+        self.rng = random.Random(seed)
+
+    def walk(self, length):
+        """`length` words following the bigrams of the seed text"""
+
+        word = self.rng.choice(self.words)
+        words = []
+        for _ in range(length):
+            words.append(word)
+            word = self.rng.choice(self.successors.get(word) or self.words)
+
+        return words
+
+    def documents(self, count, length, overlap):
+        """
+        `count` documents of `length` words, each containing a passage of
+        `overlap * length` words copied from one common source document
+        """
+
+        source = self.walk(length)
+        copied = int(length * overlap)
+
+        documents = []
+        for _ in range(count):
+            words = self.walk(length - copied)
+            start = self.rng.randint(0, length - copied)
+            position = self.rng.randint(0, len(words))
+            words[position:position] = source[start : start + copied]
+
+            lines = [
+                " ".join(words[i : i + _WORDS_PER_LINE])
+                for i in range(0, len(words), _WORDS_PER_LINE)
+            ]
+            documents.append("\n".join(lines))
+
+        return documents
+
+
+def measure(func, repeat=1):
+    """
+    Best wall time of `repeat` calls of func and the peak memory traced by
+    tracemalloc during one more call, timed calls running untraced
+
+    Returns
+    ---
+    (seconds, peak bytes)
+    """
+
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak
+
+
+class PipelineBenchmark:
+    """runs the pipeline stages over a list of raw documents"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.tokenized = []
+        self.models = []
+        self._cleanup = None
+        self._check = None
+
+    def open_file(self):
+        directory = tempfile.mkdtemp()
+        self._cleanup = lambda: shutil.rmtree(directory, ignore_errors=True)
+
+        paths = []
+        for i, document in enumerate(self.documents):
+            path = os.path.join(directory, f"document{i}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(document)
+            paths.append(path)
+
+        return lambda: [open_file(path, "text/plain") for path in paths]
+
+    def clean_text(self):
+        return lambda: [clean_html(clean_text(document)) for document in self.documents]
+
+    def create_model(self):
+        def run():
+            self.tokenized, self.models = [], []
+            for document in self.documents:
+                tokenized_data, model = create_model(document)
+                self.tokenized.append(tokenized_data)
+                self.models.append(model)
+
+        return run
+
+    def calculate_scores(self):
+        pairs = self._score_pairs()
+        return lambda: [calculate_scores(tokens, model) for tokens, model in pairs]
+
+    def calculate_scores_per_token(self):
+        """
+        the loop calculate_scores replaced, one lookup per token, checked to
+        score every token exactly as the batch scoring does
+        """
+
+        pairs = self._score_pairs()
+        scores = []
+
+        def run():
+            scores[:] = [score_per_token(tokens, model) for tokens, model in pairs]
+
+        def check():
+            batch = [model.score_sequence(tokens, Ngram_N) for tokens, model in pairs]
+            return dict(identical=all(map(np.array_equal, scores, batch)))
+
+        self._check = check
+        return run
+
+    def _score_pairs(self):
+        self._ensure_models()
+
+        # every document scored by the model of the next one
+        return list(zip(self.tokenized, self.models[1:] + self.models[:1]))
+
+    def check_plagiarism(self):
+        """
+        the incremental check of every submission of one classwork, in order of
+        submission, every run starting from an empty index
+        """
+
+        self._ensure_models()
+        dumps = [
+            (joblib_dump(tokens), ngram_model_dump(model))
+            for tokens, model in zip(self.tokenized, self.models)
+        ]
+        relations = self._create_submissions(dumps)
+        submissions = [submission for _, submission in relations]
+
+        def run():
+            SubmissionSignature.objects.filter(submission__in=submissions).delete()
+            PlagiarismInfo.objects.filter(submission_agent__in=submissions).delete()
+
+            for _, submission in relations:
+                check_plagiarism(submission)
+
+        def cleanup():
+            # rows are rolled back, files aren't
+            for tokenized_dump, model_dump in dumps:
+                os.remove(tokenized_dump)
+                shutil.rmtree(model_dump, ignore_errors=True)
+
+        self._cleanup = cleanup
+        return run
+
+    def _ensure_models(self):
+        if not self.models:
+            self.create_model()()
+
+    def _create_submissions(self, dumps):
+        """
+        a classwork with a submission per dump. Relations are bulk created so
+        no plagiarism jobs are queued for them
+        """
+
+        suffix = random.getrandbits(32)
+        user = CustomUser.objects.create(
+            email=f"benchmark{suffix}@benchmark.local",
+            username=f"benchmark{suffix}",
+            password="benchmark",
+        )
+        classwork = Classwork.objects.create(
+            _created_by=user, title="benchmark", description="benchmark"
+        )
+
+        relations = []
+        for i, (tokenized_dump, model_dump) in enumerate(dumps):
+            submission = Submission.objects.create(
+                _created_by=user, answer="", remarks=""
+            )
+            attachment = Attachment.objects.create(
+                attachment=f"attachments/benchmark{i}.txt",
+                tokenized_dump=tokenized_dump,
+                model_dump=model_dump,
+            )
+            relations.append((attachment, submission))
+
+        ClassworkHasSubmission.objects.bulk_create(
+            [
+                ClassworkHasSubmission(classwork=classwork, submission=submission)
+                for _, submission in relations
+            ]
+        )
+        SubmissionHasAttachment.objects.bulk_create(
+            [
+                SubmissionHasAttachment(submission=submission, attachment=attachment)
+                for attachment, submission in relations
+            ]
+        )
+
+        return relations
+
+    def run(self, stages=STAGES, repeat=1):
+        """
+        Returns
+        ---
+        {stage: dict(seconds, peak_memory, documents_per_second, error)}
+        """
+
+        results = {}
+        for stage in stages:
+            self._cleanup, self._check = None, None
+            try:
+                with transaction.atomic():
+                    try:
+                        seconds, peak = measure(getattr(self, stage)(), repeat)
+                        checks = self._check() if self._check is not None else {}
+                    finally:
+                        transaction.set_rollback(True)
+            except Exception as e:
+                # e.g. pandoc not installed for open_file
+                results[stage] = dict(error=f"{type(e).__name__}: {e}")
+                continue
+            finally:
+                if self._cleanup is not None:
+                    self._cleanup()
+
+            results[stage] = dict(
+                seconds=seconds,
+                peak_memory=peak,
+                documents_per_second=len(self.documents) / seconds if seconds else None,
+                **checks,
+            )
+
+        return results
@@ -0,0 +1,119 @@
+"""
+Per classwork ignore set of template passages.
+
+Submissions of a classwork share its question text and the files handed out
+with it (`ClassworkHasAttachment`), which would otherwise be found as copied by
+every pair. Every k-gram of the classwork's title, description and attachments,
+hashed like winnowing k-grams, forms its ignore set, built on first use and
+stored as a `ClassworkBoilerplate` until the template changes.
+
+Tokens covered by an ignored k-gram are dropped before candidate lookup and
+scoring, leaving padding in their place so no n-gram is scored across the gap,
+and ignored fingerprints are neither indexed nor searched. Dumps keep the full
+text, as they may be shared by attachments of other classworks.
+"""
+import numpy as np
+from django.db import IntegrityError
+
+from apps.plagiarism_detector.hashing import PAD_SYMBOL, hash_ngrams, hash_tokens
+from apps.plagiarism_detector.models import ClassworkBoilerplate
+from apps.plagiarism_detector.source_code import CODE_WINNOW_K
+from apps.plagiarism_detector.winnowing import WINNOW_K
+
+BOILERPLATE_K = WINNOW_K  # words per ignored k-gram of prose
+BOILERPLATE_CODE_K = CODE_WINNOW_K  # normalized tokens per ignored k-gram of code
+
+
+def get_kgrams(tokenized_data, k) -> np.ndarray:
+    """ids of every k-gram of a tokenized document, padding excluded"""
+
+    tokens = [token for token in tokenized_data if token != PAD_SYMBOL]
+    return hash_ngrams(hash_tokens(tokens), k)
+
+
+def store_boilerplate(classwork, documents, code_documents) -> np.ndarray:
+    """
+    stores the ignore set of a classwork's tokenized template documents, prose
+    and source code, returning it
+    """
+
+    kgrams = np.unique(
+        np.concatenate(
+            [get_kgrams(tokens, BOILERPLATE_K) for tokens in documents]
+            + [get_kgrams(tokens, BOILERPLATE_CODE_K) for tokens in code_documents]
+            + [np.empty(0, dtype=np.uint64)]
+        )
+    )
+
+    try:
+        ClassworkBoilerplate.objects.create(
+            classwork=classwork, kgrams=kgrams.tobytes()
+        )
+    except IntegrityError:  # stored meanwhile by another worker
+        pass
+
+    return kgrams
+
+
+def load_boilerplate(classwork):
+    """stored ignore set of a classwork, None if it isn't built"""
+
+    kgrams = (
+        ClassworkBoilerplate.objects.filter(classwork=classwork)
+        .values_list("kgrams", flat=True)
+        .first()
+    )
+    if kgrams is None:
+        return None
+
+    return np.frombuffer(kgrams, dtype=np.uint64)
+
+
+def invalidate_boilerplate(classwork_id):
+    """deletes the ignore set of a classwork, rebuilt on next use"""
+
+    ClassworkBoilerplate.objects.filter(classwork=classwork_id).delete()
+
+
+def get_boilerplate_mask(tokenized_data, boilerplate, k=BOILERPLATE_K) -> np.ndarray:
+    """which tokens an ignored k-gram covers, padding never"""
+
+    ignored = np.zeros(len(tokenized_data), dtype=bool)
+    if boilerplate is None or len(boilerplate) == 0:
+        return ignored
+
+    # merged documents are padded before every part, k-grams skip the padding
+    positions = np.array(
+        [i for i, token in enumerate(tokenized_data) if token != PAD_SYMBOL],
+        dtype=np.int64,
+    )
+    matched = np.flatnonzero(np.isin(get_kgrams(tokenized_data, k), boilerplate))
+    if len(matched) == 0:
+        return ignored
+
+    # +1 where an ignored k-gram starts, -1 past its end
+    coverage = np.zeros(len(positions) + 1, dtype=np.int64)
+    np.add.at(coverage, matched, 1)
+    np.add.at(coverage, matched + k, -1)
+
+    ignored[positions[np.cumsum(coverage[:-1]) > 0]] = True
+    return ignored
+
+
+def strip_boilerplate(tokenized_data, boilerplate, k=BOILERPLATE_K) -> list:
+    """
+    tokens not covered by any ignored k-gram, padding kept. Every stripped span
+    is replaced by a padding symbol, the passages around it are scored apart
+    """
+
+    ignored = get_boilerplate_mask(tokenized_data, boilerplate, k)
+    if not ignored.any():
+        return tokenized_data
+
+    # a padding symbol where each stripped span starts
+    starts = ignored & ~np.concatenate(([False], ignored[:-1]))
+    return [
+        PAD_SYMBOL if start else token
+        for token, skip, start in zip(tokenized_data, ignored, starts)
+        if start or not skip
+    ]
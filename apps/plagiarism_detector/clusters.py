@@ -0,0 +1,214 @@
+"""
+Collusion clusters, groups of submissions sharing work.
+
+The scores of a classwork or classroom are thresholded into a similarity graph,
+two submissions being linked when any method scored either of them against the
+other at least PLAGIARISM_CLUSTER_THRESHOLD percent. Its connected components
+are found with a union-find pass over the links and stored as
+`CollusionCluster`s, along with how densely their members are linked, so they
+are served with one indexed query.
+
+Clusters are recomputed on request once any score between the submissions of
+the scope changed, tracked with the versions of the classwork heatmaps (see
+heatmap.py), which every score write bumps.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.classroom_contents.models import Classwork, ClassworkHasSubmission
+from apps.plagiarism_detector.models import (
+    ClassworkHeatmap,
+    CollusionAnalysis,
+    CollusionCluster,
+    PlagiarismInfo,
+)
+from configs.definitions import PLAGIARISM_CLUSTER_THRESHOLD
+
+
+class UnionFind:
+    """disjoint sets of hashable items, with path halving and union by size"""
+
+    def __init__(self):
+        self.parents = {}
+        self.sizes = {}
+
+    def find(self, item):
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+            return item
+
+        while self.parents[item] != item:
+            self.parents[item] = self.parents[self.parents[item]]
+            item = self.parents[item]
+        return item
+
+    def union(self, item, other):
+        root, other_root = self.find(item), self.find(other)
+        if root == other_root:
+            return
+
+        if self.sizes[root] < self.sizes[other_root]:
+            root, other_root = other_root, root
+        self.parents[other_root] = root
+        self.sizes[root] += self.sizes[other_root]
+
+    def groups(self) -> list:
+        """every set of more than one item"""
+
+        groups = {}
+        for item in self.parents:
+            groups.setdefault(self.find(item), []).append(item)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def find_clusters(links) -> list:
+    """
+    Connected components of a similarity graph
+
+    links: {(submission id, submission id): percentage}
+
+    Returns
+    ---
+    list of dict(submissions, size, edge_count, density, max_percentage,
+    mean_percentage), largest first
+    """
+
+    union_find = UnionFind()
+    for first, second in links:
+        union_find.union(first, second)
+
+    edges = {}
+    for (first, second), percentage in links.items():
+        edges.setdefault(union_find.find(first), []).append(percentage)
+
+    clusters = []
+    for members in union_find.groups():
+        percentages = edges[union_find.find(members[0])]
+        pair_count = len(members) * (len(members) - 1) // 2
+
+        clusters.append(
+            dict(
+                submissions=members,
+                size=len(members),
+                edge_count=len(percentages),
+                density=len(percentages) / pair_count,
+                max_percentage=max(percentages),
+                mean_percentage=sum(percentages) / len(percentages),
+            )
+        )
+
+    return sorted(
+        clusters, key=lambda cluster: (-cluster["size"], cluster["submissions"])
+    )
+
+
+def get_links(submission_ids, threshold) -> dict:
+    """
+    pairs of given submissions scored at least `threshold` percent by any method,
+    in either direction, with their highest score
+    """
+
+    scores = PlagiarismInfo.objects.filter(
+        Q(percentage_plagiarized__gte=threshold)
+        | Q(percentage_plagiarized_reverse__gte=threshold),
+        submission_agent__in=submission_ids,
+        submission_target__in=submission_ids,
+    ).values_list(
+        "submission_agent",
+        "submission_target",
+        "percentage_plagiarized",
+        "percentage_plagiarized_reverse",
+    )
+
+    links = {}
+    for agent, target, percentage, reverse in scores:
+        percentage = max(p for p in [percentage, reverse] if p is not None)
+        links[agent, target] = max(links.get((agent, target), 0), percentage)
+
+    return links
+
+
+def _get_versions(classwork_ids, threshold) -> str:
+    # classworks without a heatmap yet get one, so that score writes bump it
+    ClassworkHeatmap.objects.bulk_create(
+        [ClassworkHeatmap(classwork_id=classwork_id) for classwork_id in classwork_ids],
+        ignore_conflicts=True,
+    )
+    versions = ClassworkHeatmap.objects.filter(classwork__in=classwork_ids).values_list(
+        "classwork", "version"
+    )
+
+    key = f"{threshold};" + ";".join(f"{c}:{v}" for c, v in sorted(versions))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def analyse_clusters(scope, classwork_ids, threshold=PLAGIARISM_CLUSTER_THRESHOLD):
+    """
+    (re)computes and stores the clusters of the submissions of given classworks
+    under `scope`, unless they are up to date. Returns the CollusionAnalysis
+    """
+
+    # read before the scores, so a score written meanwhile means a recompute
+    versions = _get_versions(classwork_ids, threshold)
+
+    analysis = CollusionAnalysis.objects.filter(scope=scope).first()
+    if analysis is not None and analysis.versions == versions:
+        return analysis
+
+    relations = (
+        ClassworkHasSubmission.objects.filter(classwork__in=classwork_ids)
+        .select_related("submission___created_by")
+        .order_by("submission_id")
+    )
+    submissions = {
+        relation.submission_id: relation.submission for relation in relations
+    }
+    clusters = find_clusters(get_links(list(submissions), threshold))
+
+    for cluster in clusters:
+        cluster["submissions"] = [
+            dict(
+                id=submission_id,
+                submitter=dict(
+                    id=submissions[submission_id]._created_by_id,
+                    username=submissions[submission_id]._created_by.username,
+                ),
+            )
+            for submission_id in cluster["submissions"]
+        ]
+
+    with transaction.atomic():
+        analysis, _ = CollusionAnalysis.objects.update_or_create(
+            scope=scope, defaults=dict(threshold=threshold, versions=versions)
+        )
+        analysis.analysis_cluster.all().delete()
+        CollusionCluster.objects.bulk_create(
+            [CollusionCluster(analysis=analysis, **cluster) for cluster in clusters]
+        )
+
+    return analysis
+
+
+def get_classwork_clusters(classwork):
+    """up to date clusters of the submissions of a classwork, largest first"""
+
+    analysis = analyse_clusters(f"classwork={classwork.id}", [classwork.id])
+    return CollusionCluster.objects.filter(analysis=analysis).order_by("id")
+
+
+def get_classroom_clusters(classroom):
+    """
+    up to date clusters of the submissions of every classwork of a classroom,
+    also linked across classworks, largest first
+    """
+
+    classwork_ids = list(
+        Classwork.objects.filter(classwork_classroom__classroom=classroom).values_list(
+            "id", flat=True
+        )
+    )
+    analysis = analyse_clusters(f"classroom={classroom.id}", classwork_ids)
+    return CollusionCluster.objects.filter(analysis=analysis).order_by("id")
@@ -0,0 +1,196 @@
+"""
+Garbage collection of the tokenized and model dumps in media/trained_models,
+run by `manage.py plagiarism_gc`.
+
+Dumps no attachment or submission document references any more, e.g. of
+re-analysed or deleted attachments, are deleted a batch at a time. When the remaining dumps take more
+than PLAGIARISM_DUMP_BUDGET bytes, the least recently used ones are evicted as
+well and rebuilt from the attachment's text the next time they are needed
+(`get_attachment_dumps`). Loading a dump touches it, so its modification time
+is its last use. Dumps newer than PLAGIARISM_DUMP_GRACE_PERIOD are left alone,
+they may belong to an analysis still running.
+"""
+import os
+import shutil
+import time
+
+from django.db.models import Q
+
+from apps.classroom_contents.models import Attachment
+from apps.plagiarism_detector.models import SubmissionDocument
+from apps.plagiarism_detector.utils import DUMPS_DIR, get_dump_size
+from configs.definitions import PLAGIARISM_DUMP_BUDGET, PLAGIARISM_DUMP_GRACE_PERIOD
+
+DUMP_BATCH_SIZE = 500
+
+
+def get_dump_entries() -> list:
+    """(path, size, last use) of every dump, least recently used first"""
+
+    if not os.path.isdir(DUMPS_DIR):
+        return []
+
+    entries = []
+    with os.scandir(DUMPS_DIR) as scan:
+        for entry in scan:
+            try:
+                entries.append(
+                    (
+                        DUMPS_DIR + entry.name,
+                        get_dump_size(entry.path),
+                        entry.stat().st_mtime,
+                    )
+                )
+            except FileNotFoundError:  # deleted meanwhile
+                continue
+
+    return sorted(entries, key=lambda entry: entry[2])
+
+
+def delete_dump(path):
+    """deletes a dump file or (compact model) directory"""
+
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _referencing(paths, model=Attachment):
+    return model.objects.filter(Q(tokenized_dump__in=paths) | Q(model_dump__in=paths))
+
+
+def _referenced_dumps(paths) -> list:
+    """(tokenized dump, model dump) of every attachment and document using paths"""
+
+    return [
+        dumps
+        for model in [Attachment, SubmissionDocument]
+        for dumps in _referencing(paths, model).values_list(
+            "tokenized_dump", "model_dump"
+        )
+    ]
+
+
+def collect_orphaned_dumps(entries, dry_run=False):
+    """
+    deletes the dumps of given entries no attachment or document references,
+    returning them
+    """
+
+    orphaned = []
+
+    for start in range(0, len(entries), DUMP_BATCH_SIZE):
+        batch = entries[start : start + DUMP_BATCH_SIZE]
+
+        referenced = set()
+        for dumps in _referenced_dumps([path for path, _, _ in batch]):
+            referenced.update(dumps)
+
+        for entry in batch:
+            if entry[0] in referenced:
+                continue
+            if not dry_run:
+                delete_dump(entry[0])
+            orphaned.append(entry)
+
+    return orphaned
+
+
+def evict_dumps(entries, budget, dry_run=False):
+    """
+    evicts the dumps of the least recently used attachments and submission
+    documents until given entries fit the budget. Both dumps of an attachment go
+    together, along with every attachment or document sharing them
+
+    Returns
+    ---
+    (number of dumps, bytes) evicted
+    """
+
+    sizes = {path: dump_size for path, dump_size, _ in entries}
+    total = sum(sizes.values())
+    evicted = set()
+
+    for start in range(0, len(entries), DUMP_BATCH_SIZE):
+        if total <= budget:
+            break
+
+        batch = [path for path, _, _ in entries[start : start + DUMP_BATCH_SIZE]]
+        order = {path: i for i, path in enumerate(batch)}
+        attachments = sorted(
+            _referenced_dumps(batch),
+            key=lambda dumps: min(order.get(path, len(batch)) for path in dumps),
+        )
+
+        paths = set()
+        for dumps in attachments:
+            if total <= budget:
+                break
+
+            dumps = set(dumps) - {None}
+            if not dumps <= sizes.keys():  # the other dump was used recently
+                continue
+
+            for path in dumps - paths - evicted:
+                paths.add(path)
+                total -= sizes[path]
+
+        if not paths:
+            continue
+
+        if not dry_run:
+            # rebuilt lazily, so shown as analysed
+            _referencing(paths).update(
+                tokenized_dump=None,
+                model_dump=None,
+                plagiarism_status=Attachment.PlagiarismStatusChoices.DONE,
+            )
+            _referencing(paths, SubmissionDocument).delete()
+            for path in paths:
+                delete_dump(path)
+
+        evicted |= paths
+
+    return len(evicted), sum(sizes[path] for path in evicted)
+
+
+def collect_dumps(
+    budget=PLAGIARISM_DUMP_BUDGET,
+    grace_period=PLAGIARISM_DUMP_GRACE_PERIOD,
+    dry_run=False,
+) -> dict:
+    """
+    deletes orphaned dumps, then evicts the least recently used ones over budget
+
+    Returns
+    ---
+    dict(orphaned, orphaned_size, evicted, evicted_size, size)
+    """
+
+    cutoff = time.time() - grace_period
+    entries = get_dump_entries()
+    old_entries = [entry for entry in entries if entry[2] < cutoff]
+
+    orphaned = collect_orphaned_dumps(old_entries, dry_run)
+    orphaned_paths = {path for path, _, _ in orphaned}
+    orphaned_size = sum(size for _, size, _ in orphaned)
+
+    # recent dumps count towards the budget but are never evicted
+    recent_size = sum(size for _, size, last_use in entries if last_use >= cutoff)
+    evicted, evicted_size = evict_dumps(
+        [entry for entry in old_entries if entry[0] not in orphaned_paths],
+        max(budget - recent_size, 0),
+        dry_run,
+    )
+
+    return dict(
+        orphaned=len(orphaned),
+        orphaned_size=orphaned_size,
+        evicted=evicted,
+        evicted_size=evicted_size,
+        size=sum(size for _, size, _ in entries) - orphaned_size - evicted_size,
+    )
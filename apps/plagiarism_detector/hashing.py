@@ -0,0 +1,52 @@
+"""
+Stable hashing of tokens and n-grams.
+
+Python's builtin `hash` is salted per process, so tokens are hashed with blake2b
+to keep ids comparable between workers, dumps and database rows.
+"""
+import hashlib
+
+import numpy as np
+
+PAD_SYMBOL = "<s>"
+
+NGRAM_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def hash_token(token: str) -> int:
+    """64 bit stable hash of a token"""
+
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def hash_tokens(tokens) -> np.ndarray:
+    """hashes a token sequence into an uint64 array, hashing each distinct token once"""
+
+    cache = {}
+    hashes = np.empty(len(tokens), dtype=np.uint64)
+
+    for i, token in enumerate(tokens):
+        token_hash = cache.get(token)
+        if token_hash is None:
+            token_hash = cache[token] = hash_token(token)
+        hashes[i] = token_hash
+
+    return hashes
+
+
+def hash_ngrams(token_hashes: np.ndarray, n: int) -> np.ndarray:
+    """
+    ids of every n-gram window of given token hashes, in order of occurrence.
+    Combined polynomially, wrapping around at 2**64
+    """
+
+    count = len(token_hashes) - n + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+
+    ids = token_hashes[:count].copy()
+    for offset in range(1, n):
+        ids = ids * NGRAM_MULTIPLIER + token_hashes[offset : offset + count]
+
+    return ids
@@ -0,0 +1,108 @@
+"""
+Classwork wide similarity heatmaps.
+
+The matrix of every scored submission pair of a classwork is computed once and
+stored as its `ClassworkHeatmap`. Writes to `PlagiarismInfo` invalidate the
+heatmaps of the classworks of the submissions involved, through signals for
+saved and deleted rows and `invalidate_heatmaps` for bulk writes, which send
+none. Submissions joining or leaving a classwork, e.g. deleted, invalidate its
+heatmap as well.
+
+An invalidation bumps the version, so a heatmap computed from data older than
+the invalidation is never stored.
+"""
+from django.db.models import F
+
+from apps.classroom_contents.models import ClassworkHasSubmission
+from apps.plagiarism_detector.models import ClassworkHeatmap, PlagiarismInfo
+
+
+def invalidate_heatmaps(submission_ids):
+    """clears the cached heatmaps of the classworks of given submissions"""
+
+    submission_ids = set(submission_ids)
+    if not submission_ids:
+        return
+
+    ClassworkHeatmap.objects.filter(
+        classwork__classwork_submission__submission__in=submission_ids
+    ).update(data=None, version=F("version") + 1)
+
+
+def invalidate_classwork_heatmaps(classwork_ids):
+    """clears the cached heatmaps of given classworks"""
+
+    ClassworkHeatmap.objects.filter(classwork__in=classwork_ids).update(
+        data=None, version=F("version") + 1
+    )
+
+
+def compute_heatmap(classwork) -> dict:
+    """
+    Returns
+    ---
+    dict(
+        classwork,
+        submissions=[dict(id, submitter=dict(id, username))],
+        methods={method: matrix}
+    )
+    where matrix[i][j] is the percentage of submission j found in submission i
+    by the method, None for pairs without a score
+    """
+
+    relations = (
+        ClassworkHasSubmission.objects.filter(classwork=classwork)
+        .select_related("submission___created_by")
+        .order_by("submission_id")
+    )
+    submissions = [relation.submission for relation in relations]
+    index = {submission.id: i for i, submission in enumerate(submissions)}
+
+    scores = PlagiarismInfo.objects.filter(
+        submission_agent__in=index.keys(), submission_target__in=index.keys()
+    ).values_list(
+        "submission_agent",
+        "submission_target",
+        "method",
+        "percentage_plagiarized",
+        "percentage_plagiarized_reverse",
+    )
+
+    methods = {}
+    for agent, target, method, percentage, reverse in scores:
+        if method not in methods:
+            methods[method] = [[None] * len(submissions) for _ in submissions]
+        methods[method][index[agent]][index[target]] = percentage
+        methods[method][index[target]][index[agent]] = reverse
+
+    return dict(
+        classwork=classwork.id,
+        submissions=[
+            dict(
+                id=submission.id,
+                submitter=dict(
+                    id=submission._created_by_id,
+                    username=submission._created_by.username,
+                ),
+            )
+            for submission in submissions
+        ],
+        methods=methods,
+    )
+
+
+def get_classwork_heatmap(classwork) -> dict:
+    """cached heatmap of a classwork, computed when missing or invalidated"""
+
+    heatmap, _ = ClassworkHeatmap.objects.get_or_create(classwork=classwork)
+    if heatmap.data is not None:
+        return heatmap.data
+
+    data = compute_heatmap(classwork)
+
+    # not stored if invalidated while computing
+    ClassworkHeatmap.objects.filter(id=heatmap.id, version=heatmap.version).update(
+        data=data
+    )
+
+    return data
@@ -0,0 +1,190 @@
+"""
+Database backed job queue for running the plagiarism pipeline outside of the
+request/response cycle. Jobs are consumed by `manage.py plagiarism_worker`.
+"""
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.classroom_contents.models import Attachment
+from apps.plagiarism_detector.answers import analyse_answer
+from apps.plagiarism_detector.models import PlagiarismJob, SubmissionDocument
+from apps.plagiarism_detector.utils import analyse_attachment, check_plagiarism
+from configs.definitions import (
+    PLAGIARISM_JOB_BACKOFF,
+    PLAGIARISM_JOB_MAX_ATTEMPTS,
+    PLAGIARISM_JOB_TIMEOUT,
+)
+
+JobStatus = Attachment.PlagiarismStatusChoices
+
+# running jobs are refreshed this often, well within PLAGIARISM_JOB_TIMEOUT
+HEARTBEAT_INTERVAL = PLAGIARISM_JOB_TIMEOUT / 3
+
+
+def _set_attachment_status(attachment_id, status):
+    """updates the job state shown on the attachment without touching other fields"""
+
+    if attachment_id is None:  # answer job
+        return
+
+    Attachment.objects.filter(id=attachment_id).update(plagiarism_status=status)
+
+
+def enqueue_plagiarism_job(attachment, submission):
+    """queues plagiarism analysis of an attachment belonging to given submission"""
+
+    job = PlagiarismJob.objects.create(attachment=attachment, submission=submission)
+    _set_attachment_status(attachment.id, JobStatus.QUEUED)
+
+    return job
+
+
+def enqueue_answer_job(submission):
+    """
+    queues plagiarism analysis of a submission's answer, unless it is already
+    queued (an answer job has no attachment)
+    """
+
+    job = PlagiarismJob.objects.filter(
+        submission=submission, attachment__isnull=True, status=JobStatus.QUEUED
+    ).first()
+    if job is None:
+        job = PlagiarismJob.objects.create(attachment=None, submission=submission)
+
+    return job
+
+
+def get_backoff_delay(attempts: int) -> timedelta:
+    """exponential backoff i.e. PLAGIARISM_JOB_BACKOFF, 2x, 4x, ... seconds"""
+
+    return timedelta(seconds=PLAGIARISM_JOB_BACKOFF * 2 ** max(attempts - 1, 0))
+
+
+def claim_next_job():
+    """
+    Locks and marks the next runnable job as running. Jobs left running by a dead
+    worker, i.e. without a heartbeat for longer than PLAGIARISM_JOB_TIMEOUT, are
+    picked up again.
+
+    Returns None when the queue is empty
+    """
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=PLAGIARISM_JOB_TIMEOUT)
+
+    with transaction.atomic():
+        job = (
+            PlagiarismJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=JobStatus.QUEUED, run_after__lte=now)
+                | Q(status=JobStatus.RUNNING, _modified_date__lt=stale)
+            )
+            .order_by("run_after")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = JobStatus.RUNNING
+        job.attempts += 1
+        job.save(update_fields=["status", "attempts", "_modified_date"])
+        _set_attachment_status(job.attachment_id, JobStatus.RUNNING)
+
+    return job
+
+
+def _heartbeat(job_id, stop):
+    """
+    refreshes the `_modified_date` of a running job every HEARTBEAT_INTERVAL
+    seconds until `stop` is set, so a job running longer than
+    PLAGIARISM_JOB_TIMEOUT isn't taken for one left by a dead worker
+    """
+
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            PlagiarismJob.objects.filter(id=job_id, status=JobStatus.RUNNING).update(
+                _modified_date=timezone.now()
+            )
+    finally:
+        # connections are per thread
+        connections.close_all()
+
+
+def run_job(job):
+    """runs a claimed job, rescheduling it with backoff on failure"""
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job.id, stop), daemon=True)
+    heartbeat.start()
+
+    try:
+        if job.attachment_id is None:
+            analyse_answer(job.submission)
+
+            # the answer is part of the document of a submission with attachments
+            if SubmissionDocument.objects.filter(submission=job.submission).exists():
+                check_plagiarism(job.submission)
+        else:
+            analyse_attachment(job.attachment, job.submission)
+
+    except Exception:
+        job.last_error = traceback.format_exc()
+
+        if job.attempts >= PLAGIARISM_JOB_MAX_ATTEMPTS:
+            job.status = JobStatus.FAILED
+        else:
+            job.status = JobStatus.QUEUED
+            job.run_after = timezone.now() + get_backoff_delay(job.attempts)
+
+    else:
+        job.status = JobStatus.DONE
+        job.last_error = ""
+
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    job.save(update_fields=["status", "run_after", "last_error", "_modified_date"])
+    _set_attachment_status(job.attachment_id, job.status)
+
+    return job
+
+
+def run_next_job() -> bool:
+    """claims and runs a single job. Returns False if there was nothing to run"""
+
+    job = claim_next_job()
+    if job is None:
+        return False
+
+    run_job(job)
+    return True
+
+
+def work(poll_interval: float, burst: bool = False):
+    """
+    Worker loop, run by each worker thread. Polls the queue every `poll_interval`
+    seconds when it is empty. With `burst` the loop exits once the queue is drained
+    """
+
+    try:
+        while True:
+            close_old_connections()
+
+            if run_next_job():
+                continue
+
+            if burst:
+                return
+
+            time.sleep(poll_interval)
+
+    finally:
+        # connections are per thread
+        connections.close_all()
@@ -0,0 +1,97 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.plagiarism_detector.benchmark import (
+    STAGES,
+    PipelineBenchmark,
+    SyntheticCorpus,
+)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the plagiarism pipeline stages on a synthetic corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=20)
+        parser.add_argument("--tokens", type=int, default=2000)
+        parser.add_argument(
+            "--overlap",
+            type=float,
+            default=0.3,
+            help="Fraction of every document copied from a common source",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+        parser.add_argument("--output", help="Writes the results to a JSON file")
+        parser.add_argument(
+            "--compare", help="JSON results of an earlier run to compare against"
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options["overlap"] <= 1:
+            raise CommandError("--overlap must be between 0 and 1")
+
+        baseline = {}
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)["stages"]
+
+        parameters = {
+            name: options[name]
+            for name in ["documents", "tokens", "overlap", "repeat", "seed"]
+        }
+        documents = SyntheticCorpus(options["seed"]).documents(
+            options["documents"], options["tokens"], options["overlap"]
+        )
+        stages = PipelineBenchmark(documents).run(options["stages"], options["repeat"])
+
+        self.stdout.write(
+            f"{'stage':<28}{'seconds':>10}{'peak MiB':>10}{'docs/s':>10}{'vs base':>10}"
+        )
+        for stage, result in stages.items():
+            if "error" in result:
+                self.stdout.write(f"{stage:<28}skipped, {result['error']}")
+                continue
+
+            change = ""
+            if "seconds" in baseline.get(stage, {}):
+                change = f"{baseline[stage]['seconds'] / result['seconds']:.2f}x"
+
+            self.stdout.write(
+                f"{stage:<28}{result['seconds']:>10.3f}"
+                f"{result['peak_memory'] / 2**20:>10.1f}"
+                f"{result['documents_per_second']:>10.1f}{change:>10}"
+            )
+
+        batch = stages.get("calculate_scores", {})
+        per_token = stages.get("calculate_scores_per_token", {})
+        if "seconds" in batch and "seconds" in per_token:
+            self.stdout.write(
+                f"batch scoring {per_token['seconds'] / batch['seconds']:.1f}x "
+                f"faster than per token, identical: {per_token['identical']}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(
+                    dict(
+                        revision=_git_revision(), parameters=parameters, stages=stages
+                    ),
+                    f,
+                    indent=2,
+                )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from apps.plagiarism_detector.dumps import collect_dumps
+from configs.definitions import PLAGIARISM_DUMP_BUDGET, PLAGIARISM_DUMP_GRACE_PERIOD
+
+
+def _megabytes(size):
+    return f"{size / 1024 / 1024:.1f}MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes tokenized and model dumps no attachment references and evicts "
+        "the least recently used ones over the disk budget"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget",
+            type=int,
+            default=PLAGIARISM_DUMP_BUDGET,
+            help="Bytes the dumps may take (defaults to PLAGIARISM_DUMP_BUDGET)",
+        )
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=PLAGIARISM_DUMP_GRACE_PERIOD,
+            help="Seconds during which a new or used dump is never collected",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be deleted without deleting anything",
+        )
+
+    def handle(self, *args, **options):
+        result = collect_dumps(
+            budget=options["budget"],
+            grace_period=options["grace_period"],
+            dry_run=options["dry_run"],
+        )
+
+        prefix = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            f"{prefix} {result['orphaned']} orphaned dumps "
+            f"({_megabytes(result['orphaned_size'])}) and evicted {result['evicted']} "
+            f"({_megabytes(result['evicted_size'])}), "
+            f"{_megabytes(result['size'])} left"
+        )
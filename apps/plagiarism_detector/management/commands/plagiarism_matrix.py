@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.classroom_contents.models import Classwork
+from apps.plagiarism_detector.similarity import analyse_classwork
+
+
+class Command(BaseCommand):
+    help = "Computes TF-IDF similarity of all submission pairs of given classworks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("classwork_ids", nargs="+", type=int)
+
+    def handle(self, *args, **options):
+        for classwork_id in options["classwork_ids"]:
+            try:
+                classwork = Classwork.objects.get(id=classwork_id)
+            except Classwork.DoesNotExist:
+                raise CommandError(f"Classwork(id={classwork_id}) does not exist!")
+
+            start = time.perf_counter()
+            # outside of requests, evicted dumps are rebuilt right away
+            pairs = analyse_classwork(classwork, rebuild_dumps=True)
+
+            self.stdout.write(
+                f"Classwork(id={classwork_id}): {pairs} pairs "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
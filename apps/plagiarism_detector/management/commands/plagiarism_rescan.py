@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.plagiarism_detector.pool import configure_pool, reset_pool
+from apps.plagiarism_detector.rescan import (
+    Rescan,
+    get_rescan_relations,
+    get_rescan_scope,
+)
+from configs.definitions import PLAGIARISM_WORKER_PROCESSES
+
+
+def _date(value):
+    date = parse_date(value)
+    if date is None:
+        raise CommandError(f"Invalid date {value}, expected YYYY-MM-DD")
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyses submitted attachments of given classworks, classrooms or dates "
+        "again, resuming an interrupted rescan of the same scope"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--classwork", type=int, nargs="+", dest="classwork_ids")
+        parser.add_argument("--classroom", type=int, nargs="+", dest="classroom_ids")
+        parser.add_argument("--since", help="Submitted on or after YYYY-MM-DD")
+        parser.add_argument("--until", help="Submitted on or before YYYY-MM-DD")
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=PLAGIARISM_WORKER_PROCESSES,
+            help="Number of pool processes, also the number of attachments at once",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start over instead of resuming an interrupted rescan",
+        )
+
+    def report(self, rescan):
+        checkpoint = rescan.checkpoint
+        self.stdout.write(
+            f"{rescan.done}/{rescan.total} attachments, "
+            f"{checkpoint.failed} failed, {rescan.throughput:.2f}/s "
+            f"(checkpoint at relation {checkpoint.last_relation_id})"
+        )
+
+    def handle(self, *args, **options):
+        filters = dict(
+            classwork_ids=options["classwork_ids"],
+            classroom_ids=options["classroom_ids"],
+            since=options["since"] and _date(options["since"]),
+            until=options["until"] and _date(options["until"]),
+        )
+        processes = max(options["processes"], 1)
+
+        rescan = Rescan(
+            get_rescan_relations(**filters),
+            scope=get_rescan_scope(**filters),
+            workers=processes,
+            restart=options["restart"],
+            on_progress=self.report,
+        )
+        if rescan.checkpoint.processed:
+            self.stdout.write(
+                f"Resuming after {rescan.checkpoint.processed} attachments, "
+                f"from relation {rescan.checkpoint.last_relation_id}"
+            )
+
+        configure_pool(processes)
+        try:
+            rescan.run()
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted, run the same command again to resume")
+            return
+        finally:
+            reset_pool()
+
+        for relation_id, error in rescan.errors:
+            self.stderr.write(f"SubmissionHasAttachment(id={relation_id}): {error!r}")
+
+        self.stdout.write(
+            f"Rescanned {rescan.done} attachments, {len(rescan.errors)} failed"
+        )
@@ -0,0 +1,62 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from apps.plagiarism_detector.jobs import work
+from apps.plagiarism_detector.pool import configure_pool, reset_pool
+from configs.definitions import (
+    PLAGIARISM_WORKER_POLL_INTERVAL,
+    PLAGIARISM_WORKER_PROCESSES,
+)
+
+
+class Command(BaseCommand):
+    help = "Runs queued plagiarism detection jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=PLAGIARISM_WORKER_PROCESSES,
+            help="Number of pool processes, also the number of jobs run at once",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=PLAGIARISM_WORKER_POLL_INTERVAL,
+            help="Seconds to wait before polling an empty queue again",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        processes = max(options["processes"], 1)
+
+        self.stdout.write(f"Starting plagiarism worker with {processes} process(es)")
+
+        # job threads wait on the database and the pool, the pool does the CPU work
+        configure_pool(processes)
+        threads = [
+            threading.Thread(
+                target=work,
+                args=(options["poll_interval"], options["burst"]),
+                daemon=True,
+            )
+            for _ in range(processes)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            reset_pool()
+
+        self.stdout.write("Plagiarism worker stopped")
@@ -0,0 +1,155 @@
+"""
+Per stage instrumentation of the plagiarism pipeline.
+
+`analyse_attachment` times every stage it runs and stores the timings, token
+count, file and model sizes, the peak RSS of the pool processes and the number
+of candidates found and pruned as the attachment's `PipelineMetrics`.
+`get_stage_percentiles` aggregates the most recent runs for monitoring.
+"""
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from apps.plagiarism_detector.models import PipelineMetrics
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+STAGES = [
+    "extraction",
+    "cleaning",
+    "tokenization",
+    "fit",
+    "dump",
+    "boilerplate",
+    "candidates",
+    "load",
+    "scoring",
+    "fingerprints",
+]
+
+PERCENTILES = [50, 95]
+
+
+class StageTimer:
+    """accumulates wall time per named stage and the peak RSS of the processes"""
+
+    def __init__(self):
+        self.timings = {}
+        self.peak_rss = 0
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def update(self, timings):
+        """adds timings measured elsewhere e.g. in a pool process"""
+
+        for name, seconds in timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def record_peak_rss(self, peak_rss):
+        self.peak_rss = max(self.peak_rss, peak_rss)
+
+
+def reset_peak_rss():
+    """resets the peak RSS of this process where the kernel allows it (linux)"""
+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def get_peak_rss() -> int:
+    """
+    peak resident set size of this process in bytes, since the last
+    `reset_peak_rss` on linux and since the process started elsewhere
+    """
+
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return 0
+
+    # bytes on macos, kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def save_pipeline_metrics(attachment, timer, succeeded, **fields):
+    """stores the metrics of an attachment's pipeline run, replacing earlier ones"""
+
+    PipelineMetrics.objects.update_or_create(
+        attachment=attachment,
+        defaults=dict(
+            stage_timings=timer.timings,
+            peak_rss=timer.peak_rss,
+            succeeded=succeeded,
+            **fields,
+        ),
+    )
+
+
+def get_stage_percentiles(limit: int = 1000) -> dict:
+    """
+    p50/p95 of every stage's wall time over the last `limit` pipeline runs
+
+    Returns
+    ---
+    dict(
+        runs,
+        failed,
+        candidates,
+        pruned,
+        stages={stage: dict(count, mean, p50, p95)}
+    )
+    where pruned is the number of candidates not scored by the pre-filter
+    """
+
+    runs = list(
+        PipelineMetrics.objects.order_by("-_modified_date").values_list(
+            "stage_timings", "succeeded", "candidate_count", "pruned_count"
+        )[:limit]
+    )
+
+    stages = {}
+    for stage in STAGES + ["total"]:
+        if stage == "total":
+            seconds = [sum(timings.values()) for timings, *_ in runs if timings]
+        else:
+            seconds = [timings[stage] for timings, *_ in runs if stage in timings]
+
+        if not seconds:
+            continue
+
+        values = np.percentile(seconds, PERCENTILES)
+        stages[stage] = dict(
+            count=len(seconds),
+            mean=float(np.mean(seconds)),
+            **{f"p{p}": float(value) for p, value in zip(PERCENTILES, values)},
+        )
+
+    return dict(
+        runs=len(runs),
+        failed=sum(1 for _, succeeded, _, _ in runs if not succeeded),
+        candidates=sum(candidates for _, _, candidates, _ in runs),
+        pruned=sum(pruned for _, _, _, pruned in runs),
+        stages=stages,
+    )
@@ -0,0 +1,73 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0006_attachment_plagiarism_status"),
+        ("plagiarism_detector", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlagiarismJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("_modified_date", models.DateTimeField(auto_now=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("Q", "QUEUED"),
+                            ("R", "RUNNING"),
+                            ("D", "DONE"),
+                            ("F", "FAILED"),
+                        ],
+                        default="Q",
+                        max_length=1,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True, default="")),
+                (
+                    "attachment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attachment_plagiarism_job",
+                        to="classroom_contents.attachment",
+                    ),
+                ),
+                (
+                    "submission",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="submission_plagiarism_job",
+                        to="classroom_contents.submission",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Plagiarism Jobs",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="plagiarismjob",
+            index=models.Index(
+                fields=["status", "run_after"], name="plagiarism__status_3e51c5_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0006_attachment_plagiarism_status"),
+        ("plagiarism_detector", "0002_plagiarismjob_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubmissionSignature",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("_modified_date", models.DateTimeField(auto_now=True)),
+                ("signature", models.BinaryField()),
+                (
+                    "classwork",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="classwork_signature",
+                        to="classroom_contents.classwork",
+                    ),
+                ),
+                (
+                    "submission",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="submission_signature",
+                        to="classroom_contents.submission",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SignatureBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.BigIntegerField()),
+                (
+                    "classwork",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="classwork_signature_bucket",
+                        to="classroom_contents.classwork",
+                    ),
+                ),
+                (
+                    "signature",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="signature_bucket",
+                        to="plagiarism_detector.submissionsignature",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="signaturebucket",
+            index=models.Index(
+                fields=["classwork", "bucket"], name="plagiarism__classwo_62a6ef_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0003_submissionsignature_signaturebucket_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plagiarisminfo",
+            name="method",
+            field=models.CharField(
+                choices=[("LM", "LANGUAGE_MODEL"), ("TF", "TFIDF")],
+                default="LM",
+                max_length=2,
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0006_attachment_plagiarism_status"),
+        ("plagiarism_detector", "0004_plagiarisminfo_method"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="plagiarisminfo",
+            name="method",
+            field=models.CharField(
+                choices=[
+                    ("LM", "LANGUAGE_MODEL"),
+                    ("TF", "TFIDF"),
+                    ("WN", "WINNOWING"),
+                ],
+                default="LM",
+                max_length=2,
+            ),
+        ),
+        migrations.CreateModel(
+            name="Fingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.BigIntegerField()),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "attachment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attachment_fingerprint",
+                        to="classroom_contents.attachment",
+                    ),
+                ),
+                (
+                    "submission",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="submission_fingerprint",
+                        to="classroom_contents.submission",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="fingerprint",
+            index=models.Index(
+                fields=["fingerprint"], name="plagiarism__fingerp_cb0d5f_idx"
+            ),
+        ),
+    ]
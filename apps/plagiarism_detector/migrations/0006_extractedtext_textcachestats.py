@@ -0,0 +1,65 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "plagiarism_detector",
+            "0005_alter_plagiarisminfo_method_fingerprint_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExtractedText",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("text", models.TextField()),
+                ("size", models.PositiveBigIntegerField()),
+                ("hits", models.PositiveBigIntegerField(default=0)),
+                (
+                    "last_used",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Extracted Texts",
+            },
+        ),
+        migrations.CreateModel(
+            name="TextCacheStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hits", models.PositiveBigIntegerField(default=0)),
+                ("misses", models.PositiveBigIntegerField(default=0)),
+                ("evictions", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "Text Cache Stats",
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0006_attachment_plagiarism_status"),
+        ("plagiarism_detector", "0006_extractedtext_textcachestats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PipelineMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("_modified_date", models.DateTimeField(auto_now=True, db_index=True)),
+                ("stage_timings", models.JSONField(default=dict)),
+                ("token_count", models.PositiveBigIntegerField(default=0)),
+                ("file_size", models.PositiveBigIntegerField(default=0)),
+                ("model_size", models.PositiveBigIntegerField(default=0)),
+                ("peak_rss", models.PositiveBigIntegerField(default=0)),
+                ("succeeded", models.BooleanField(default=False)),
+                (
+                    "attachment",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attachment_pipeline_metrics",
+                        to="classroom_contents.attachment",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Pipeline Metrics",
+            },
+        ),
+    ]
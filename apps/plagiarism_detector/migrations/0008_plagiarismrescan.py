@@ -0,0 +1,37 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0007_pipelinemetrics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlagiarismRescan",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("_modified_date", models.DateTimeField(auto_now=True)),
+                ("scope", models.CharField(max_length=255, unique=True)),
+                ("last_relation_id", models.PositiveBigIntegerField(default=0)),
+                ("processed", models.PositiveBigIntegerField(default=0)),
+                ("failed", models.PositiveBigIntegerField(default=0)),
+                ("finished", models.BooleanField(default=False)),
+            ],
+            options={
+                "verbose_name_plural": "Plagiarism Rescans",
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0006_attachment_plagiarism_status"),
+        ("plagiarism_detector", "0008_plagiarismrescan"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClassworkHeatmap",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_modified_date", models.DateTimeField(auto_now=True)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("data", models.JSONField(blank=True, null=True)),
+                (
+                    "classwork",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="classwork_plagiarism_heatmap",
+                        to="classroom_contents.classwork",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Classwork Heatmaps",
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0006_attachment_plagiarism_status"),
+        ("plagiarism_detector", "0009_classworkheatmap"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MatchedSpans",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("tokenized_dump", models.CharField(max_length=1000)),
+                ("other_tokenized_dump", models.CharField(max_length=1000)),
+                ("spans", models.JSONField(default=list)),
+                (
+                    "attachment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attachment_matched_spans",
+                        to="classroom_contents.attachment",
+                    ),
+                ),
+                (
+                    "other_attachment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="other_attachment_matched_spans",
+                        to="classroom_contents.attachment",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Matched Spans",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="matchedspans",
+            constraint=models.UniqueConstraint(
+                fields=("attachment", "other_attachment"),
+                name="unique_matched_spans_pair",
+            ),
+        ),
+    ]
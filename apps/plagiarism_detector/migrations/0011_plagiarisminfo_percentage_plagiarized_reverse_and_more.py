@@ -0,0 +1,26 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "plagiarism_detector",
+            "0010_matchedspans_matchedspans_unique_matched_spans_pair",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plagiarisminfo",
+            name="percentage_plagiarized_reverse",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="plagiarisminfo",
+            name="percentage_plagiarized",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
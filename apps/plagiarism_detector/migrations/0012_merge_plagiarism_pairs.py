@@ -0,0 +1,82 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:46
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def merge_plagiarism_pairs(apps, schema_editor):
+    """
+    merges the rows of both directions of a pair into one with the lower
+    submission id as agent, the newest score of a direction winning
+    """
+
+    PlagiarismInfo = apps.get_model("plagiarism_detector", "PlagiarismInfo")
+
+    rows = PlagiarismInfo.objects.order_by("id").values_list(
+        "id",
+        "submission_agent_id",
+        "submission_target_id",
+        "method",
+        "percentage_plagiarized",
+    )
+
+    pairs, duplicates = {}, []
+    for id, agent, target, method, percentage in rows.iterator():
+        if agent == target:
+            duplicates.append(id)
+            continue
+
+        lower, higher = sorted((agent, target))
+        key = (lower, higher, method)
+        if key in pairs:
+            duplicates.append(id)
+        else:
+            pairs[key] = PlagiarismInfo(
+                id=id,
+                submission_agent_id=lower,
+                submission_target_id=higher,
+                method=method,
+            )
+
+        if agent < target:
+            pairs[key].percentage_plagiarized = percentage
+        else:
+            pairs[key].percentage_plagiarized_reverse = percentage
+
+    for info in pairs.values():
+        # only one direction of the symmetric TF-IDF scores was stored
+        if info.method == "TF":
+            percentage = info.percentage_plagiarized
+            if percentage is None:
+                percentage = info.percentage_plagiarized_reverse
+            info.percentage_plagiarized = percentage
+            info.percentage_plagiarized_reverse = percentage
+
+    for i in range(0, len(duplicates), BATCH_SIZE):
+        PlagiarismInfo.objects.filter(id__in=duplicates[i : i + BATCH_SIZE]).delete()
+
+    PlagiarismInfo.objects.bulk_update(
+        pairs.values(),
+        [
+            "submission_agent",
+            "submission_target",
+            "percentage_plagiarized",
+            "percentage_plagiarized_reverse",
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "plagiarism_detector",
+            "0011_plagiarisminfo_percentage_plagiarized_reverse_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_plagiarism_pairs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0012_merge_plagiarism_pairs"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="plagiarisminfo",
+            index=models.Index(
+                fields=["submission_target", "method"],
+                name="plagiarism__submiss_b9573f_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="plagiarisminfo",
+            constraint=models.UniqueConstraint(
+                fields=("submission_agent", "submission_target", "method"),
+                name="unique_plagiarism_pair",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="plagiarisminfo",
+            constraint=models.CheckConstraint(
+                check=models.Q(("submission_agent__lt", models.F("submission_target"))),
+                name="plagiarism_pair_lower_id_first",
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0007_attachmentblob_alter_attachment_attachment"),
+        ("plagiarism_detector", "0013_plagiarisminfo_unique_plagiarism_pair_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submissionsignature",
+            name="source",
+            field=models.CharField(
+                choices=[("AT", "ATTACHMENT"), ("AN", "ANSWER")],
+                default="AT",
+                max_length=2,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="plagiarisminfo",
+            name="method",
+            field=models.CharField(
+                choices=[
+                    ("LM", "LANGUAGE_MODEL"),
+                    ("TF", "TFIDF"),
+                    ("WN", "WINNOWING"),
+                    ("AS", "ANSWER_SHINGLES"),
+                ],
+                default="LM",
+                max_length=2,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="plagiarismjob",
+            name="attachment",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="attachment_plagiarism_job",
+                to="classroom_contents.attachment",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="submissionsignature",
+            name="submission",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="submission_signature",
+                to="classroom_contents.submission",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="submissionsignature",
+            constraint=models.UniqueConstraint(
+                fields=("submission", "source"), name="unique_submission_signature"
+            ),
+        ),
+    ]
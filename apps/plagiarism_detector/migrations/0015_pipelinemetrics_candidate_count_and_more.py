@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0014_submissionsignature_source_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pipelinemetrics",
+            name="candidate_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="pipelinemetrics",
+            name="pruned_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="submissionsignature",
+            name="shingle_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0015_pipelinemetrics_candidate_count_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="plagiarisminfo",
+            name="method",
+            field=models.CharField(
+                choices=[
+                    ("LM", "LANGUAGE_MODEL"),
+                    ("TF", "TFIDF"),
+                    ("WN", "WINNOWING"),
+                    ("AS", "ANSWER_SHINGLES"),
+                    ("CF", "CODE_FINGERPRINTS"),
+                ],
+                default="LM",
+                max_length=2,
+            ),
+        ),
+    ]
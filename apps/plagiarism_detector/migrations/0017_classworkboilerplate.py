@@ -0,0 +1,42 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0007_attachmentblob_alter_attachment_attachment"),
+        ("plagiarism_detector", "0016_alter_plagiarisminfo_method"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClassworkBoilerplate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("kgrams", models.BinaryField()),
+                (
+                    "classwork",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="classwork_plagiarism_boilerplate",
+                        to="classroom_contents.classwork",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Classwork Boilerplates",
+            },
+        ),
+    ]
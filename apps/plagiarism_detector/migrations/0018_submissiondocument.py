@@ -0,0 +1,44 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classroom_contents", "0007_attachmentblob_alter_attachment_attachment"),
+        ("plagiarism_detector", "0017_classworkboilerplate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubmissionDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_modified_date", models.DateTimeField(auto_now=True)),
+                ("sources", models.CharField(max_length=64)),
+                ("tokenized_dump", models.CharField(max_length=1000)),
+                ("model_dump", models.CharField(max_length=1000)),
+                (
+                    "submission",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="submission_plagiarism_document",
+                        to="classroom_contents.submission",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Submission Documents",
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0018_submissiondocument"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollusionAnalysis",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_modified_date", models.DateTimeField(auto_now=True)),
+                ("scope", models.CharField(max_length=255, unique=True)),
+                ("threshold", models.FloatField()),
+                ("versions", models.CharField(max_length=64)),
+            ],
+            options={
+                "verbose_name_plural": "Collusion Analyses",
+            },
+        ),
+        migrations.CreateModel(
+            name="CollusionCluster",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("size", models.PositiveIntegerField()),
+                ("edge_count", models.PositiveIntegerField()),
+                ("density", models.FloatField()),
+                ("max_percentage", models.FloatField()),
+                ("mean_percentage", models.FloatField()),
+                ("submissions", models.JSONField()),
+                (
+                    "analysis",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="analysis_cluster",
+                        to="plagiarism_detector.collusionanalysis",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Collusion Clusters",
+            },
+        ),
+    ]
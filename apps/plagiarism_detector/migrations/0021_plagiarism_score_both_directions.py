@@ -0,0 +1,52 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:21
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0020_plagiarism_score_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="plagiarisminfo",
+            name="plagiarism_agent_score_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="plagiarisminfo",
+            name="plagiarism_target_score_idx",
+        ),
+        migrations.AddIndex(
+            model_name="plagiarisminfo",
+            index=models.Index(
+                models.F("submission_agent"),
+                django.db.models.functions.comparison.Greatest(
+                    django.db.models.functions.comparison.Coalesce(
+                        "percentage_plagiarized", 0.0
+                    ),
+                    django.db.models.functions.comparison.Coalesce(
+                        "percentage_plagiarized_reverse", 0.0
+                    ),
+                ),
+                name="plagiarism_agent_score_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="plagiarisminfo",
+            index=models.Index(
+                models.F("submission_target"),
+                django.db.models.functions.comparison.Greatest(
+                    django.db.models.functions.comparison.Coalesce(
+                        "percentage_plagiarized", 0.0
+                    ),
+                    django.db.models.functions.comparison.Coalesce(
+                        "percentage_plagiarized_reverse", 0.0
+                    ),
+                ),
+                name="plagiarism_target_score_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.1.13 on 2026-10-18 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plagiarism_detector", "0021_plagiarism_score_both_directions"),
+    ]
+
+    operations = [
+        # a cache, spans are located again on first request
+        migrations.DeleteModel(
+            name="MatchedSpans",
+        ),
+        migrations.CreateModel(
+            name="MatchedSpans",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("_created_date", models.DateTimeField(auto_now_add=True)),
+                ("sources", models.CharField(max_length=64)),
+                ("spans", models.JSONField(default=list)),
+                (
+                    "plagiarism",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="plagiarism_matched_spans",
+                        to="plagiarism_detector.plagiarisminfo",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Matched Spans",
+            },
+        ),
+    ]
@@ -0,0 +1,202 @@
+"""
+MinHash signatures and LSH banding of submissions.
+
+Every analysed submission stores a MinHash signature of its word shingles along
+with one bucket per LSH band. Submissions sharing at least one bucket with a new
+submission are its plagiarism candidates, so only those are scored with the
+n-gram language model. Inline answers are indexed the same way from their
+character shingles, as a separate source only matched against other answers.
+"""
+import hashlib
+
+import numpy as np
+
+from apps.plagiarism_detector.hashing import PAD_SYMBOL, hash_ngrams, hash_tokens
+from apps.plagiarism_detector.models import SignatureBucket, SubmissionSignature
+
+SHINGLE_SIZE = 3
+CHARACTER_SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 64  # 2 rows per band, candidates from jaccard ~0.125 onwards
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+# universal hashing (a * x + b) mod p, p being the largest 32 bit prime
+_PRIME = np.uint64(4294967291)
+_MAX_HASH = np.uint32(4294967295)
+_CHUNK_SIZE = 4096
+
+# fixed seed, signatures have to stay comparable across processes and restarts
+_random_state = np.random.RandomState(20220508)
+_PERMUTATION_A = _random_state.randint(
+    1, int(_PRIME), MINHASH_PERMUTATIONS, dtype=np.int64
+).astype(np.uint64)
+_PERMUTATION_B = _random_state.randint(
+    0, int(_PRIME), MINHASH_PERMUTATIONS, dtype=np.int64
+).astype(np.uint64)
+
+
+def _fold_shingles(ids: np.ndarray) -> np.ndarray:
+    """distinct 64 bit ids folded into 32 bits, so that a * x + b never overflows"""
+
+    return np.unique((ids ^ (ids >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+
+def get_shingles(tokenized_data) -> np.ndarray:
+    """distinct 32 bit ids of word shingles of a tokenized document"""
+
+    tokens = [token for token in tokenized_data if token != PAD_SYMBOL]
+    return _fold_shingles(hash_ngrams(hash_tokens(tokens), SHINGLE_SIZE))
+
+
+def get_character_shingles(text, size=CHARACTER_SHINGLE_SIZE) -> np.ndarray:
+    """distinct 32 bit ids of character shingles of a (short) text"""
+
+    code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return _fold_shingles(hash_ngrams(code_points.astype(np.uint64), size))
+
+
+def get_minhash_signature(shingles: np.ndarray) -> np.ndarray:
+    """MinHash signature of given shingle ids"""
+
+    signature = np.full(MINHASH_PERMUTATIONS, _MAX_HASH, dtype=np.uint32)
+
+    # chunked to bound the (permutations x shingles) intermediate array
+    for start in range(0, len(shingles), _CHUNK_SIZE):
+        chunk = shingles[start : start + _CHUNK_SIZE]
+        hashed = (
+            _PERMUTATION_A[:, None] * chunk[None, :] + _PERMUTATION_B[:, None]
+        ) % _PRIME
+        signature = np.minimum(signature, hashed.min(axis=1).astype(np.uint32))
+
+    return signature
+
+
+def get_lsh_buckets(signature: np.ndarray) -> list:
+    """one signed 64 bit bucket key per band. The band index is part of the key"""
+
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS : (band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(
+            band.to_bytes(2, "little") + rows.tobytes(), digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+
+    return buckets
+
+
+def estimate_jaccard(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """estimated jaccard similarity of two signatures"""
+
+    return float(np.mean(signature_a == signature_b))
+
+
+def estimate_containment(signature, shingle_count, signatures, shingle_counts):
+    """
+    estimated share of the smaller document's shingles found in the other, of a
+    signature against each row of `signatures`, from their jaccard estimates.
+    |A & B| = J * (|A| + |B|) / (1 + J)
+    """
+
+    jaccard = np.mean(signatures == signature[None, :], axis=1)
+    intersection = jaccard * (shingle_count + shingle_counts) / (1 + jaccard)
+
+    return intersection / np.maximum(np.minimum(shingle_count, shingle_counts), 1)
+
+
+def index_signature(submission, classwork, shingles, source):
+    """stores (or replaces) the signature and LSH buckets of a submission's source"""
+
+    signature = get_minhash_signature(shingles)
+
+    signature_instance, _ = SubmissionSignature.objects.update_or_create(
+        submission=submission,
+        source=source,
+        defaults=dict(
+            classwork=classwork,
+            signature=signature.tobytes(),
+            shingle_count=len(shingles),
+        ),
+    )
+
+    SignatureBucket.objects.filter(signature=signature_instance).delete()
+    SignatureBucket.objects.bulk_create(
+        [
+            SignatureBucket(
+                signature=signature_instance, classwork=classwork, bucket=bucket
+            )
+            for bucket in get_lsh_buckets(signature)
+        ]
+    )
+
+    return signature_instance
+
+
+def index_submission(submission, classwork, tokenized_data):
+    """stores (or replaces) the signature and LSH buckets of a submission"""
+
+    return index_signature(
+        submission,
+        classwork,
+        get_shingles(tokenized_data),
+        SubmissionSignature.SourceChoices.ATTACHMENT,
+    )
+
+
+def get_signature(signature_instance) -> np.ndarray:
+    """signature array of a stored SubmissionSignature"""
+
+    return np.frombuffer(bytes(signature_instance.signature), dtype=np.uint32)
+
+
+def get_candidate_submission_ids(signature_instance) -> list:
+    """
+    ids of submissions of the same classwork sharing at least one LSH bucket with
+    given signature from the same source, excluding its own submission
+    """
+
+    return list(
+        SignatureBucket.objects.filter(
+            classwork=signature_instance.classwork_id,
+            bucket__in=get_lsh_buckets(get_signature(signature_instance)),
+            signature__source=signature_instance.source,
+        )
+        .exclude(signature=signature_instance)
+        .values_list("signature__submission", flat=True)
+        .distinct()
+    )
+
+
+def prune_candidates(signature_instance, candidate_ids, min_containment) -> list:
+    """
+    candidates whose estimated containment (see estimate_containment) reaches
+    `min_containment`, i.e. worth scoring. Signatures indexed without a shingle
+    count are kept
+    """
+
+    candidates = list(
+        SubmissionSignature.objects.filter(
+            submission__in=candidate_ids, source=signature_instance.source
+        ).values_list("submission", "signature", "shingle_count")
+    )
+    if not candidates or not signature_instance.shingle_count:
+        return list(candidate_ids)
+
+    submission_ids = np.array([submission for submission, _, _ in candidates])
+    signatures = np.stack(
+        [
+            np.frombuffer(bytes(signature), dtype=np.uint32)
+            for _, signature, _ in candidates
+        ]
+    )
+    shingle_counts = np.array([count for _, _, count in candidates])
+
+    containment = estimate_containment(
+        get_signature(signature_instance),
+        signature_instance.shingle_count,
+        signatures,
+        shingle_counts,
+    )
+    keep = (containment >= min_containment) | (shingle_counts == 0)
+
+    return submission_ids[keep].tolist()
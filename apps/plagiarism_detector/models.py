@@ -1,11 +1,36 @@
-from tabnanny import verbose
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from apps.classroom_contents.models import Attachment, Classwork, Submission
 
-from apps.classroom_contents.models import Submission
 
 # Create your models here.
+
+# score of a pair as listed, ordered and filtered: the higher of its directions,
+# either of which may not be computed, 0 when neither is
+PLAGIARISM_SCORE = Greatest(
+    Coalesce("percentage_plagiarized", 0.0),
+    Coalesce("percentage_plagiarized_reverse", 0.0),
+)
+
+
 class PlagiarismInfo(models.Model):
-    """ """
+    """
+    Scores of a pair of submissions by a detection method, one row per pair with
+    the lower submission id as agent. `percentage_plagiarized` is the score of
+    the agent against the target, `percentage_plagiarized_reverse` of the target
+    against the agent, either None when not computed
+    """
+
+    class MethodChoices(models.TextChoices):
+        """Detection method which produced the score"""
+
+        LANGUAGE_MODEL = "LM", "LANGUAGE_MODEL"
+        TFIDF = "TF", "TFIDF"
+        WINNOWING = "WN", "WINNOWING"
+        ANSWER_SHINGLES = "AS", "ANSWER_SHINGLES"
+        CODE_FINGERPRINTS = "CF", "CODE_FINGERPRINTS"
 
     submission_agent = models.ForeignKey(
         to=Submission,
@@ -17,7 +42,370 @@ class PlagiarismInfo(models.Model):
         related_name="submission_target_plagiarism",
         on_delete=models.CASCADE,
     )
-    percentage_plagiarized = models.FloatField()
+    percentage_plagiarized = models.FloatField(null=True, blank=True)
+    percentage_plagiarized_reverse = models.FloatField(null=True, blank=True)
+    method = models.CharField(
+        max_length=2,
+        choices=MethodChoices.choices,
+        default=MethodChoices.LANGUAGE_MODEL,
+    )
 
     class Meta:
         verbose_name_plural = "Plagiarism Information"
+        constraints = [
+            # also the index of lookups by agent
+            models.UniqueConstraint(
+                fields=["submission_agent", "submission_target", "method"],
+                name="unique_plagiarism_pair",
+            ),
+            models.CheckConstraint(
+                check=models.Q(submission_agent__lt=models.F("submission_target")),
+                name="plagiarism_pair_lower_id_first",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["submission_target", "method"]),
+            # listings of a submission's pairs by score
+            models.Index(
+                models.F("submission_agent"),
+                PLAGIARISM_SCORE,
+                name="plagiarism_agent_score_idx",
+            ),
+            models.Index(
+                models.F("submission_target"),
+                PLAGIARISM_SCORE,
+                name="plagiarism_target_score_idx",
+            ),
+        ]
+
+
+class PlagiarismJob(models.Model):
+    """
+    Queued plagiarism analysis of a submitted attachment, or of the submission's
+    answer when it has none, run by `plagiarism_worker`
+    """
+
+    _created_date = models.DateTimeField(auto_now_add=True)
+    _modified_date = models.DateTimeField(auto_now=True)
+
+    attachment = models.ForeignKey(
+        to=Attachment,
+        on_delete=models.CASCADE,
+        related_name="attachment_plagiarism_job",
+        null=True,
+        blank=True,
+    )
+    submission = models.ForeignKey(
+        to=Submission,
+        on_delete=models.CASCADE,
+        related_name="submission_plagiarism_job",
+    )
+
+    status = models.CharField(
+        max_length=1,
+        choices=Attachment.PlagiarismStatusChoices.choices,
+        default=Attachment.PlagiarismStatusChoices.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        verbose_name_plural = "Plagiarism Jobs"
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self) -> str:
+        return f"{self.id}: {self.attachment_id} -> {self.get_status_display()}"
+
+
+class SubmissionSignature(models.Model):
+    """MinHash signature of a submission's attachment or answer"""
+
+    class SourceChoices(models.TextChoices):
+        """Content the signature was computed from"""
+
+        ATTACHMENT = "AT", "ATTACHMENT"
+        ANSWER = "AN", "ANSWER"
+
+    _created_date = models.DateTimeField(auto_now_add=True)
+    _modified_date = models.DateTimeField(auto_now=True)
+
+    submission = models.ForeignKey(
+        to=Submission,
+        on_delete=models.CASCADE,
+        related_name="submission_signature",
+    )
+    source = models.CharField(
+        max_length=2,
+        choices=SourceChoices.choices,
+        default=SourceChoices.ATTACHMENT,
+    )
+    classwork = models.ForeignKey(
+        to=Classwork,
+        on_delete=models.CASCADE,
+        related_name="classwork_signature",
+    )
+    signature = models.BinaryField()
+    shingle_count = models.PositiveIntegerField(default=0)  # 0 if indexed before
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["submission", "source"], name="unique_submission_signature"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.submission_id} ({self.source}) -> {self.classwork_id}"
+
+
+class SignatureBucket(models.Model):
+    """LSH band bucket of a submission signature, classwork is kept for the lookup index"""
+
+    signature = models.ForeignKey(
+        to=SubmissionSignature,
+        on_delete=models.CASCADE,
+        related_name="signature_bucket",
+    )
+    classwork = models.ForeignKey(
+        to=Classwork,
+        on_delete=models.CASCADE,
+        related_name="classwork_signature_bucket",
+    )
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["classwork", "bucket"])]
+
+
+class Fingerprint(models.Model):
+    """Winnowed k-gram fingerprint posting of a submitted attachment"""
+
+    fingerprint = models.BigIntegerField()
+    position = models.PositiveIntegerField()
+
+    attachment = models.ForeignKey(
+        to=Attachment,
+        on_delete=models.CASCADE,
+        related_name="attachment_fingerprint",
+    )
+    submission = models.ForeignKey(
+        to=Submission,
+        on_delete=models.CASCADE,
+        related_name="submission_fingerprint",
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["fingerprint"])]
+
+
+class ExtractedText(models.Model):
+    """Text extracted from an attachment file, keyed by the SHA-256 of its contents"""
+
+    _created_date = models.DateTimeField(auto_now_add=True)
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    text = models.TextField()
+    size = models.PositiveBigIntegerField()
+
+    hits = models.PositiveBigIntegerField(default=0)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Extracted Texts"
+
+    def __str__(self) -> str:
+        return f"{self.sha256} ({self.size} bytes)"
+
+
+class TextCacheStats(models.Model):
+    """Single row of extracted text cache counters"""
+
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Text Cache Stats"
+
+
+class PipelineMetrics(models.Model):
+    """Per stage timings and resource usage of the last pipeline run of an attachment"""
+
+    _created_date = models.DateTimeField(auto_now_add=True)
+    _modified_date = models.DateTimeField(auto_now=True, db_index=True)
+
+    attachment = models.OneToOneField(
+        to=Attachment,
+        on_delete=models.CASCADE,
+        related_name="attachment_pipeline_metrics",
+    )
+
+    stage_timings = models.JSONField(default=dict)  # stage -> seconds
+    token_count = models.PositiveBigIntegerField(default=0)
+    file_size = models.PositiveBigIntegerField(default=0)
+    model_size = models.PositiveBigIntegerField(default=0)
+    peak_rss = models.PositiveBigIntegerField(default=0)  # bytes, of pool processes
+    candidate_count = models.PositiveIntegerField(default=0)
+    pruned_count = models.PositiveIntegerField(default=0)  # candidates not scored
+    succeeded = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name_plural = "Pipeline Metrics"
+
+    def __str__(self) -> str:
+        return f"{self.attachment_id}: {sum(self.stage_timings.values()):.2f}s"
+
+
+class PlagiarismRescan(models.Model):
+    """Progress of a `plagiarism_rescan` run, to resume it after an interruption"""
+
+    _created_date = models.DateTimeField(auto_now_add=True)
+    _modified_date = models.DateTimeField(auto_now=True)
+
+    scope = models.CharField(max_length=255, unique=True)
+    last_relation_id = models.PositiveBigIntegerField(default=0)
+    processed = models.PositiveBigIntegerField(default=0)
+    failed = models.PositiveBigIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name_plural = "Plagiarism Rescans"
+
+    def __str__(self) -> str:
+        return f"{self.scope}: {self.processed} processed"
+
+
+class ClassworkHeatmap(models.Model):
+    """
+    Cached similarity matrix of all submissions of a classwork. `data` is cleared
+    and `version` bumped whenever a score between its submissions changes
+    """
+
+    _modified_date = models.DateTimeField(auto_now=True)
+
+    classwork = models.OneToOneField(
+        to=Classwork,
+        on_delete=models.CASCADE,
+        related_name="classwork_plagiarism_heatmap",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    data = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Classwork Heatmaps"
+
+    def __str__(self) -> str:
+        return f"{self.classwork_id}: v{self.version}"
+
+
+class ClassworkBoilerplate(models.Model):
+    """
+    Hashed k-grams of the template of a classwork i.e. its title, description and
+    attachments, ignored when scoring its submissions. Deleted whenever they change
+    """
+
+    _created_date = models.DateTimeField(auto_now_add=True)
+
+    classwork = models.OneToOneField(
+        to=Classwork,
+        on_delete=models.CASCADE,
+        related_name="classwork_plagiarism_boilerplate",
+    )
+    kgrams = models.BinaryField()  # sorted distinct uint64 k-gram ids
+
+    class Meta:
+        verbose_name_plural = "Classwork Boilerplates"
+
+    def __str__(self) -> str:
+        return f"{self.classwork_id}: {len(self.kgrams) // 8} k-grams"
+
+
+class SubmissionDocument(models.Model):
+    """
+    Tokens and model of all analysed (prose) attachments and the answer of a
+    submission, merged into the one document it is scored as. `sources` is the
+    hash of what it was built from, it is rebuilt once they change
+    """
+
+    _modified_date = models.DateTimeField(auto_now=True)
+
+    submission = models.OneToOneField(
+        to=Submission,
+        on_delete=models.CASCADE,
+        related_name="submission_plagiarism_document",
+    )
+    sources = models.CharField(max_length=64)
+    tokenized_dump = models.CharField(max_length=1000)
+    model_dump = models.CharField(max_length=1000)
+
+    class Meta:
+        verbose_name_plural = "Submission Documents"
+
+    def __str__(self) -> str:
+        return f"{self.submission_id}: {self.sources[:8]}"
+
+
+class CollusionAnalysis(models.Model):
+    """
+    Clusters of a classwork or classroom (`scope`) found at `threshold`, up to date
+    while `versions` matches the heatmap versions of its classworks
+    """
+
+    _modified_date = models.DateTimeField(auto_now=True)
+
+    scope = models.CharField(max_length=255, unique=True)
+    threshold = models.FloatField()
+    versions = models.CharField(max_length=64)
+
+    class Meta:
+        verbose_name_plural = "Collusion Analyses"
+
+    def __str__(self) -> str:
+        return f"{self.scope}: {self.threshold}%"
+
+
+class CollusionCluster(models.Model):
+    """
+    Group of submissions linked by scores of at least the analysis' threshold.
+    `submissions` are dict(id, submitter=dict(id, username))
+    """
+
+    analysis = models.ForeignKey(
+        to=CollusionAnalysis,
+        on_delete=models.CASCADE,
+        related_name="analysis_cluster",
+    )
+    size = models.PositiveIntegerField()
+    edge_count = models.PositiveIntegerField()
+    density = models.FloatField()  # share of the member pairs linked
+    max_percentage = models.FloatField()
+    mean_percentage = models.FloatField()
+    submissions = models.JSONField()
+
+    class Meta:
+        verbose_name_plural = "Collusion Clusters"
+
+    def __str__(self) -> str:
+        return f"{self.analysis_id}: {self.size} submissions"
+
+
+class MatchedSpans(models.Model):
+    """
+    Cached passages shared by the two submissions of a plagiarism pair. Valid as
+    long as `sources`, the hash of the dumps, answers and template they were
+    located in, matches
+    """
+
+    _created_date = models.DateTimeField(auto_now_add=True)
+
+    plagiarism = models.OneToOneField(
+        to=PlagiarismInfo,
+        on_delete=models.CASCADE,
+        related_name="plagiarism_matched_spans",
+    )
+    sources = models.CharField(max_length=64)
+    spans = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name_plural = "Matched Spans"
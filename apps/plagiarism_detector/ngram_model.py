@@ -0,0 +1,300 @@
+"""
+Compact Witten-Bell interpolated n-gram language model.
+
+Replaces pickled `nltk.lm.WittenBellInterpolated` models. Every n-gram is stored
+as a hashed uint64 id in sorted arrays along with its count and, when used as a
+context, the totals Witten-Bell needs. The arrays are saved as `.npy` files and
+memory mapped on load, lookups are binary searches. Scores are the same as the
+nltk model trained on the same everygrams.
+"""
+import os
+from itertools import islice
+
+import numpy as np
+
+from apps.plagiarism_detector.hashing import hash_ngrams, hash_tokens
+
+_ARRAYS = [
+    "ngram_ids",
+    "ngram_counts",
+    "ngram_offsets",
+    "context_totals",
+    "context_nplus",
+]
+
+
+def _search(section: np.ndarray, item):
+    """index of item in a sorted array section or -1"""
+
+    index = np.searchsorted(section, item)
+    if index < len(section) and section[index] == item:
+        return int(index)
+    return -1
+
+
+FIT_BLOCK_SIZE = 1 << 18
+
+
+def iter_blocks(tokens, size=FIT_BLOCK_SIZE):
+    """splits a token iterable into lists of at most `size` tokens"""
+
+    tokens = iter(tokens)
+    while True:
+        block = list(islice(tokens, size))
+        if not block:
+            return
+        yield block
+
+
+def _shrink(counts):
+    # smallest unsigned type holding every count, mostly uint8 or uint16
+    return counts.astype(np.min_scalar_type(int(counts.max(initial=0))))
+
+
+def _concatenate(sections):
+    if not sections:
+        return np.empty(0, dtype=np.uint8)
+    return np.concatenate(sections)
+
+
+class NgramCounter:
+    """
+    Counts the 1 to `order` grams of a token sequence fed a block at a time.
+    Between blocks only the distinct n-grams, their counts and context totals
+    and the last `order - 1` token hashes are kept, so fitting never holds the
+    hashes or windows of the whole sequence
+    """
+
+    def __init__(self, order):
+        self.order = order
+        self.tail = np.empty(0, dtype=np.uint64)
+
+        # sorted distinct k-grams at index k - 1, the totals of the orders
+        # below `order` aligned with them
+        self.ngram_ids = [np.empty(0, dtype=np.uint64) for k in range(order)]
+        self.ngram_counts = [np.empty(0, dtype=np.uint32) for k in range(order)]
+        self.context_totals = [np.empty(0, dtype=np.uint32) for k in range(order - 1)]
+        self.context_nplus = [np.empty(0, dtype=np.uint32) for k in range(order - 1)]
+
+    def update(self, tokens):
+        """counts the n-grams ending in given tokens, following the previous block"""
+
+        hashes = np.concatenate([self.tail, hash_tokens(tokens)])
+        context_index = None
+
+        for k in range(1, self.order + 1):
+            # windows ending in the tail are known and were counted with the
+            # previous block, they only serve as contexts here
+            windows = hash_ngrams(hashes, k)
+            counted = max(len(self.tail) - k + 1, 0)
+            ids, first_index, inverse = np.unique(
+                windows, return_index=True, return_inverse=True
+            )
+            counts = np.bincount(inverse[counted:], minlength=len(ids))
+            counts = counts.astype(np.uint32)
+
+            known = self.ngram_ids[k - 1]
+            position = np.searchsorted(known, ids)
+            seen = position < len(known)
+            seen[seen] = known[position[seen]] == ids[seen]
+            new = ~seen
+
+            if k > 1:
+                # the (k - 1)-gram starting a window is its context, the one at
+                # the same index of the previous order
+                contexts = context_index[: len(windows)]
+                size = len(self.ngram_ids[k - 2])
+                self.context_totals[k - 2] += np.bincount(
+                    contexts[counted:], minlength=size
+                ).astype(np.uint32)
+                self.context_nplus[k - 2] += np.bincount(
+                    contexts[first_index[new]], minlength=size
+                ).astype(np.uint32)
+
+            self.ngram_counts[k - 1][position[seen]] += counts[seen]
+            self.ngram_ids[k - 1] = np.insert(known, position[new], ids[new])
+            self.ngram_counts[k - 1] = np.insert(
+                self.ngram_counts[k - 1], position[new], counts[new]
+            )
+            if k < self.order:
+                self.context_totals[k - 1] = np.insert(
+                    self.context_totals[k - 1], position[new], 0
+                )
+                self.context_nplus[k - 1] = np.insert(
+                    self.context_nplus[k - 1], position[new], 0
+                )
+
+            # index of every window among the k-grams, shifted by the new
+            # k-grams inserted before it
+            context_index = (position + np.cumsum(new) - new)[inverse]
+
+        self.tail = hashes[max(len(hashes) - self.order + 1, 0) :]
+
+    def model(self):
+        """the `CompactNgramModel` of the tokens counted so far"""
+
+        return CompactNgramModel(
+            ngram_ids=_concatenate(self.ngram_ids),
+            ngram_counts=_shrink(_concatenate(self.ngram_counts)),
+            ngram_offsets=np.cumsum([0] + [len(section) for section in self.ngram_ids]),
+            context_totals=_shrink(_concatenate(self.context_totals)),
+            context_nplus=_shrink(_concatenate(self.context_nplus)),
+        )
+
+
+class CompactNgramModel:
+    """
+    Array backed Witten-Bell interpolated n-gram model
+
+    Orders are stored back to back, `ngram_offsets[k - 1]` and `ngram_offsets[k]`
+    bounding the section of k-grams. `context_totals` and `context_nplus` are
+    aligned with the n-grams of orders below `order`, holding the total and the
+    distinct number of words following each of them (0 if none)
+    """
+
+    def __init__(
+        self, ngram_ids, ngram_counts, ngram_offsets, context_totals, context_nplus
+    ):
+        self.ngram_ids = ngram_ids
+        self.ngram_counts = ngram_counts
+        self.ngram_offsets = ngram_offsets
+        self.context_totals = context_totals
+        self.context_nplus = context_nplus
+
+        self.order = len(ngram_offsets) - 1
+        self.unigram_total = int(
+            ngram_counts[ngram_offsets[0] : ngram_offsets[1]].sum()
+        )
+
+    @classmethod
+    def fit(cls, training_data, order):
+        """counts every 1 to `order` gram of a (padded) token sequence"""
+
+        counter = NgramCounter(order)
+        for block in iter_blocks(training_data):
+            counter.update(block)
+        return counter.model()
+
+    def save(self, path):
+        """saves the arrays as `.npy` files inside directory `path`"""
+
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """loads a saved model, memory mapping the arrays by default"""
+
+        mmap_mode = "r" if mmap else None
+        return cls(
+            **{
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                for name in _ARRAYS
+            }
+        )
+
+    def _ngram_section(self, k):
+        return self.ngram_ids[self.ngram_offsets[k - 1] : self.ngram_offsets[k]]
+
+    def count(self, ngram_id, k) -> int:
+        """count of a hashed k-gram"""
+
+        index = _search(self._ngram_section(k), ngram_id)
+        if index < 0:
+            return 0
+        return int(self.ngram_counts[self.ngram_offsets[k - 1] + index])
+
+    def context(self, context_id, k):
+        """(total, distinct) words following a hashed context of length k"""
+
+        index = _search(self._ngram_section(k), context_id)
+        if index < 0:
+            return 0, 0
+
+        index += self.ngram_offsets[k - 1]
+        return int(self.context_totals[index]), int(self.context_nplus[index])
+
+    def score(self, word, context=None):
+        """
+        Witten-Bell interpolated probability of word given context, same as
+        `nltk.lm.WittenBellInterpolated.score`
+        """
+
+        context = (
+            list(context)[-(self.order - 1) :] if context and self.order > 1 else []
+        )
+        hashes = hash_tokens(context + [word])
+        word_hash = hashes[-1]
+
+        if self.unigram_total == 0:
+            return 0.0
+
+        probability = self.count(word_hash, 1) / self.unigram_total
+
+        for k in range(1, len(context) + 1):
+            context_id = hash_ngrams(hashes[-1 - k : -1], k)[0]
+            total, nplus = self.context(context_id, k)
+
+            # unseen context, defer to the lower order
+            if total == 0:
+                continue
+
+            ngram_id = hash_ngrams(hashes[-1 - k :], k + 1)[0]
+            alpha = self.count(ngram_id, k + 1) / total
+            gamma = nplus / (nplus + total)
+            probability = (1.0 - gamma) * alpha + gamma * probability
+
+        return probability
+
+    def _lookup(self, ids, k, values):
+        """values aligned with the hashed k-grams `ids`, 0 for unseen ones"""
+
+        start, end = self.ngram_offsets[k - 1], self.ngram_offsets[k]
+        section = self.ngram_ids[start:end]
+
+        index = np.searchsorted(section, ids)
+        found = index < len(section)
+        found[found] = section[index[found]] == ids[found]
+
+        result = np.zeros(len(ids), dtype=np.float64)
+        result[found] = values[start + index[found]]
+        return result
+
+    def score_sequence(self, tokens, n=None):
+        """
+        Scores every token from position `n - 1` on given the `n - 1` tokens before
+        it, all at once. Same as calling `score` in a loop over the sequence
+
+        Returns
+        ---
+        float64 array of probabilities
+        """
+
+        n = n or self.order
+        hashes = hash_tokens(tokens)
+        length = len(hashes) - n + 1
+
+        if length <= 0:
+            return np.empty(0, dtype=np.float64)
+        if self.unigram_total == 0:
+            return np.zeros(length, dtype=np.float64)
+
+        words = hashes[n - 1 :]
+        probability = self._lookup(words, 1, self.ngram_counts) / self.unigram_total
+
+        for k in range(1, min(n, self.order)):
+            # k tokens before every scored word and the k + 1 grams ending at it
+            context_ids = hash_ngrams(hashes, k)[n - 1 - k : -1]
+            ngram_ids = hash_ngrams(hashes, k + 1)[n - 1 - k :]
+
+            total = self._lookup(context_ids, k, self.context_totals)
+            nplus = self._lookup(context_ids, k, self.context_nplus)
+            seen = total > 0
+
+            alpha = self._lookup(ngram_ids[seen], k + 1, self.ngram_counts)
+            alpha /= total[seen]
+            gamma = nplus[seen] / (nplus[seen] + total[seen])
+            probability[seen] = (1.0 - gamma) * alpha + gamma * probability[seen]
+
+        return probability
@@ -0,0 +1,117 @@
+"""
+Bounded process pool for the CPU bound stages of the plagiarism pipeline i.e.
+text extraction and model building, which are pure python and would otherwise
+serialize behind the GIL.
+
+Every task has a time limit and every pool process a memory limit. A task
+running over its time limit gets the whole pool killed and recreated, so a
+pathological document can't hold on to a pool process.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+from apps.core.exceptions import TimeLimitExceededError
+from configs.definitions import (
+    PLAGIARISM_TASK_MEMORY_LIMIT,
+    PLAGIARISM_TASK_TIMEOUT,
+    PLAGIARISM_WORKER_PROCESSES,
+)
+
+_executor = None
+_max_workers = PLAGIARISM_WORKER_PROCESSES
+_lock = threading.Lock()
+
+
+def _init_process(memory_limit):
+    """sets up django and the address space limit of a pool process"""
+
+    import django
+
+    django.setup()
+
+    if resource is not None and memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def configure_pool(max_workers: int):
+    """sets the number of pool processes, recreating a running pool"""
+
+    global _max_workers
+
+    _max_workers = max(max_workers, 1)
+    reset_pool()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """the pool of this process, created on first use"""
+
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            # spawned, forking a process running worker threads is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=_max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(PLAGIARISM_TASK_MEMORY_LIMIT,),
+            )
+        return _executor
+
+
+def reset_pool(executor=None):
+    """
+    kills the processes of given pool (the current one by default), the next
+    task starts a new pool
+    """
+
+    global _executor
+
+    with _lock:
+        if executor is None:
+            executor = _executor
+        if _executor is executor:
+            _executor = None
+
+    if executor is None:
+        return
+
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_in_pool(func, *args, timeout: float = PLAGIARISM_TASK_TIMEOUT):
+    """
+    Runs `func(*args)` in the pool and returns its result. `func` must be a module
+    level function, its arguments and result picklable.
+
+    Raises TimeLimitExceededError when the task takes longer than `timeout`
+    seconds. Tasks running in the pool at that time fail with BrokenProcessPool
+    """
+
+    executor = get_pool()
+    future = executor.submit(func, *args)
+
+    try:
+        return future.result(timeout=timeout)
+
+    except FutureTimeoutError:
+        reset_pool(executor)
+        raise TimeLimitExceededError(
+            cause=func.__name__,
+            message="Time limit exceeded",
+            verbose=f"{func.__name__} took longer than {timeout} seconds",
+        )
+
+    except BrokenProcessPool:
+        reset_pool(executor)
+        raise
@@ -0,0 +1,154 @@
+"""
+Bulk re-analysis of already submitted attachments, run by `manage.py
+plagiarism_rescan` e.g. after tuning thresholds or fixing the detector.
+
+Relations are streamed in id order and analysed by a bounded number of threads,
+each feeding the process pool. The id below which every relation is done is
+checkpointed as a `PlagiarismRescan`, so an interrupted rescan of the same scope
+picks up where it stopped.
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+from apps.classroom_contents.models import SubmissionHasAttachment
+from apps.plagiarism_detector.models import PlagiarismRescan
+from apps.plagiarism_detector.utils import analyse_attachment
+
+CHECKPOINT_INTERVAL = 5  # seconds
+ITERATOR_CHUNK_SIZE = 500
+
+
+def get_rescan_relations(
+    classwork_ids=None, classroom_ids=None, since=None, until=None
+):
+    """
+    submission attachments to rescan, filtered by classwork, classroom and the
+    date of submission (inclusive)
+    """
+
+    classwork = "submission__submission_classwork__classwork"
+    relations = SubmissionHasAttachment.objects.filter(
+        **{f"{classwork}__isnull": False}
+    )
+
+    if classwork_ids:
+        relations = relations.filter(**{f"{classwork}__in": classwork_ids})
+    if classroom_ids:
+        relations = relations.filter(
+            **{f"{classwork}__classwork_classroom__classroom__in": classroom_ids}
+        )
+    if since:
+        relations = relations.filter(submission___created_date__date__gte=since)
+    if until:
+        relations = relations.filter(submission___created_date__date__lte=until)
+
+    return relations.distinct().order_by("id")
+
+
+def get_rescan_scope(classwork_ids=None, classroom_ids=None, since=None, until=None):
+    """key identifying the checkpoint of a rescan with the same filters"""
+
+    def ids(values):
+        return ",".join(str(value) for value in sorted(values or []))
+
+    return (
+        f"classworks={ids(classwork_ids)};classrooms={ids(classroom_ids)};"
+        f"since={since or ''};until={until or ''}"
+    )[:255]
+
+
+def _analyse_relation(relation):
+    """analyses a relation in a rescan thread, closing the thread's connections"""
+
+    try:
+        analyse_attachment(relation.attachment, relation.submission)
+    finally:
+        connections.close_all()
+
+
+class Rescan:
+    """
+    Analyses the relations of a scope again with `workers` concurrent attachments,
+    calling `on_progress(rescan)` after every checkpoint
+    """
+
+    def __init__(self, relations, scope, workers, restart=False, on_progress=None):
+        self.checkpoint, _ = PlagiarismRescan.objects.get_or_create(scope=scope)
+        if restart or self.checkpoint.finished:
+            self.checkpoint.last_relation_id = 0
+            self.checkpoint.processed = self.checkpoint.failed = 0
+            self.checkpoint.finished = False
+            self.checkpoint.save()
+
+        self.relations = relations.filter(id__gt=self.checkpoint.last_relation_id)
+        self.workers = workers
+        self.on_progress = on_progress
+
+        self.errors = []
+        self.total = None
+        self.done = 0
+        self.started = None
+
+    @property
+    def throughput(self):
+        """attachments per second since the start of this run"""
+
+        elapsed = time.perf_counter() - self.started
+        return self.done / elapsed if elapsed else 0.0
+
+    def _save_checkpoint(self):
+        self.checkpoint.save()
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+    def _complete(self, relation_id, future):
+        """records a finished relation, they complete in order of their ids"""
+
+        try:
+            future.result()
+        except Exception as e:
+            self.checkpoint.failed += 1
+            self.errors.append((relation_id, e))
+
+        self.checkpoint.processed += 1
+        self.checkpoint.last_relation_id = relation_id
+        self.done += 1
+
+    def run(self):
+        self.total = self.relations.count()
+        self.started = time.perf_counter()
+        last_checkpoint = time.monotonic()
+
+        pending = deque()
+        relations = self.relations.select_related("attachment", "submission")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for relation in relations.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+                    pending.append(
+                        (relation.id, executor.submit(_analyse_relation, relation))
+                    )
+
+                    # bounded, so the whole scope is never held in memory
+                    while len(pending) >= 2 * self.workers or (
+                        pending and pending[0][1].done()
+                    ):
+                        self._complete(*pending.popleft())
+
+                    if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                        self._save_checkpoint()
+                        last_checkpoint = time.monotonic()
+
+                while pending:
+                    self._complete(*pending.popleft())
+
+            self.checkpoint.finished = True
+
+        finally:
+            # also when interrupted, everything up to the checkpoint is done
+            self._save_checkpoint()
+
+        return self.checkpoint
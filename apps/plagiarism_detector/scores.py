@@ -0,0 +1,172 @@
+"""
+Storage of plagiarism scores.
+
+Every pair of submissions has at most one `PlagiarismInfo` per method, keyed by
+the pair with the lower submission id first. The score of the lower id against
+the higher one is `percentage_plagiarized`, the other direction
+`percentage_plagiarized_reverse`, so both directions of a pair live in the same
+row and are written with a single upsert, whichever order they are computed in.
+
+The pairs of a submission are read as `SubmissionPairs`, one side per column,
+since a lookup of either column can't be served by one index.
+"""
+from collections import defaultdict
+from copy import copy
+
+from django.db.models import Q
+
+from apps.plagiarism_detector.heatmap import invalidate_heatmaps
+from apps.plagiarism_detector.models import PlagiarismInfo
+
+BULK_BATCH_SIZE = 1000
+
+UNIQUE_FIELDS = ["submission_agent", "submission_target", "method"]
+
+
+def canonical_pair(agent_id, target_id):
+    """
+    (lower id, higher id, field) where field holds the score of `agent_id`
+    against `target_id`
+    """
+
+    if agent_id < target_id:
+        return agent_id, target_id, "percentage_plagiarized"
+    return target_id, agent_id, "percentage_plagiarized_reverse"
+
+
+class SubmissionPairs:
+    """
+    Pairs of a submission, i.e. the union of its pairs as agent and as target.
+    Filtering both columns with OR takes a bitmap of both indexes and a sort of
+    every matched row, so each side is a lookup on the index of its own column
+    and the sides are merged with UNION ALL, in one query. Filters and ordering
+    apply to both sides, and a slice limits each side to the rows it could
+    contribute, so reading a page reads no more than the page from either index
+    """
+
+    def __init__(self, submission_id, queryset=None):
+        queryset = PlagiarismInfo.objects.all() if queryset is None else queryset
+
+        self.queryset = queryset
+        self.sides = [
+            queryset.filter(submission_agent=submission_id),
+            queryset.filter(submission_target=submission_id),
+        ]
+        self.ordering = ()
+
+    def _clone(self, sides, ordering):
+        clone = copy(self)
+        clone.sides, clone.ordering = sides, ordering
+        return clone
+
+    def filter(self, *args, **kwargs):
+        sides = [side.filter(*args, **kwargs) for side in self.sides]
+        return self._clone(sides, self.ordering)
+
+    def order_by(self, *ordering):
+        sides = [side.order_by(*ordering) for side in self.sides]
+        return self._clone(sides, ordering)
+
+    def __getitem__(self, item):
+        """rows of a slice of the merged ordering, a queryset"""
+
+        if not isinstance(item, slice):
+            raise TypeError("SubmissionPairs only supports slicing")
+
+        if item.stop is None:
+            first, second = [side.order_by().values("id") for side in self.sides]
+        else:
+            # sliced queries can't be combined on every database, so each is
+            # wrapped in a lookup of its ids
+            first, second = [
+                PlagiarismInfo.objects.filter(
+                    id__in=side[: item.stop].values("id")
+                ).values("id")
+                for side in self.sides
+            ]
+        rows = self.queryset.filter(id__in=first.union(second, all=True))
+
+        return rows.order_by(*self.ordering)[item]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def upsert_plagiarism_infos(scores, method=PlagiarismInfo.MethodChoices.LANGUAGE_MODEL):
+    """
+    creates or updates the scores of many submission pairs at once, with one
+    upsert per set of directions written, leaving the directions not given as
+    they are
+
+    scores: {(agent submission id, target submission id): percentage}
+    """
+
+    pairs = defaultdict(dict)
+    for (agent, target), percentage in scores.items():
+        if agent == target:
+            continue
+        lower, higher, field = canonical_pair(agent, target)
+        pairs[(lower, higher)][field] = percentage
+
+    # rows of a bulk upsert must update the same fields
+    groups = defaultdict(list)
+    for (lower, higher), fields in pairs.items():
+        groups[tuple(sorted(fields))].append(
+            PlagiarismInfo(
+                submission_agent_id=lower,
+                submission_target_id=higher,
+                method=method,
+                **fields,
+            )
+        )
+
+    for fields, infos in groups.items():
+        PlagiarismInfo.objects.bulk_create(
+            infos,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=list(fields),
+        )
+
+    invalidate_heatmaps({submission for pair in pairs for submission in pair})
+
+
+def clear_plagiarism_scores(submission_id, kept_ids, method, reverse=False):
+    """
+    nulls the score of a submission against every submission not in `kept_ids`
+    by given method, leaving the other direction of the pairs as it is unless
+    `reverse` is set. Pairs left without a score in either direction are deleted
+    """
+
+    infos = PlagiarismInfo.objects.filter(method=method)
+    as_agent = infos.filter(submission_agent=submission_id).exclude(
+        submission_target__in=kept_ids
+    )
+    as_target = infos.filter(submission_target=submission_id).exclude(
+        submission_agent__in=kept_ids
+    )
+
+    cleared = {submission_id}
+    cleared.update(as_agent.values_list("submission_target", flat=True))
+    cleared.update(as_target.values_list("submission_agent", flat=True))
+
+    # the submission's direction is the one of its side of the canonical pair
+    if reverse:
+        as_agent.update(
+            percentage_plagiarized=None, percentage_plagiarized_reverse=None
+        )
+        as_target.update(
+            percentage_plagiarized=None, percentage_plagiarized_reverse=None
+        )
+    else:
+        as_agent.update(percentage_plagiarized=None)
+        as_target.update(percentage_plagiarized_reverse=None)
+
+    infos.filter(
+        Q(submission_agent=submission_id) | Q(submission_target=submission_id),
+        percentage_plagiarized__isnull=True,
+        percentage_plagiarized_reverse__isnull=True,
+    ).delete()
+
+    invalidate_heatmaps(cleared)
@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.classroom_contents.models import (
+    Classwork,
+    ClassworkHasAttachment,
+    ClassworkHasSubmission,
+)
+from apps.plagiarism_detector.boilerplate import invalidate_boilerplate
+from apps.plagiarism_detector.heatmap import (
+    invalidate_classwork_heatmaps,
+    invalidate_heatmaps,
+)
+from apps.plagiarism_detector.models import PlagiarismInfo
+
+
+@receiver(post_save, sender=PlagiarismInfo)
+@receiver(post_delete, sender=PlagiarismInfo)
+def plagiarism_info_changed(sender, instance, **kwargs):
+    """
+    Reciever function for PlagiarismInfo model post save and delete, also of
+    rows deleted along with a submission. Bulk writes send no signal, they
+    invalidate the heatmaps themselves
+    """
+
+    invalidate_heatmaps([instance.submission_agent_id, instance.submission_target_id])
+
+
+@receiver(post_save, sender=ClassworkHasSubmission)
+@receiver(post_delete, sender=ClassworkHasSubmission)
+def classwork_submission_changed(sender, instance, **kwargs):
+    """
+    Reciever function for ClassworkHasSubmission model post save and delete, the
+    classwork's submissions changed
+    """
+
+    # by classwork, a deleted relation no longer joins it to the submission
+    invalidate_classwork_heatmaps([instance.classwork_id])
+
+
+@receiver(post_save, sender=Classwork)
+def classwork_post_save(sender, instance, created, **kwargs):
+    """
+    Reciever function for Classwork model post save, its title or description
+    may have changed
+    """
+
+    if not created:
+        invalidate_boilerplate(instance.id)
+
+
+@receiver(post_save, sender=ClassworkHasAttachment)
+@receiver(post_delete, sender=ClassworkHasAttachment)
+def classwork_attachment_changed(sender, instance, **kwargs):
+    """
+    Reciever function for ClassworkHasAttachment model post save and delete, the
+    classwork's template changed
+    """
+
+    invalidate_boilerplate(instance.classwork_id)
@@ -0,0 +1,139 @@
+"""
+Batch similarity of all submissions of a classwork.
+
+Every submission becomes a row of a sparse TF-IDF matrix of hashed word n-grams,
+so the cosine similarity of all pairs is a single sparse matrix product.
+"""
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+from apps.classroom_contents.models import (
+    ClassworkHasSubmission,
+    SubmissionHasAttachment,
+)
+from apps.plagiarism_detector.hashing import PAD_SYMBOL
+from apps.plagiarism_detector.jobs import JobStatus, enqueue_plagiarism_job
+from apps.plagiarism_detector.models import PlagiarismInfo
+from apps.plagiarism_detector.scores import upsert_plagiarism_infos
+from apps.plagiarism_detector.utils import (
+    get_analysed_filter,
+    get_attachment_dumps,
+    get_classwork_boilerplate,
+    has_attachment_dumps,
+    joblib_load,
+    strip_attachment_boilerplate,
+)
+from configs.definitions import PLAGIARISM_TFIDF_MIN_SCORE
+
+TFIDF_NGRAM_SIZE = 3
+TFIDF_FEATURES = 2**20
+
+
+def _word_ngrams(tokens):
+    """analyzer of the vectorizer, documents are already tokenized"""
+
+    tokens = [token for token in tokens if token != PAD_SYMBOL]
+    n = TFIDF_NGRAM_SIZE
+
+    return [" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1)]
+
+
+def get_classwork_documents(classwork, rebuild_dumps=False):
+    """
+    tokenized content of every analysed submission of a classwork, without its
+    template. Evicted dumps are rebuilt in this process with `rebuild_dumps`,
+    otherwise their attachments are queued for analysis and their submissions
+    left out
+
+    Returns
+    ---
+    (submission ids, token lists) in matching order
+    """
+
+    submission_ids = ClassworkHasSubmission.objects.filter(
+        classwork=classwork
+    ).values_list("submission", flat=True)
+
+    relations = (
+        SubmissionHasAttachment.objects.filter(
+            get_analysed_filter(), submission__in=submission_ids
+        )
+        .select_related("attachment", "submission")
+        .order_by("submission", "attachment")
+    )
+
+    boilerplate = get_classwork_boilerplate(classwork)
+
+    documents, pending = {}, set()
+    for relation in relations:
+        if not rebuild_dumps and not has_attachment_dumps(relation.attachment):
+            if relation.attachment.plagiarism_status == JobStatus.DONE:  # evicted
+                enqueue_plagiarism_job(relation.attachment, relation.submission)
+            pending.add(relation.submission_id)
+            continue
+
+        tokenized_dump, _ = get_attachment_dumps(relation.attachment)
+        tokens = strip_attachment_boilerplate(
+            relation.attachment, joblib_load(tokenized_dump), boilerplate
+        )
+        documents.setdefault(relation.submission_id, []).extend(tokens)
+
+    for submission_id in pending:
+        documents.pop(submission_id, None)
+
+    return list(documents.keys()), list(documents.values())
+
+
+def get_tfidf_matrix(documents):
+    """l2 normalized sparse TF-IDF matrix, one row per document"""
+
+    counts = HashingVectorizer(
+        analyzer=_word_ngrams,
+        n_features=TFIDF_FEATURES,
+        alternate_sign=False,
+        norm=None,
+    ).transform(documents)
+
+    return TfidfTransformer(sublinear_tf=True).fit_transform(counts)
+
+
+def get_similarity_matrix(documents) -> np.ndarray:
+    """dense (documents x documents) cosine similarity matrix"""
+
+    tfidf_matrix = get_tfidf_matrix(documents)
+    return (tfidf_matrix @ tfidf_matrix.T).toarray()
+
+
+def analyse_classwork(classwork, rebuild_dumps=False) -> int:
+    """
+    Computes the similarity of every pair of submissions of a classwork and
+    replaces its previous TF-IDF results. Only pairs scoring at least
+    PLAGIARISM_TFIDF_MIN_SCORE are stored. Returns the number of pairs written
+    """
+
+    submission_ids, documents = get_classwork_documents(classwork, rebuild_dumps)
+    if len(documents) < 2:
+        return 0
+
+    similarity_matrix = get_similarity_matrix(documents)
+
+    # pairs which fell below the threshold are deleted along with the others
+    PlagiarismInfo.objects.filter(
+        method=PlagiarismInfo.MethodChoices.TFIDF,
+        submission_agent__in=submission_ids,
+        submission_target__in=submission_ids,
+    ).delete()
+
+    similar = similarity_matrix * 100 >= PLAGIARISM_TFIDF_MIN_SCORE
+    agent_index, target_index = np.nonzero(np.triu(similar, k=1))
+
+    # symmetric, both directions of a pair have the same score
+    scores = {}
+    for agent, target in zip(agent_index, target_index):
+        agent_id, target_id = submission_ids[agent], submission_ids[target]
+        percentage = float(similarity_matrix[agent, target]) * 100
+        scores[(agent_id, target_id)] = scores[(target_id, agent_id)] = percentage
+
+    upsert_plagiarism_infos(scores, method=PlagiarismInfo.MethodChoices.TFIDF)
+
+    return len(agent_index)
@@ -0,0 +1,196 @@
+"""
+Code mode of the plagiarism pipeline, for attachments which are source files.
+
+Cleaning strips the punctuation code is made of and a renamed variable changes
+every word k-gram it is in, so source files are lexed instead: Python with the
+`tokenize` module, anything else with a generic C-like lexer. Identifiers and
+literals are replaced by a placeholder per kind and comments and layout are
+dropped, keeping keywords and operators, i.e. the structure of the program. The
+normalized tokens are winnowed into compact fingerprints (see winnowing.py),
+no language model is trained.
+"""
+import io
+import keyword
+import os
+import re
+import sys
+import tokenize
+
+IDENTIFIER = "ID"
+NUMBER = "NUM"
+STRING = "STR"
+
+CODE_WINNOW_K = 15  # tokens per hashed k-gram, tokens of code are finer than words
+CODE_WINNOW_WINDOW = 8  # guarantees any match of 22 tokens
+
+PYTHON_EXTENSIONS = {".py", ".pyw"}
+C_LIKE_EXTENSIONS = {
+    ".c",
+    ".h",
+    ".cc",
+    ".cpp",
+    ".cxx",
+    ".hpp",
+    ".cs",
+    ".java",
+    ".kt",
+    ".scala",
+    ".js",
+    ".ts",
+    ".go",
+    ".rs",
+    ".swift",
+    ".php",
+}
+PYTHON_MIME_TYPES = {"text/x-python", "text/x-script.python"}
+C_LIKE_MIME_TYPES = {
+    "text/x-c",
+    "text/x-csrc",
+    "text/x-chdr",
+    "text/x-c++",
+    "text/x-c++src",
+    "text/x-c++hdr",
+    "text/x-csharp",
+    "text/x-java",
+    "text/x-java-source",
+    "text/x-kotlin",
+    "text/x-scala",
+    "text/x-go",
+    "text/x-rust",
+    "text/x-php",
+    "text/javascript",
+    "application/javascript",
+    "application/x-javascript",
+    "application/typescript",
+}
+
+C_LIKE_KEYWORDS = frozenset(
+    """
+    abstract auto bool boolean break byte case catch char class const continue
+    default delete do double else enum extends final finally float for fn func
+    function go if implements import include interface int let long match mut
+    namespace new null package private protected public return short signed
+    sizeof static struct super switch template this throw throws try typedef
+    union unsigned using var void volatile while yield
+    """.split()
+)
+
+C_LIKE_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z)|\#[^\n]*)
+    |(?P<string>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?|`(?:\\.|[^`\\])*`?)
+    |(?P<number>(?:0[xX][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)\w*)
+    |(?P<name>[A-Za-z_$][\w$]*)
+    |(?P<operator>>>>=|<<=|>>=|>>>|\.\.\.|->|=>|::|\+\+|--|&&|\|\||<<|>>|[-+*/%&|^!=<>]=?|[^\s\w])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_PYTHON_LAYOUT = {
+    tokenize.INDENT: "INDENT",
+    tokenize.DEDENT: "DEDENT",
+    tokenize.NEWLINE: "NEWLINE",
+}
+
+
+def _get_extension(name):
+    return os.path.splitext(name or "")[1].lower()
+
+
+def is_python(name, mime_type=None) -> bool:
+    return _get_extension(name) in PYTHON_EXTENSIONS or mime_type in PYTHON_MIME_TYPES
+
+
+def is_source_code(name, mime_type=None) -> bool:
+    """whether a file is source code, by its extension or mime type"""
+
+    return (
+        is_python(name, mime_type)
+        or _get_extension(name) in C_LIKE_EXTENSIONS
+        or mime_type in C_LIKE_MIME_TYPES
+    )
+
+
+def read_source_code(path) -> str:
+    """text of a source file, undecodable bytes replaced"""
+
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8", errors="replace")
+
+
+def lex_python(text):
+    """
+    normalized tokens of Python source with their character offsets, as (token,
+    start, end). Raises on code `tokenize` can't lex
+    """
+
+    # tokenize locates tokens by line and column
+    line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+
+    for token in tokenize.generate_tokens(io.StringIO(text).readline):
+        if token.type == tokenize.NAME:
+            string = token.string if keyword.iskeyword(token.string) else IDENTIFIER
+        elif token.type == tokenize.NUMBER:
+            string = NUMBER
+        elif token.type == tokenize.STRING:
+            string = STRING
+        elif token.type == tokenize.OP:
+            string = token.string
+        elif token.type in _PYTHON_LAYOUT:
+            string = _PYTHON_LAYOUT[token.type]
+        else:
+            continue
+
+        (start_row, start_column), (end_row, end_column) = token.start, token.end
+        yield (
+            string,
+            line_starts[start_row - 1] + start_column,
+            line_starts[end_row - 1] + end_column,
+        )
+
+
+def lex_c_like(text):
+    """
+    normalized tokens of C, Java, JavaScript... source with their character
+    offsets, as (token, start, end). Never raises
+    """
+
+    for match in C_LIKE_TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "name":
+            token = match.group()
+            string = token if token in C_LIKE_KEYWORDS else IDENTIFIER
+        elif kind == "number":
+            string = NUMBER
+        elif kind == "string":
+            string = STRING
+        elif kind == "operator":
+            string = match.group()
+        else:
+            continue
+
+        yield string, match.start(), match.end()
+
+
+def lex_code(text, name, mime_type=None) -> list:
+    """
+    (token, start, end) of every normalized token of a source file, Python lexed
+    by `tokenize` unless it isn't valid Python, anything else by the C-like lexer
+    """
+
+    if is_python(name, mime_type):
+        try:
+            return list(lex_python(text))
+        except (tokenize.TokenError, SyntaxError):
+            pass
+
+    return list(lex_c_like(text))
+
+
+def get_code_tokens(text, name, mime_type=None) -> list:
+    """
+    Normalized tokens of a source file (see `lex_code`). Tokens are interned,
+    few of them are distinct
+    """
+
+    return [sys.intern(token) for token, start, end in lex_code(text, name, mime_type)]
@@ -0,0 +1,318 @@
+"""
+Localization of the passages two documents share.
+
+Every k-gram of both token sequences is hashed with the rolling n-gram hash, the
+matching k-gram pairs are found with a sorted search and consecutive pairs on
+the same diagonal (same offset between the documents) are merged into maximal
+spans. The longest spans are kept first, so every token belongs to at most one
+span. All steps are array operations, linear up to the sort.
+
+Passages are located in what a pair was scored on, the classwork's template
+replaced by padding, which no passage spans. Prose is the merged document of
+each submission (see `get_submission_documents`), its offsets are token offsets
+in the attachment, or the answer, a passage is in, padding excluded. Source code
+is located in the normalized tokens of every pair of source files, its offsets
+are character offsets in the files, normalized tokens meaning nothing to a
+reader. `end` is exclusive.
+"""
+import hashlib
+
+import numpy as np
+
+from apps.classroom_contents.models import (
+    ClassworkHasSubmission,
+    Submission,
+    SubmissionHasAttachment,
+)
+from apps.plagiarism_detector.boilerplate import (
+    BOILERPLATE_CODE_K,
+    BOILERPLATE_K,
+    get_boilerplate_mask,
+    load_boilerplate,
+)
+from apps.plagiarism_detector.hashing import PAD_SYMBOL, hash_ngrams, hash_tokens
+from apps.plagiarism_detector.jobs import JobStatus, enqueue_plagiarism_job
+from apps.plagiarism_detector.models import MatchedSpans, PlagiarismInfo
+from apps.plagiarism_detector.source_code import (
+    CODE_WINNOW_K,
+    is_source_code,
+    lex_code,
+    read_source_code,
+)
+from apps.plagiarism_detector.utils import has_attachment_dumps, iter_document_parts
+
+SPAN_MIN_LENGTH = 8  # tokens
+CODE_SPAN_MIN_LENGTH = CODE_WINNOW_K  # normalized tokens, finer than words
+MAX_KGRAM_OCCURRENCES = 16  # k-grams repeated more often are boilerplate
+
+
+def _get_unpadded_kgrams(tokens, k) -> np.ndarray:
+    """whether every k-gram of the tokens is free of padding"""
+
+    padding = np.cumsum([0] + [token == PAD_SYMBOL for token in tokens])
+    return padding[k:] == padding[:-k]
+
+
+def find_matched_spans(tokens, other_tokens, min_length=SPAN_MIN_LENGTH):
+    """
+    Maximal passages of at least `min_length` tokens found in both token lists,
+    padding breaking passages
+
+    Returns
+    ---
+    list of (start, end, other start, other end), in order of start
+    """
+
+    kgrams = hash_ngrams(hash_tokens(tokens), min_length)
+    other_kgrams = hash_ngrams(hash_tokens(other_tokens), min_length)
+    if len(kgrams) == 0 or len(other_kgrams) == 0:
+        return []
+
+    # positions of every k-gram of the other document, padded ones left out
+    other_unpadded = _get_unpadded_kgrams(other_tokens, min_length)
+    order = np.flatnonzero(other_unpadded)[
+        np.argsort(other_kgrams[other_unpadded], kind="stable")
+    ]
+    sorted_kgrams = other_kgrams[order]
+    left = np.searchsorted(sorted_kgrams, kgrams, side="left")
+    counts = np.searchsorted(sorted_kgrams, kgrams, side="right") - left
+    counts[counts > MAX_KGRAM_OCCURRENCES] = 0
+    counts[~_get_unpadded_kgrams(tokens, min_length)] = 0
+
+    total = int(counts.sum())
+    if total == 0:
+        return []
+
+    # every matching (position, other position) pair
+    positions = np.repeat(np.arange(len(kgrams)), counts)
+    within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    other_positions = order[np.repeat(left, counts) + within]
+
+    # runs of consecutive positions on a diagonal are one passage
+    diagonals = other_positions - positions
+    index = np.lexsort((positions, diagonals))
+    positions, other_positions = positions[index], other_positions[index]
+    diagonals = diagonals[index]
+
+    breaks = (diagonals[1:] != diagonals[:-1]) | (positions[1:] != positions[:-1] + 1)
+    starts = np.flatnonzero(np.concatenate([[True], breaks]))
+    ends = np.concatenate([starts[1:], [len(positions)]]) - 1
+    lengths = positions[ends] - positions[starts]
+
+    # longest first, skipping passages overlapping an already kept one
+    covered = np.zeros(len(tokens), dtype=bool)
+    other_covered = np.zeros(len(other_tokens), dtype=bool)
+    spans = []
+
+    for run in np.argsort(-lengths, kind="stable"):
+        start, end = positions[starts[run]], positions[ends[run]] + min_length
+        other_start = other_positions[starts[run]]
+        other_end = other_positions[ends[run]] + min_length
+
+        if covered[start:end].any() or other_covered[other_start:other_end].any():
+            continue
+
+        covered[start:end] = True
+        other_covered[other_start:other_end] = True
+        spans.append((int(start), int(end), int(other_start), int(other_end)))
+
+    return sorted(spans)
+
+
+def _strip_template(tokens, boilerplate, k=BOILERPLATE_K):
+    ignored = get_boilerplate_mask(tokens, boilerplate, k)
+    return [PAD_SYMBOL if skip else token for token, skip in zip(tokens, ignored)]
+
+
+def _get_prose_document(attachments, answer, boilerplate):
+    """
+    tokens of a submission's document as scored, template tokens replaced by
+    padding in place, with the attachment (None for the answer) and the offset in
+    it, padding excluded, of every token
+    """
+
+    parts = list(
+        iter_document_parts(
+            [attachment.tokenized_dump for attachment in attachments], answer
+        )
+    )
+    owners = [attachment.id for attachment in attachments] + [None]
+    tokens = [token for part in parts for token in part]
+
+    lengths = [len(part) for part in parts]
+    part_indexes = np.repeat(np.arange(len(parts)), lengths)
+    part_starts = np.cumsum([0] + lengths[:-1], dtype=np.int64)
+
+    # unpadded tokens before every token, and before the start of its part
+    unpadded = np.array([token != PAD_SYMBOL for token in tokens], dtype=np.int64)
+    before = np.concatenate([np.cumsum(unpadded) - unpadded, [unpadded.sum()]])
+    offsets = before[:-1] - before[part_starts][part_indexes]
+
+    return (
+        _strip_template(tokens, boilerplate),
+        [owners[index] for index in part_indexes],
+        offsets,
+    )
+
+
+def _compute_prose_spans(
+    attachments, answer, other_attachments, other_answer, boilerplate
+):
+    tokens, owners, offsets = _get_prose_document(attachments, answer, boilerplate)
+    other_tokens, other_owners, other_offsets = _get_prose_document(
+        other_attachments, other_answer, boilerplate
+    )
+
+    return [
+        dict(
+            agent_attachment=owners[start],
+            target_attachment=other_owners[other_start],
+            start=int(offsets[start]),
+            end=int(offsets[end - 1]) + 1,
+            target_start=int(other_offsets[other_start]),
+            target_end=int(other_offsets[other_end - 1]) + 1,
+            text=" ".join(tokens[start:end]),
+        )
+        for start, end, other_start, other_end in find_matched_spans(
+            tokens, other_tokens
+        )
+    ]
+
+
+def _get_source_code(attachment, boilerplate):
+    """
+    normalized tokens of a source file as fingerprinted, template tokens replaced
+    by padding in place, with the text and the character offsets of every token
+    """
+
+    text = read_source_code(attachment.attachment.path)
+    lexed = lex_code(text, attachment.attachment.name, attachment.mime_type)
+    tokens = [token for token, start, end in lexed]
+
+    return (
+        _strip_template(tokens, boilerplate, BOILERPLATE_CODE_K),
+        text,
+        [(start, end) for token, start, end in lexed],
+    )
+
+
+def _compute_code_spans(attachments, other_attachments, boilerplate):
+    spans = []
+    for attachment in attachments:
+        tokens, text, offsets = _get_source_code(attachment, boilerplate)
+
+        for other_attachment in other_attachments:
+            other_tokens, other_text, other_offsets = _get_source_code(
+                other_attachment, boilerplate
+            )
+            for start, end, other_start, other_end in find_matched_spans(
+                tokens, other_tokens, CODE_SPAN_MIN_LENGTH
+            ):
+                start, end = offsets[start][0], offsets[end - 1][1]
+                other_start = other_offsets[other_start][0]
+                other_end = other_offsets[other_end - 1][1]
+                spans.append(
+                    dict(
+                        agent_attachment=attachment.id,
+                        target_attachment=other_attachment.id,
+                        start=start,
+                        end=end,
+                        target_start=other_start,
+                        target_end=other_end,
+                        text=text[start:end],
+                    )
+                )
+
+    return spans
+
+
+def _get_sources(sides, answers, boilerplate) -> str:
+    """hash of what the spans of a pair are located in"""
+
+    sources = [
+        attachment.tokenized_dump for attachments in sides for attachment in attachments
+    ] + answers
+    if boilerplate is not None:
+        sources.append(hashlib.sha256(boilerplate.tobytes()).hexdigest())
+
+    return hashlib.sha256("\n".join(sources).encode("utf-8")).hexdigest()
+
+
+def get_plagiarism_spans(plagiarism_info):
+    """
+    passages shared by the submissions of a plagiarism pair, located in what the
+    pair was scored on (see module docstring), offsets without prefix being of
+    the agent's `agent_attachment` and `target_` ones of the target's. Cached
+    until a submission or the template changes. None while an attachment is being
+    analysed, attachments whose dumps were evicted being queued for analysis
+    rather than rebuilt in the request
+    """
+
+    submission_ids = [
+        plagiarism_info.submission_agent_id,
+        plagiarism_info.submission_target_id,
+    ]
+    relations = SubmissionHasAttachment.objects.filter(
+        submission__in=submission_ids
+    ).select_related("attachment", "submission")
+
+    attachments, pending = {}, False
+    for relation in relations:
+        attachment = relation.attachment
+        if has_attachment_dumps(attachment):
+            attachments.setdefault(relation.submission_id, []).append(attachment)
+        elif attachment.plagiarism_status == JobStatus.DONE:  # evicted
+            enqueue_plagiarism_job(attachment, relation.submission)
+            pending = True
+        elif attachment.plagiarism_status in [JobStatus.QUEUED, JobStatus.RUNNING]:
+            pending = True
+
+    if pending:
+        return None
+
+    # source files are fingerprinted one by one, prose and answer merged
+    code = plagiarism_info.method == PlagiarismInfo.MethodChoices.CODE_FINGERPRINTS
+    sides = [
+        sorted(
+            (
+                attachment
+                for attachment in attachments.get(submission_id, [])
+                if is_source_code(attachment.attachment.name, attachment.mime_type)
+                == code
+            ),
+            key=lambda attachment: attachment.id,
+        )
+        for submission_id in submission_ids
+    ]
+    answers = dict(
+        Submission.objects.filter(id__in=submission_ids).values_list("id", "answer")
+    )
+    answers = [
+        "" if code else answers[submission_id] for submission_id in submission_ids
+    ]
+    boilerplate = load_boilerplate(
+        ClassworkHasSubmission.objects.filter(submission__in=submission_ids)
+        .values_list("classwork", flat=True)
+        .first()
+    )
+
+    sources = _get_sources(sides, answers, boilerplate)
+    cached = (
+        MatchedSpans.objects.filter(plagiarism=plagiarism_info, sources=sources)
+        .values_list("spans", flat=True)
+        .first()
+    )
+    if cached is not None:
+        return cached
+
+    if code:
+        spans = _compute_code_spans(*sides, boilerplate)
+    else:
+        spans = _compute_prose_spans(
+            sides[0], answers[0], sides[1], answers[1], boilerplate
+        )
+
+    MatchedSpans.objects.update_or_create(
+        plagiarism=plagiarism_info, defaults=dict(sources=sources, spans=spans)
+    )
+    return spans
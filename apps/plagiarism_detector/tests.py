@@ -1,4 +1,1418 @@
-from django.test import TestCase
+import os
+import random
+import string
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
-import pypandoc
+import numpy as np
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from nltk.lm import WittenBellInterpolated
+from nltk.util import everygrams, pad_sequence
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.classroom_contents.models import (
+    Attachment,
+    Classwork,
+    ClassworkHasAttachment,
+    ClassworkHasSubmission,
+    Submission,
+    SubmissionHasAttachment,
+)
+from apps.classroom_contents.storage import get_blob_hash
+from apps.classrooms.models import Classroom, ClassroomHasClasswork
+from apps.plagiarism_detector.answers import analyse_answer
+from apps.plagiarism_detector.api.views import PlagiarismListView
+from apps.plagiarism_detector.benchmark import SyntheticCorpus
+from apps.plagiarism_detector.boilerplate import (
+    BOILERPLATE_CODE_K,
+    BOILERPLATE_K,
+    get_kgrams,
+    load_boilerplate,
+    store_boilerplate,
+    strip_boilerplate,
+)
+from apps.plagiarism_detector.clusters import (
+    find_clusters,
+    get_classroom_clusters,
+    get_classwork_clusters,
+)
+from apps.plagiarism_detector.dumps import collect_dumps
+from apps.plagiarism_detector.hashing import PAD_SYMBOL
+from apps.plagiarism_detector.heatmap import get_classwork_heatmap
+from apps.plagiarism_detector.jobs import (
+    _heartbeat,
+    claim_next_job,
+    enqueue_plagiarism_job,
+    run_next_job,
+)
+from apps.plagiarism_detector.metrics import StageTimer, get_stage_percentiles
+from apps.plagiarism_detector.minhash import (
+    estimate_jaccard,
+    get_lsh_buckets,
+    get_minhash_signature,
+    get_shingles,
+    index_submission,
+    prune_candidates,
+)
+from apps.plagiarism_detector.models import (
+    PLAGIARISM_SCORE,
+    ExtractedText,
+    Fingerprint,
+    PipelineMetrics,
+    PlagiarismInfo,
+    PlagiarismJob,
+)
+from apps.plagiarism_detector.ngram_model import (
+    CompactNgramModel,
+    NgramCounter,
+    iter_blocks,
+)
+from apps.plagiarism_detector.rescan import (
+    Rescan,
+    get_rescan_relations,
+    get_rescan_scope,
+)
+from apps.plagiarism_detector.scores import SubmissionPairs, upsert_plagiarism_infos
+from apps.plagiarism_detector.similarity import (
+    analyse_classwork,
+    get_similarity_matrix,
+)
+from apps.plagiarism_detector.source_code import (
+    IDENTIFIER,
+    get_code_tokens,
+    is_source_code,
+)
+from apps.plagiarism_detector.spans import (
+    CODE_SPAN_MIN_LENGTH,
+    SPAN_MIN_LENGTH,
+    find_matched_spans,
+    get_plagiarism_spans,
+)
+from apps.plagiarism_detector.text_cache import evict_cached_texts, get_cache_stats
+from apps.plagiarism_detector.utils import (
+    Ngram_N,
+    analyse_attachment,
+    calculate_scores,
+    clean_html,
+    clean_text,
+    extract_attachment_text,
+    get_attachment_dumps,
+    get_classwork_boilerplate,
+    get_submission_documents,
+    iter_text_chunks,
+    iter_tokens,
+    joblib_load,
+    ngram_model_load,
+    word_tokenize,
+)
+from apps.plagiarism_detector.winnowing import (
+    WINNOW_K,
+    WINNOW_REPORT_THRESHOLD,
+    WINNOW_WINDOW,
+    check_fingerprints,
+    get_fingerprints,
+)
+from apps.users.models import CustomUser
+from configs.definitions import PLAGIARISM_JOB_TIMEOUT
+
+JobStatus = Attachment.PlagiarismStatusChoices
+
+# seeded, every run generates the same documents
+rng = random.Random(0)
+
+
+def random_string():
+    return "".join(rng.choice(string.ascii_lowercase) for i in range(10))
+
+
+def random_document(length=500):
+    return [random_string()[: rng.randint(2, 8)] for i in range(length)]
+
+
+def create_submission(answer=""):
+    user = CustomUser(
+        email=f"{random_string()}@{random_string()}.com",
+        username=random_string(),
+        password="123ajkdsa34fana",
+    )
+    user.save()
+
+    return Submission.objects.create(_created_by=user, answer=answer, remarks="")
+
+
+def isolate_media(test_case):
+    """
+    stores the uploads and dumps of a test in a temporary directory, pool tasks
+    running inline so that their dumps go there too
+    """
+
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    dumps_dir = os.path.join(directory.name, "trained_models") + "/"
+    os.mkdir(dumps_dir)
+
+    settings = override_settings(MEDIA_ROOT=directory.name)
+    settings.enable()
+    test_case.addCleanup(settings.disable)
+
+    for patcher in [
+        mock.patch("apps.plagiarism_detector.utils.DUMPS_DIR", dumps_dir),
+        mock.patch(
+            "apps.plagiarism_detector.utils.run_in_pool",
+            side_effect=lambda func, *args, **kwargs: func(*args),
+        ),
+    ]:
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+
+def submit_text(submission, text):
+    """analyses a text attachment of a submission, extracted beforehand"""
+
+    attachment = Attachment(mime_type="text/plain")
+    attachment.attachment.save(f"{random_string()}.txt", ContentFile(text.encode()))
+    SubmissionHasAttachment.objects.create(submission=submission, attachment=attachment)
+    # extracted before, so no converter is needed
+    ExtractedText.objects.create(
+        sha256=get_blob_hash(attachment.attachment.name), text=text, size=len(text)
+    )
+    analyse_attachment(attachment, submission)
+    return attachment
+
+
+class PlagiarismJobTest(TestCase):
+    def setUp(self):
+        self.submission = create_submission()
+        self.attachment = Attachment.objects.create(attachment="attachments/a.pdf")
+        self.job = enqueue_plagiarism_job(self.attachment, self.submission)
+
+    def test_job_done(self):
+        with mock.patch("apps.plagiarism_detector.jobs.analyse_attachment"):
+            self.assertTrue(run_next_job())
+
+        self.job.refresh_from_db()
+        self.attachment.refresh_from_db()
+        self.assertEqual(self.job.status, JobStatus.DONE)
+        self.assertEqual(self.attachment.plagiarism_status, JobStatus.DONE)
+        self.assertFalse(run_next_job())
+
+    def test_job_retried_with_backoff(self):
+        with mock.patch(
+            "apps.plagiarism_detector.jobs.analyse_attachment",
+            side_effect=ValueError("broken file"),
+        ):
+            self.assertTrue(run_next_job())
+            # backed off, so not runnable right away
+            self.assertFalse(run_next_job())
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, JobStatus.QUEUED)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertIn("broken file", self.job.last_error)
+
+    def test_job_failed_after_max_attempts(self):
+        with mock.patch(
+            "apps.plagiarism_detector.jobs.analyse_attachment",
+            side_effect=ValueError("broken file"),
+        ), mock.patch("apps.plagiarism_detector.jobs.PLAGIARISM_JOB_MAX_ATTEMPTS", 1):
+            run_next_job()
+
+        self.attachment.refresh_from_db()
+        self.assertEqual(self.attachment.plagiarism_status, JobStatus.FAILED)
+
+    def test_heartbeat_keeps_long_running_job(self):
+        self.assertEqual(claim_next_job(), self.job)
+        stale = timezone.now() - timedelta(seconds=PLAGIARISM_JOB_TIMEOUT + 1)
+
+        # a running job without heartbeat is taken for one left by a dead worker
+        PlagiarismJob.objects.filter(id=self.job.id).update(_modified_date=stale)
+        self.assertEqual(claim_next_job(), self.job)
+
+        PlagiarismJob.objects.filter(id=self.job.id).update(_modified_date=stale)
+        stop = mock.Mock(**{"wait.side_effect": [False, True]})
+        with mock.patch("apps.plagiarism_detector.jobs.connections"):
+            _heartbeat(self.job.id, stop)
+        self.assertIsNone(claim_next_job())
+
+
+class MinHashTest(TestCase):
+    def test_similar_documents_share_buckets(self):
+        document = random_document()
+        copied = document[:450] + random_document(50)
+
+        signature = get_minhash_signature(get_shingles(document))
+        copied_signature = get_minhash_signature(get_shingles(copied))
+        other_signature = get_minhash_signature(get_shingles(random_document()))
+
+        self.assertGreater(estimate_jaccard(signature, copied_signature), 0.6)
+        self.assertLess(estimate_jaccard(signature, other_signature), 0.1)
+        self.assertTrue(
+            set(get_lsh_buckets(signature)) & set(get_lsh_buckets(copied_signature))
+        )
+
+    def test_candidates_pruned_by_containment(self):
+        document = random_document(2000)
+        excerpt, other = document[500:1000], random_document(2000)
+        submissions = [create_submission() for i in range(3)]
+        classwork = Classwork.objects.create(
+            _created_by=submissions[0]._created_by, title="t", description="d"
+        )
+
+        signatures = [
+            index_submission(submission, classwork, tokens)
+            for submission, tokens in zip(submissions, [document, excerpt, other])
+        ]
+        candidate_ids = [submissions[1].id, submissions[2].id]
+
+        # a short excerpt is far from the document by jaccard but fully contained
+        self.assertEqual(
+            prune_candidates(signatures[0], candidate_ids, 0.5), [submissions[1].id]
+        )
+        self.assertEqual(
+            prune_candidates(signatures[0], candidate_ids, 0), candidate_ids
+        )
+
+
+class SimilarityMatrixTest(TestCase):
+    def test_similarity_matrix(self):
+        document = random_document()
+        matrix = get_similarity_matrix([document, list(document), random_document()])
+
+        self.assertEqual(matrix.shape, (3, 3))
+        self.assertAlmostEqual(matrix[0, 1], 1.0)
+        self.assertLess(matrix[0, 2], 0.1)
+
+    def test_only_similar_pairs_stored(self):
+        first, second, third = [create_submission() for i in range(3)]
+        document = random_document()
+        documents = [document, list(document), random_document()]
+
+        # scored before the third submission changed, no longer similar
+        upsert_plagiarism_infos(
+            {(first.id, third.id): 90.0}, method=PlagiarismInfo.MethodChoices.TFIDF
+        )
+
+        with mock.patch(
+            "apps.plagiarism_detector.similarity.get_classwork_documents",
+            return_value=([first.id, second.id, third.id], documents),
+        ):
+            self.assertEqual(analyse_classwork(None), 1)
+
+        pairs = PlagiarismInfo.objects.filter(method=PlagiarismInfo.MethodChoices.TFIDF)
+        self.assertEqual(
+            list(pairs.values_list("submission_agent", "submission_target")),
+            [(first.id, second.id)],
+        )
+
+
+class WinnowingTest(TestCase):
+    def test_shared_passage_shares_fingerprint(self):
+        passage = random_document(WINNOW_K + WINNOW_WINDOW - 1)
+        document = random_document(200) + passage + random_document(200)
+        other = random_document(50) + passage + random_document(300)
+
+        fingerprints, positions = get_fingerprints(document)
+        other_fingerprints, _ = get_fingerprints(other)
+
+        self.assertTrue(set(fingerprints) & set(other_fingerprints))
+        self.assertLess(len(fingerprints), len(document) / 2)
+
+    def test_pairs_no_longer_matching_deleted(self):
+        document = random_document(300)
+        earlier, resubmitted = create_submission(), create_submission()
+        attachments = [
+            Attachment.objects.create(attachment=f"attachments/{name}.pdf")
+            for name in ["earlier", "resubmitted"]
+        ]
+
+        check_fingerprints(attachments[0], earlier, document)
+        check_fingerprints(attachments[1], resubmitted, document)
+        self.assertEqual(
+            PlagiarismInfo.objects.get().method,
+            PlagiarismInfo.MethodChoices.WINNOWING,
+        )
+
+        check_fingerprints(attachments[1], resubmitted, random_document(300))
+        self.assertFalse(PlagiarismInfo.objects.exists())
+
+    def test_direction_below_threshold_cleared(self):
+        document = random_document(200)
+        first, second = create_submission(), create_submission()
+        attachments = [
+            Attachment.objects.create(attachment=f"attachments/{name}.pdf")
+            for name in ["first", "second"]
+        ]
+
+        check_fingerprints(attachments[0], first, document)
+        check_fingerprints(attachments[1], second, document)
+        info = PlagiarismInfo.objects.get()
+        self.assertEqual(info.percentage_plagiarized, 100)
+        self.assertEqual(info.percentage_plagiarized_reverse, 100)
+
+        # the first document is still copied, but is a small part of the second
+        check_fingerprints(attachments[1], second, random_document(3000) + document)
+        info = PlagiarismInfo.objects.get()
+        self.assertEqual(info.percentage_plagiarized, 100)
+        self.assertIsNone(info.percentage_plagiarized_reverse)
+
+    def test_scores_independent_of_upload_order(self):
+        passage = random_document(200)
+        documents = [passage, random_document(800) + passage]
+
+        scores = []
+        for order in [[0, 1], [1, 0]]:
+            Fingerprint.objects.all().delete()
+            submissions = [create_submission(), create_submission()]
+            for i in order:
+                attachment = Attachment.objects.create(
+                    attachment=f"attachments/{i}.pdf"
+                )
+                check_fingerprints(attachment, submissions[i], documents[i])
+
+            info = PlagiarismInfo.objects.get(submission_agent=submissions[0])
+            scores.append(
+                (info.percentage_plagiarized, info.percentage_plagiarized_reverse)
+            )
+
+        # the passage is entirely in the long document, which is mostly elsewhere
+        self.assertEqual(scores[0], scores[1])
+        self.assertEqual(scores[0][0], 100)
+        self.assertGreater(scores[0][1], WINNOW_REPORT_THRESHOLD)
+        self.assertLess(scores[0][1], 30)
+
+
+PYTHON_PROGRAM = """
+def mean(values):
+    # average of the values
+    total = 0
+    for value in values:
+        total += value
+    return total / len(values)
+
+
+def variance(values):
+    average = mean(values)
+    return sum((value - average) ** 2 for value in values) / len(values)
+
+
+print("variance", variance([1, 2, 3, 4]))
+"""
+
+RENAMED_PYTHON_PROGRAM = """
+def avg(xs):
+    s = 0
+    for x in xs:
+        s += x
+    return s / len(xs)
+
+
+def var(xs):
+    m = avg(xs)  # spread of xs
+    return sum((x - m) ** 2 for x in xs) / len(xs)
+
+
+print('var:', var([5, 6, 7, 8.5]))
+"""
+
+
+class SourceCodeTest(TestCase):
+    def test_code_detected_by_extension_or_mime_type(self):
+        self.assertTrue(is_source_code("attachments/ab/cd/abcd.py"))
+        self.assertTrue(is_source_code("Main.JAVA"))
+        self.assertTrue(is_source_code("upload", "text/x-csrc"))
+        self.assertFalse(is_source_code("report.pdf", "application/pdf"))
+        self.assertFalse(is_source_code("notes.txt", "text/plain"))
+
+    def test_renamed_python_lexed_the_same(self):
+        tokens = get_code_tokens(PYTHON_PROGRAM, "a.py")
+
+        self.assertEqual(tokens, get_code_tokens(RENAMED_PYTHON_PROGRAM, "b.py"))
+        self.assertIn("for", tokens)
+        self.assertIn("**", tokens)
+        self.assertNotIn("mean", tokens)
+
+    def test_renamed_c_lexed_the_same(self):
+        program = """
+        #include <stdio.h>
+        int sum(int *values, int count) {
+            int total = 0; /* running total */
+            for (int i = 0; i < count; i++) total += values[i];
+            return total;
+        }
+        """
+        renamed = """
+        int add(int *xs, int n) {
+            // comments and includes don't matter
+            int s = 0;
+            for (int j = 0; j < n; j++) s += xs[j];
+            return s;
+        }
+        """
+        tokens = get_code_tokens(program, "sum.c")
+
+        self.assertEqual(tokens, get_code_tokens(renamed, "add.c"))
+        self.assertEqual(tokens[:3], ["int", IDENTIFIER, "("])
+        self.assertIn("++", tokens)
+
+    def test_invalid_python_lexed_as_c_like(self):
+        tokens = get_code_tokens('def broken(:\n    return """never closed', "a.py")
+
+        self.assertEqual(tokens[:3], [IDENTIFIER, IDENTIFIER, "("])
+
+    def test_code_attachments_fingerprinted_without_model(self):
+        isolate_media(self)
+        attachments = []
+        for program in [PYTHON_PROGRAM, RENAMED_PYTHON_PROGRAM]:
+            submission = create_submission()
+            attachment = Attachment(mime_type="text/x-python")
+            attachment.attachment.save("stats.py", ContentFile(program.encode()))
+            analyse_attachment(attachment, submission)
+            attachments.append(attachment)
+
+        for attachment in attachments:
+            attachment.refresh_from_db()
+            self.assertIsNotNone(attachment.tokenized_dump)
+            self.assertIsNone(attachment.model_dump)
+
+        info = PlagiarismInfo.objects.get()
+        self.assertEqual(info.method, PlagiarismInfo.MethodChoices.CODE_FINGERPRINTS)
+        # both ways by the later submission
+        self.assertEqual(info.percentage_plagiarized, 100)
+        self.assertEqual(info.percentage_plagiarized_reverse, 100)
+
+
+class BoilerplateTest(TestCase):
+    def setUp(self):
+        isolate_media(self)
+        self.question = random_document(40)
+        self.submissions = [create_submission(), create_submission()]
+        self.classwork = Classwork.objects.create(
+            _created_by=self.submissions[0]._created_by,
+            title="Essay",
+            description=" ".join(self.question),
+        )
+        for submission in self.submissions:
+            ClassworkHasSubmission.objects.create(
+                classwork=self.classwork, submission=submission
+            )
+
+    def test_template_tokens_stripped(self):
+        template, own = random_document(40), random_document(30)
+        boilerplate = store_boilerplate(self.classwork, [template], [])
+
+        tokens = [PAD_SYMBOL] * 3 + own[:10] + template[5:25] + own[10:]
+        self.assertEqual(
+            strip_boilerplate(tokens, boilerplate),
+            [PAD_SYMBOL] * 3 + own[:10] + [PAD_SYMBOL] + own[10:],
+        )
+        # shorter than a k-gram, not template
+        tokens = own[:10] + template[: BOILERPLATE_K - 1] + own[10:]
+        self.assertEqual(strip_boilerplate(tokens, boilerplate), tokens)
+
+    def test_passages_scored_apart(self):
+        template, own = random_document(40), random_document(60)
+        boilerplate = store_boilerplate(self.classwork, [template], [])
+        model = CompactNgramModel.fit(
+            [PAD_SYMBOL] * (Ngram_N - 1) + own + template, Ngram_N
+        )
+
+        tokens = strip_boilerplate(own[:30] + template + own[30:], boilerplate)
+        # each passage as if submitted alone, no n-gram spans the stripped template
+        self.assertAlmostEqual(
+            calculate_scores(tokens, model),
+            (
+                calculate_scores(own[:30], model) * 30
+                + calculate_scores(own[30:], model) * 30
+            )
+            / 60,
+        )
+        self.assertLess(
+            calculate_scores(tokens, model),
+            calculate_scores(own[:30] + own[30:], model),
+        )
+
+    def test_boilerplate_rebuilt_when_template_changes(self):
+        boilerplate = get_classwork_boilerplate(self.classwork)
+        self.assertTrue(
+            np.isin(get_kgrams(self.question, BOILERPLATE_K), boilerplate).all()
+        )
+
+        attachment = Attachment(mime_type="text/x-python")
+        attachment.attachment.save("starter.py", ContentFile(PYTHON_PROGRAM.encode()))
+        ClassworkHasAttachment.objects.create(
+            classwork=self.classwork, attachment=attachment
+        )
+        self.assertIsNone(load_boilerplate(self.classwork))
+
+        boilerplate = get_classwork_boilerplate(self.classwork)
+        code_tokens = get_code_tokens(PYTHON_PROGRAM, "starter.py")
+        self.assertTrue(
+            np.isin(get_kgrams(code_tokens, BOILERPLATE_CODE_K), boilerplate).all()
+        )
+
+        # the starter code handed in unchanged isn't plagiarism
+        for submission in self.submissions:
+            submitted = Attachment(mime_type="text/x-python")
+            submitted.attachment.save("main.py", ContentFile(PYTHON_PROGRAM.encode()))
+            analyse_attachment(submitted, submission)
+        self.assertFalse(PlagiarismInfo.objects.exists())
+
+        self.classwork.description = "changed"
+        self.classwork.save()
+        self.assertIsNone(load_boilerplate(self.classwork))
+
+    def test_quoted_question_not_scored(self):
+        for submission in self.submissions:
+            submission.answer = " ".join(self.question + random_document(20))
+            submission.save()
+            analyse_answer(submission)
+
+        self.assertFalse(PlagiarismInfo.objects.exists())
+
+
+class SubmissionDocumentTest(TestCase):
+    def setUp(self):
+        isolate_media(self)
+        self.submissions = [create_submission() for i in range(3)]
+        self.classwork = Classwork.objects.create(
+            _created_by=self.submissions[0]._created_by, title="t", description="d"
+        )
+        for submission in self.submissions:
+            ClassworkHasSubmission.objects.create(
+                classwork=self.classwork, submission=submission
+            )
+        self.attachments = []
+
+    def submit(self, submission, text):
+        self.attachments.append(submit_text(submission, text))
+
+    def get_language_model_infos(self):
+        return PlagiarismInfo.objects.filter(
+            method=PlagiarismInfo.MethodChoices.LANGUAGE_MODEL
+        )
+
+    def test_attachments_scored_as_one_document(self):
+        first, second, third = self.submissions
+        copied = " ".join(random_document(400))
+        self.submit(first, " ".join(random_document(400)))
+        self.submit(first, copied)
+        self.submit(second, copied + " " + " ".join(random_document(100)))
+        # unrelated, neither a candidate nor scored above the copy
+        self.submit(third, " ".join(random_document(800)))
+
+        documents = get_submission_documents([first.id, second.id, third.id])
+        self.assertEqual(
+            len(joblib_load(documents[first.id].tokenized_dump)),
+            sum(len(joblib_load(a.tokenized_dump)) for a in self.attachments[:2]),
+        )
+        # single attachment, its own dumps
+        self.assertEqual(
+            documents[second.id].model_dump, self.attachments[2].model_dump
+        )
+
+        info = PlagiarismInfo.objects.get(
+            method=PlagiarismInfo.MethodChoices.LANGUAGE_MODEL
+        )
+        self.assertEqual(
+            (info.submission_agent_id, info.submission_target_id),
+            (first.id, second.id),
+        )
+        # half of the merged document is copied, the control shares nothing
+        control = calculate_scores(
+            joblib_load(documents[third.id].tokenized_dump),
+            ngram_model_load(documents[second.id].model_dump),
+        )
+        self.assertGreater(info.percentage_plagiarized_reverse, 40)
+        self.assertLess(control, 5)
+
+        # built once, reused by every comparison
+        with mock.patch("apps.plagiarism_detector.utils.run_in_pool") as run:
+            get_submission_documents([first.id, second.id])
+        run.assert_not_called()
+
+        # the answer is part of the document
+        first.answer = "an answer added later"
+        first.save()
+        document = get_submission_documents([first.id])[first.id]
+        self.assertNotEqual(document.tokenized_dump, documents[first.id].tokenized_dump)
+
+    def test_new_submission_scores_its_row_and_column(self):
+        first, second, third = self.submissions
+        copied = " ".join(random_document(400))
+        self.submit(first, copied)
+        self.assertFalse(self.get_language_model_infos().exists())
+
+        # the earlier submission is scored by the new one's model when it arrives
+        self.submit(second, copied + " " + " ".join(random_document(100)))
+        info = self.get_language_model_infos().get()
+        self.assertEqual(
+            (info.submission_agent_id, info.submission_target_id),
+            (first.id, second.id),
+        )
+        self.assertIsNotNone(info.percentage_plagiarized)
+        self.assertIsNotNone(info.percentage_plagiarized_reverse)
+
+        # marked, so rescoring it would show
+        self.get_language_model_infos().update(
+            percentage_plagiarized=12.5, percentage_plagiarized_reverse=12.5
+        )
+        documents = get_submission_documents([first.id, second.id])
+        with mock.patch(
+            "apps.plagiarism_detector.utils.ngram_model_load", wraps=ngram_model_load
+        ) as load, mock.patch(
+            "apps.plagiarism_detector.utils.calculate_scores", wraps=calculate_scores
+        ) as score:
+            self.submit(third, copied + " " + " ".join(random_document(100)))
+
+        # its own model and each candidate's, two scores per candidate
+        document = get_submission_documents([third.id])[third.id]
+        self.assertCountEqual(
+            [call.args[0] for call in load.call_args_list],
+            [
+                document.model_dump,
+                documents[first.id].model_dump,
+                documents[second.id].model_dump,
+            ],
+        )
+        self.assertEqual(score.call_count, 4)
+
+        info.refresh_from_db()
+        self.assertEqual(
+            (info.percentage_plagiarized, info.percentage_plagiarized_reverse),
+            (12.5, 12.5),
+        )
+        infos = self.get_language_model_infos().exclude(pk=info.pk)
+        self.assertCountEqual(
+            infos.values_list("submission_agent", "submission_target"),
+            [(first.id, third.id), (second.id, third.id)],
+        )
+        for info in infos:
+            self.assertIsNotNone(info.percentage_plagiarized)
+            self.assertIsNotNone(info.percentage_plagiarized_reverse)
+
+    def test_stale_pairs_removed_after_resubmission(self):
+        first, second, third = self.submissions
+        copied = " ".join(random_document(400))
+        for submission in self.submissions:
+            self.submit(submission, copied + " " + " ".join(random_document(100)))
+        self.assertEqual(self.get_language_model_infos().count(), 3)
+        kept = self.get_language_model_infos().get(
+            submission_agent=first, submission_target=third
+        )
+
+        SubmissionHasAttachment.objects.filter(submission=second).delete()
+        self.submit(second, " ".join(random_document(400)))
+
+        # no longer a candidate of either, the pair between the others is untouched
+        self.assertQuerysetEqual(
+            self.get_language_model_infos(), [kept], transform=lambda info: info
+        )
+        self.assertEqual(
+            self.get_language_model_infos().get().percentage_plagiarized,
+            kept.percentage_plagiarized,
+        )
+
+
+class CompactNgramModelTest(TestCase):
+    def padded_document(self, vocabulary, length):
+        words = [rng.choice(vocabulary) for i in range(length)]
+        return list(pad_sequence(words, 10, pad_left=True, left_pad_symbol="<s>"))
+
+    def test_scores_match_nltk(self):
+        vocabulary = [random_string()[:4] for i in range(50)]
+        training_data = self.padded_document(vocabulary, 1000)
+        testing_data = self.padded_document(vocabulary + ["unseen"], 300)
+
+        nltk_model = WittenBellInterpolated(10)
+        nltk_model.fit(
+            [list(everygrams(training_data, max_len=10))],
+            vocabulary_text=training_data,
+        )
+        model = CompactNgramModel.fit(training_data, 10)
+
+        for i, word in enumerate(testing_data[9:]):
+            context = testing_data[i : i + 9]
+            self.assertEqual(
+                model.score(word, context), nltk_model.score(word, context)
+            )
+
+    def test_score_sequence_matches_score(self):
+        vocabulary = [random_string()[:4] for i in range(50)]
+        model = CompactNgramModel.fit(self.padded_document(vocabulary, 1000), 10)
+        testing_data = self.padded_document(vocabulary + ["unseen"], 300)
+
+        scores = [
+            model.score(word, testing_data[i : i + 9])
+            for i, word in enumerate(testing_data[9:])
+        ]
+        self.assertEqual(model.score_sequence(testing_data, 10).tolist(), scores)
+        self.assertEqual(len(model.score_sequence(testing_data[:5], 10)), 0)
+
+    def test_fit_in_blocks_matches_whole_sequence(self):
+        vocabulary = [random_string()[:4] for i in range(50)]
+        training_data = self.padded_document(vocabulary, 1000)
+        model = CompactNgramModel.fit(training_data, 10)
+
+        # blocks shorter than the order still count the windows spanning them
+        for size in [3, 64]:
+            counter = NgramCounter(10)
+            for block in iter_blocks(training_data, size):
+                counter.update(block)
+            blocked = counter.model()
+
+            for name in [
+                "ngram_ids",
+                "ngram_counts",
+                "ngram_offsets",
+                "context_totals",
+                "context_nplus",
+            ]:
+                self.assertEqual(
+                    getattr(blocked, name).tolist(), getattr(model, name).tolist()
+                )
+
+
+class TokenizerTest(TestCase):
+    def test_chunked_tokens_match_whole_text(self):
+        lines = [
+            " ".join(random_document(rng.randint(0, 12)))
+            + rng.choice(["", " [note]", "{x} y", ".", "&amp;", "\t", "\xa0"])
+            for i in range(200)
+        ]
+        text = "\n".join(lines)
+        expected = word_tokenize(clean_html(clean_text(text)))
+
+        for size in [1, 7, 100, len(text)]:
+            with mock.patch(
+                "apps.plagiarism_detector.utils.iter_text_chunks",
+                lambda text: iter_text_chunks(text, size),
+            ):
+                tokens = list(iter_tokens(text))
+
+            self.assertEqual(tokens, expected)
+
+        tokens = list(iter_tokens("same words same words"))
+        self.assertIs(tokens[0], tokens[2])
+
+
+class TextCacheTest(TestCase):
+    def test_extraction_cached_by_contents(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(b"same contents")
+            f.flush()
+
+            with mock.patch(
+                "apps.plagiarism_detector.utils.run_in_pool",
+                return_value=("text", 0),
+            ) as run_in_pool:
+                self.assertEqual(extract_attachment_text(f.name, None), "text")
+                self.assertEqual(extract_attachment_text(f.name, None), "text")
+
+        self.assertEqual(run_in_pool.call_count, 1)
+        self.assertEqual(get_cache_stats()["hit_rate"], 0.5)
+
+        evict_cached_texts(budget=0)
+        self.assertEqual(get_cache_stats()["entries"], 0)
+
+
+class DumpCollectionTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dumps_dir = directory.name + "/"
+        patcher = mock.patch("apps.plagiarism_detector.dumps.DUMPS_DIR", self.dumps_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_dump(self, name, hours_unused, directory=False):
+        path = self.dumps_dir + name
+        if directory:
+            os.mkdir(path)
+        with open(os.path.join(path, "ids.npy") if directory else path, "wb") as f:
+            f.write(b"0" * 100)
+
+        last_use = time.time() - hours_unused * 3600
+        os.utime(path, (last_use, last_use))
+        return path
+
+    def create_attachment(self, name, hours_unused):
+        return Attachment.objects.create(
+            attachment=f"attachments/{name}.pdf",
+            tokenized_dump=self.create_dump(f"{name}.sav", hours_unused),
+            model_dump=self.create_dump(name, hours_unused, directory=True),
+        )
+
+    def test_orphans_deleted_and_least_recently_used_evicted(self):
+        used = self.create_attachment("used", hours_unused=2)
+        unused = self.create_attachment("unused", hours_unused=5)
+        orphan = self.create_dump("orphan.sav", hours_unused=3)
+        writing = self.create_dump("writing.sav", hours_unused=0)
+
+        result = collect_dumps(budget=10**6, grace_period=3600)
+        self.assertEqual((result["orphaned"], result["evicted"]), (1, 0))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(writing))
+
+        # 500 bytes of dumps left, the recent one included
+        result = collect_dumps(budget=350, grace_period=3600)
+        self.assertEqual((result["evicted"], result["size"]), (2, 300))
+
+        unused.refresh_from_db()
+        self.assertIsNone(unused.model_dump)
+        self.assertEqual(unused.plagiarism_status, JobStatus.DONE)
+        used.refresh_from_db()
+        self.assertTrue(os.path.exists(used.model_dump))
+
+        with mock.patch(
+            "apps.plagiarism_detector.utils.extract_attachment_text",
+            return_value="text",
+        ), mock.patch(
+            "apps.plagiarism_detector.utils.run_in_pool",
+            return_value=(["text"], "rebuilt.sav", "rebuilt", StageTimer()),
+        ):
+            self.assertEqual(get_attachment_dumps(unused), ("rebuilt.sav", "rebuilt"))
+
+        unused.refresh_from_db()
+        self.assertEqual(unused.model_dump, "rebuilt")
+
+
+class SyntheticCorpusTest(TestCase):
+    def test_corpus_seeded_and_overlapping(self):
+        documents = SyntheticCorpus(seed=1).documents(3, 300, 0.5)
+
+        self.assertEqual(documents, SyntheticCorpus(seed=1).documents(3, 300, 0.5))
+        self.assertEqual([len(document.split()) for document in documents], [300] * 3)
+
+        shingles = [set(get_shingles(document.split())) for document in documents]
+        self.assertGreater(len(shingles[0] & shingles[1]), 100)
+
+
+class PipelineMetricsTest(TestCase):
+    def test_stage_percentiles(self):
+        for i in range(1, 101):
+            attachment = Attachment.objects.create(attachment=f"attachments/{i}.pdf")
+            PipelineMetrics.objects.create(
+                attachment=attachment,
+                stage_timings=dict(extraction=i / 100, fit=0.5),
+                succeeded=i % 10 != 0,
+                candidate_count=4,
+                pruned_count=1,
+            )
+
+        percentiles = get_stage_percentiles()
+
+        self.assertEqual(percentiles["runs"], 100)
+        self.assertEqual(percentiles["failed"], 10)
+        self.assertEqual(percentiles["candidates"], 400)
+        self.assertEqual(percentiles["pruned"], 100)
+        self.assertAlmostEqual(percentiles["stages"]["extraction"]["p50"], 0.505)
+        self.assertAlmostEqual(percentiles["stages"]["extraction"]["p95"], 0.9505)
+        self.assertAlmostEqual(percentiles["stages"]["fit"]["p95"], 0.5)
+        self.assertNotIn("scoring", percentiles["stages"])
+
+    def test_stage_timer_accumulates(self):
+        timer = StageTimer()
+        with timer.stage("load"):
+            pass
+        timer.update(dict(load=1.0, fit=2.0))
+        timer.record_peak_rss(10)
+        timer.record_peak_rss(5)
+
+        self.assertGreaterEqual(timer.timings["load"], 1.0)
+        self.assertEqual(timer.timings["fit"], 2.0)
+        self.assertEqual(timer.peak_rss, 10)
+
+
+class RescanTest(TestCase):
+    def setUp(self):
+        submissions = [create_submission() for i in range(5)]
+        self.classwork = Classwork.objects.create(
+            _created_by=submissions[0]._created_by, title="t", description="d"
+        )
+
+        for i, submission in enumerate(submissions):
+            ClassworkHasSubmission.objects.create(
+                classwork=self.classwork, submission=submission
+            )
+            SubmissionHasAttachment.objects.create(
+                submission=submission,
+                attachment=Attachment.objects.create(attachment=f"attachments/{i}.pdf"),
+            )
+
+    def rescan(self, side_effect=None):
+        filters = dict(classwork_ids=[self.classwork.id])
+        relations = get_rescan_relations(**filters)
+
+        with mock.patch(
+            "apps.plagiarism_detector.rescan.analyse_attachment",
+            side_effect=side_effect,
+        ) as analyse_attachment:
+            Rescan(relations, get_rescan_scope(**filters), workers=1).run()
+
+        return [call.args[0].id for call in analyse_attachment.call_args_list]
+
+    def test_rescan_resumes_after_interruption(self):
+        attachment_ids = list(
+            get_rescan_relations(classwork_ids=[self.classwork.id]).values_list(
+                "attachment", flat=True
+            )
+        )
+
+        def interrupt(attachment, submission):
+            if attachment.id == attachment_ids[2]:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.rescan(interrupt)
+
+        self.assertEqual(self.rescan(), attachment_ids[2:])
+        # a finished rescan starts over
+        self.assertEqual(self.rescan(), attachment_ids)
+
+
+class ClassworkHeatmapTest(TestCase):
+    def setUp(self):
+        self.submissions = [create_submission() for i in range(3)]
+        self.classwork = Classwork.objects.create(
+            _created_by=self.submissions[0]._created_by, title="t", description="d"
+        )
+        for submission in self.submissions:
+            ClassworkHasSubmission.objects.create(
+                classwork=self.classwork, submission=submission
+            )
+
+    def test_heatmap_cached_until_scores_change(self):
+        first, second, third = self.submissions
+        PlagiarismInfo.objects.create(
+            submission_agent=first, submission_target=second, percentage_plagiarized=40
+        )
+
+        heatmap = get_classwork_heatmap(self.classwork)
+        self.assertEqual(heatmap["methods"]["LM"][0], [None, 40, None])
+        self.assertEqual(
+            [submission["id"] for submission in heatmap["submissions"]],
+            [submission.id for submission in self.submissions],
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_classwork_heatmap(self.classwork), heatmap)
+
+        # bulk writes send no signals
+        upsert_plagiarism_infos({(third.id, first.id): 75.0})
+        heatmap = get_classwork_heatmap(self.classwork)
+        self.assertEqual(heatmap["methods"]["LM"][2], [75.0, None, None])
+
+        PlagiarismInfo.objects.filter(
+            submission_agent=first, submission_target=second
+        ).update(percentage_plagiarized=50)
+        PlagiarismInfo.objects.get(
+            submission_agent=first, submission_target=second
+        ).save()
+        heatmap = get_classwork_heatmap(self.classwork)
+        self.assertEqual(heatmap["methods"]["LM"][0], [None, 50, None])
+
+    def test_heatmap_invalidated_by_deleted_submissions(self):
+        first, second, third = self.submissions
+        upsert_plagiarism_infos(
+            {(first.id, second.id): 80.0, (second.id, third.id): 70.0}
+        )
+        self.assertEqual(len(get_classwork_heatmap(self.classwork)["submissions"]), 3)
+        self.assertEqual(get_classwork_clusters(self.classwork)[0].size, 3)
+
+        # its scores and classwork relation go along
+        third.delete()
+        heatmap = get_classwork_heatmap(self.classwork)
+        self.assertEqual(
+            [submission["id"] for submission in heatmap["submissions"]],
+            [first.id, second.id],
+        )
+        self.assertEqual(heatmap["methods"]["LM"], [[None, 80.0], [None, None]])
+        self.assertEqual(get_classwork_clusters(self.classwork)[0].size, 2)
+
+        PlagiarismInfo.objects.filter(submission_agent=first).delete()
+        self.assertEqual(get_classwork_heatmap(self.classwork)["methods"], {})
+        self.assertEqual(len(get_classwork_clusters(self.classwork)), 0)
+
+
+class CollusionClusterTest(TestCase):
+    def setUp(self):
+        self.submissions = [create_submission() for i in range(5)]
+        user = self.submissions[0]._created_by
+        self.classworks = [
+            Classwork.objects.create(_created_by=user, title="t", description="d")
+            for i in range(2)
+        ]
+        for submission in self.submissions[:4]:
+            ClassworkHasSubmission.objects.create(
+                classwork=self.classworks[0], submission=submission
+            )
+        ClassworkHasSubmission.objects.create(
+            classwork=self.classworks[1], submission=self.submissions[4]
+        )
+        self.classroom = Classroom.objects.create(
+            _created_by=user, name="n", subject="COMP302", classroom_code="c"
+        )
+        for classwork in self.classworks:
+            ClassroomHasClasswork.objects.create(
+                classroom=self.classroom, classwork=classwork
+            )
+
+    def test_connected_components(self):
+        clusters = find_clusters({(1, 2): 60, (3, 2): 70, (4, 5): 55})
+
+        self.assertEqual(
+            [cluster["submissions"] for cluster in clusters], [[1, 2, 3], [4, 5]]
+        )
+        self.assertEqual(clusters[0]["edge_count"], 2)
+        self.assertAlmostEqual(clusters[0]["density"], 2 / 3)
+        self.assertEqual(clusters[0]["max_percentage"], 70)
+        self.assertEqual(clusters[0]["mean_percentage"], 65)
+
+    def test_clusters_recomputed_when_scores_change(self):
+        a, b, c, d, e = [submission.id for submission in self.submissions]
+        upsert_plagiarism_infos({(a, b): 80.0, (c, d): 10.0})
+        upsert_plagiarism_infos(
+            {(c, b): 60.0}, method=PlagiarismInfo.MethodChoices.WINNOWING
+        )
+
+        clusters = get_classwork_clusters(self.classworks[0])
+        self.assertEqual(
+            [[member["id"] for member in cluster.submissions] for cluster in clusters],
+            [[a, b, c]],
+        )
+        cluster_id = clusters[0].id
+
+        # up to date, served as stored
+        self.assertEqual(get_classwork_clusters(self.classworks[0])[0].id, cluster_id)
+
+        upsert_plagiarism_infos({(d, c): 90.0})
+        clusters = get_classwork_clusters(self.classworks[0])
+        self.assertEqual(clusters[0].size, 4)
+        self.assertEqual(clusters[0].edge_count, 3)
+
+        # linked across the classworks of a classroom
+        upsert_plagiarism_infos({(e, a): 95.0})
+        self.assertEqual(len(get_classwork_clusters(self.classworks[1])), 0)
+        clusters = get_classroom_clusters(self.classroom)
+        self.assertEqual(clusters[0].size, 5)
+        self.assertEqual(clusters[0].max_percentage, 95)
+
+
+class PlagiarismInfoUpsertTest(TestCase):
+    def test_both_directions_stored_in_one_row(self):
+        first, second = create_submission(), create_submission()
+
+        upsert_plagiarism_infos({(second.id, first.id): 20.0})
+        upsert_plagiarism_infos({(first.id, second.id): 10.0})
+        upsert_plagiarism_infos({(second.id, first.id): 25.0})
+
+        info = PlagiarismInfo.objects.get()
+        self.assertEqual(
+            (info.submission_agent_id, info.submission_target_id),
+            (first.id, second.id),
+        )
+        self.assertEqual(info.percentage_plagiarized, 10.0)
+        self.assertEqual(info.percentage_plagiarized_reverse, 25.0)
+
+        with self.assertRaises(IntegrityError):
+            PlagiarismInfo.objects.create(
+                submission_agent=second,
+                submission_target=first,
+                percentage_plagiarized=20,
+            )
+
+    def test_submission_pairs_merge_both_sides(self):
+        lower, submission, higher = [create_submission() for i in range(3)]
+        upsert_plagiarism_infos({(submission.id, lower.id): 30.0})
+        upsert_plagiarism_infos({(submission.id, higher.id): 60.0})
+        upsert_plagiarism_infos({(higher.id, submission.id): 10.0})
+        upsert_plagiarism_infos({(lower.id, higher.id): 90.0})
+
+        pairs = SubmissionPairs(
+            submission.id, PlagiarismInfo.objects.annotate(score=PLAGIARISM_SCORE)
+        ).order_by("-score")
+
+        with self.assertNumQueries(1):
+            self.assertEqual([info.score for info in pairs], [60.0, 30.0])
+        with self.assertNumQueries(1):
+            self.assertEqual([info.score for info in pairs[1:2]], [30.0])
+        self.assertEqual(
+            [info.score for info in pairs.filter(score__lt=50)[:5]], [30.0]
+        )
+
+
+class PlagiarismListViewTest(TestCase):
+    def setUp(self):
+        self.submission = create_submission()
+        self.others = [create_submission() for i in range(6)]
+        upsert_plagiarism_infos(
+            {
+                (self.submission.id, other.id): score
+                for other, score in zip(self.others, [30.0, 90.0, 10.0, 70.0, 50.0])
+            }
+        )
+        # scored in the other direction only
+        upsert_plagiarism_infos({(self.others[5].id, self.submission.id): 40.0})
+
+    def get(self, submission=None, **params):
+        submission = submission or self.submission
+        request = APIRequestFactory().get("/", params)
+        force_authenticate(request, user=submission._created_by)
+        return PlagiarismListView.as_view()(request, submission_id=submission.id)
+
+    def test_pages_by_score(self):
+        scores, params = [], dict(page_size=2)
+        while True:
+            with self.assertNumQueries(1):
+                response = self.get(**params)
+                data = response.data
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(data["plagiarism"]), 2)
+            scores += [row["score"] for row in data["plagiarism"]]
+            if data["next"] is None:
+                break
+            params = dict(parse_qsl(urlsplit(data["next"]).query))
+
+        self.assertEqual(scores, [90.0, 70.0, 50.0, 40.0, 30.0, 10.0])
+
+        data = self.get(min_score=40, ordering="score").data
+        self.assertEqual(
+            [row["score"] for row in data["plagiarism"]], [40.0, 50.0, 70.0, 90.0]
+        )
+        self.assertIsNone(data["plagiarism"][0]["percentage_plagiarized"])
+        self.assertEqual(data["plagiarism"][0]["percentage_plagiarized_reverse"], 40.0)
+        self.assertEqual(
+            data["plagiarism"][0]["submission_target"]["_created_by"]["username"],
+            self.others[5]._created_by.username,
+        )
+
+    def test_pages_merge_both_sides(self):
+        # the submission is the target of the pairs with lower ids
+        lower = [create_submission() for i in range(4)]
+        submission = create_submission()
+        higher = [create_submission() for i in range(4)]
+        scores = [50.0, 20.0, 50.0, 80.0]
+        upsert_plagiarism_infos(
+            {
+                (submission.id, other.id): score
+                for other, score in zip(lower + higher, scores + scores)
+            }
+        )
+
+        rows, params = [], dict(page_size=3)
+        while True:
+            data = self.get(submission, **params).data
+            rows += data["plagiarism"]
+            if data["next"] is None:
+                break
+            params = dict(parse_qsl(urlsplit(data["next"]).query))
+
+        self.assertEqual(
+            [row["score"] for row in rows], [80.0, 80.0] + [50.0] * 4 + [20.0, 20.0]
+        )
+        self.assertEqual(len({row["id"] for row in rows}), 8)
+
+    def test_query_count_independent_of_result_size(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.get(page_size=1).data["plagiarism"]), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.get(page_size=100).data["plagiarism"]), 6)
+
+    def test_wrong_parameters(self):
+        self.assertEqual(self.get(min_score="high").status_code, 400)
+        self.assertEqual(self.get(min_score=101).status_code, 400)
+        self.assertEqual(self.get(ordering="id").status_code, 400)
+        self.assertEqual(self.get(cursor="nonsense").status_code, 400)
+
+
+class AnswerPlagiarismTest(TestCase):
+    def setUp(self):
+        answer = " ".join(random_document(60))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submissions = [
+                create_submission(answer),
+                create_submission(answer.upper() + "!"),
+                create_submission(" ".join(random_document(60))),
+                create_submission("Yes."),
+            ]
+        classwork = Classwork.objects.create(
+            _created_by=self.submissions[0]._created_by, title="t", description="d"
+        )
+        for submission in self.submissions:
+            ClassworkHasSubmission.objects.create(
+                classwork=classwork, submission=submission
+            )
+
+    def test_answer_changes_queued(self):
+        first, _, _, short = self.submissions
+        queued = PlagiarismJob.objects.filter(attachment__isnull=True)
+        self.assertEqual(queued.count(), 4)
+        queued.update(status=JobStatus.DONE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.grade = 5
+            first.save()
+            short.answer = "No."
+            short.save()
+            # once committed, along with e.g. the classwork relation
+            self.assertEqual(queued.count(), 4)
+            # still queued
+            short.answer = "No!"
+            short.save()
+        self.assertEqual(queued.count(), 5)
+
+    def test_copied_answers_scored(self):
+        first, second, other, short = self.submissions
+        for submission in self.submissions:
+            analyse_answer(submission)
+
+        info = PlagiarismInfo.objects.get(
+            method=PlagiarismInfo.MethodChoices.ANSWER_SHINGLES
+        )
+        self.assertEqual(
+            (info.submission_agent_id, info.submission_target_id),
+            (first.id, second.id),
+        )
+        self.assertEqual(info.percentage_plagiarized, 100)
+        self.assertEqual(info.percentage_plagiarized_reverse, 100)
+
+        second.answer = " ".join(random_document(60))
+        second.save()
+        analyse_answer(second)
+        self.assertFalse(
+            PlagiarismInfo.objects.filter(
+                method=PlagiarismInfo.MethodChoices.ANSWER_SHINGLES
+            ).exists()
+        )
+
+
+class MatchedSpansTest(TestCase):
+    def test_shared_passages_located(self):
+        passage, short_passage = random_document(30), random_document(SPAN_MIN_LENGTH)
+        document = random_document(100) + passage + random_document(50) + short_passage
+        other = short_passage + random_document(20) + passage + random_document(10)
+
+        self.assertEqual(
+            find_matched_spans(document, other),
+            [(100, 130, 28, 58), (180, 188, 0, 8)],
+        )
+        self.assertEqual(
+            find_matched_spans(document, random_document(SPAN_MIN_LENGTH - 1)), []
+        )
+
+    def test_padding_breaks_passages(self):
+        passage = random_document(40)
+
+        self.assertEqual(
+            find_matched_spans(passage[:20] + [PAD_SYMBOL] + passage[20:], passage),
+            [(0, 20, 0, 20), (21, 41, 20, 40)],
+        )
+
+    def test_prose_located_in_scored_documents(self):
+        isolate_media(self)
+        template, passage = random_document(40), random_document(30)
+        agent, target = create_submission(), create_submission()
+        classwork = Classwork.objects.create(
+            _created_by=agent._created_by, title="t", description=" ".join(template)
+        )
+        for submission in [agent, target]:
+            ClassworkHasSubmission.objects.create(
+                classwork=classwork, submission=submission
+            )
+
+        # the passage follows the template, which mustn't be part of it
+        submit_text(agent, " ".join(random_document(50)))
+        attachment = submit_text(
+            agent, " ".join(random_document(20) + template + passage)
+        )
+        target_attachment = submit_text(
+            target, " ".join(random_document(10) + template + passage)
+        )
+        plagiarism_info = PlagiarismInfo.objects.get(
+            method=PlagiarismInfo.MethodChoices.LANGUAGE_MODEL
+        )
+
+        [span] = get_plagiarism_spans(plagiarism_info)
+        self.assertEqual(
+            (span["agent_attachment"], span["target_attachment"]),
+            (attachment.id, target_attachment.id),
+        )
+        self.assertEqual(span["text"].split(), list(iter_tokens(" ".join(passage))))
+        # offsets in the attachment the passage is in
+        for attachment, start, end in [
+            (attachment, span["start"], span["end"]),
+            (target_attachment, span["target_start"], span["target_end"]),
+        ]:
+            tokens = [
+                token
+                for token in joblib_load(attachment.tokenized_dump)
+                if token != PAD_SYMBOL
+            ]
+            self.assertEqual(tokens[start:end], span["text"].split())
+
+        with mock.patch("apps.plagiarism_detector.spans.find_matched_spans") as find:
+            self.assertEqual(get_plagiarism_spans(plagiarism_info), [span])
+        find.assert_not_called()
+
+    def test_code_located_in_source(self):
+        isolate_media(self)
+        attachments = []
+        for program in [PYTHON_PROGRAM, RENAMED_PYTHON_PROGRAM]:
+            submission = create_submission()
+            attachment = Attachment(mime_type="text/x-python")
+            attachment.attachment.save("stats.py", ContentFile(program.encode()))
+            SubmissionHasAttachment.objects.create(
+                submission=submission, attachment=attachment
+            )
+            analyse_attachment(attachment, submission)
+            attachments.append(attachment)
+
+        spans = get_plagiarism_spans(PlagiarismInfo.objects.get())
+        self.assertTrue(spans)
+        for span in spans:
+            self.assertEqual(
+                (span["agent_attachment"], span["target_attachment"]),
+                (attachments[0].id, attachments[1].id),
+            )
+            # the source, not placeholders
+            self.assertEqual(PYTHON_PROGRAM[span["start"] : span["end"]], span["text"])
+            self.assertNotIn(IDENTIFIER, span["text"])
+            self.assertGreaterEqual(
+                len(get_code_tokens(span["text"], "a.py")), CODE_SPAN_MIN_LENGTH
+            )
+
+        self.assertIn("def mean(values):", spans[0]["text"])
+        self.assertIn(
+            "def avg(xs):",
+            RENAMED_PYTHON_PROGRAM[spans[0]["target_start"] : spans[0]["target_end"]],
+        )
+
+    def test_evicted_dumps_queued_instead_of_rebuilt(self):
+        agent, target = create_submission(), create_submission()
+        for submission in [agent, target]:
+            SubmissionHasAttachment.objects.create(
+                submission=submission,
+                attachment=Attachment.objects.create(attachment="attachments/a.pdf"),
+            )
+        PlagiarismJob.objects.all().delete()
+        Attachment.objects.update(plagiarism_status=JobStatus.DONE)
+        plagiarism_info = PlagiarismInfo.objects.create(
+            submission_agent=agent, submission_target=target
+        )
+
+        with mock.patch("apps.plagiarism_detector.utils.run_in_pool") as run_in_pool:
+            self.assertIsNone(get_plagiarism_spans(plagiarism_info))
+            self.assertIsNone(get_plagiarism_spans(plagiarism_info))
+
+        run_in_pool.assert_not_called()
+        self.assertEqual(PlagiarismJob.objects.count(), 2)
+        self.assertEqual(
+            set(Attachment.objects.values_list("plagiarism_status", flat=True)),
+            {JobStatus.QUEUED},
+        )
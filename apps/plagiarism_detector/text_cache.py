@@ -0,0 +1,117 @@
+"""
+Extracted text cache keyed by the SHA-256 of attachment file contents.
+
+Resubmitted files and PDFs reused across classrooms skip pdfminer/pandoc
+extraction entirely. The cache is bounded by PLAGIARISM_TEXT_CACHE_SIZE bytes,
+least recently used entries being evicted first.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.plagiarism_detector.models import ExtractedText, TextCacheStats
+from configs.definitions import PLAGIARISM_TEXT_CACHE_SIZE
+
+_READ_CHUNK_SIZE = 1024 * 1024
+_EVICTION_BATCH_SIZE = 100
+
+
+def get_file_hash(file_path) -> str:
+    """hex SHA-256 of a file, read in chunks"""
+
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def _increment_stats(**fields):
+    """atomically increments the cache counters"""
+
+    TextCacheStats.objects.get_or_create(id=1)
+    TextCacheStats.objects.filter(id=1).update(
+        **{field: F(field) + value for field, value in fields.items()}
+    )
+
+
+def get_cached_text(file_hash):
+    """cached text of given file hash or None, counting the hit or miss"""
+
+    cached = ExtractedText.objects.filter(sha256=file_hash).first()
+    if cached is None:
+        _increment_stats(misses=1)
+        return None
+
+    ExtractedText.objects.filter(id=cached.id).update(
+        hits=F("hits") + 1, last_used=timezone.now()
+    )
+    _increment_stats(hits=1)
+
+    return cached.text
+
+
+def cache_text(file_hash, text):
+    """stores extracted text of given file hash and evicts over the size budget"""
+
+    try:
+        with transaction.atomic():
+            ExtractedText.objects.create(
+                sha256=file_hash, text=text, size=len(text.encode("utf-8"))
+            )
+    except IntegrityError:
+        # extracted by another worker in the meantime
+        return
+
+    evict_cached_texts()
+
+
+def evict_cached_texts(budget: int = PLAGIARISM_TEXT_CACHE_SIZE) -> int:
+    """deletes least recently used texts until the cache fits the budget"""
+
+    total = ExtractedText.objects.aggregate(total=Sum("size"))["total"] or 0
+    evicted = 0
+
+    while total > budget:
+        batch = list(
+            ExtractedText.objects.order_by("last_used").values_list("id", "size")[
+                :_EVICTION_BATCH_SIZE
+            ]
+        )
+        if not batch:
+            break
+
+        ids = []
+        for text_id, size in batch:
+            if total <= budget:
+                break
+            ids.append(text_id)
+            total -= size
+
+        evicted += ExtractedText.objects.filter(id__in=ids).delete()[0]
+
+    if evicted:
+        _increment_stats(evictions=evicted)
+
+    return evicted
+
+
+def get_cache_stats() -> dict:
+    """counters and current size of the cache, for monitoring"""
+
+    stats, _ = TextCacheStats.objects.get_or_create(id=1)
+    aggregate = ExtractedText.objects.aggregate(total=Sum("size"))
+    lookups = stats.hits + stats.misses
+
+    return dict(
+        entries=ExtractedText.objects.count(),
+        size=aggregate["total"] or 0,
+        budget=PLAGIARISM_TEXT_CACHE_SIZE,
+        hits=stats.hits,
+        misses=stats.misses,
+        evictions=stats.evictions,
+        hit_rate=stats.hits / lookups if lookups else None,
+    )
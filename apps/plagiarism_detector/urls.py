@@ -1,6 +1,14 @@
 from django.urls import path
 
-from apps.plagiarism_detector.api.views import PlagiarismListView
+from apps.plagiarism_detector.api.views import (
+    PlagiarismClassroomClustersView,
+    PlagiarismClassworkClustersView,
+    PlagiarismHeatmapView,
+    PlagiarismListView,
+    PlagiarismPipelineMetricsView,
+    PlagiarismSpansView,
+    PlagiarismTextCacheView,
+)
 
 
 urlpatterns = [
@@ -9,4 +17,34 @@ urlpatterns = [
         PlagiarismListView.as_view(),
         name="list-plagiarism",
     ),
+    path(
+        "plagiarism_id=<int:plagiarism_id>/spans",
+        PlagiarismSpansView.as_view(),
+        name="spans-plagiarism",
+    ),
+    path(
+        "classwork_id=<int:classwork_id>/heatmap",
+        PlagiarismHeatmapView.as_view(),
+        name="heatmap-plagiarism",
+    ),
+    path(
+        "classwork_id=<int:classwork_id>/clusters",
+        PlagiarismClassworkClustersView.as_view(),
+        name="classwork-clusters-plagiarism",
+    ),
+    path(
+        "classroom_id=<int:classroom_id>/clusters",
+        PlagiarismClassroomClustersView.as_view(),
+        name="classroom-clusters-plagiarism",
+    ),
+    path(
+        "text_cache/stats",
+        PlagiarismTextCacheView.as_view(),
+        name="text-cache-stats-plagiarism",
+    ),
+    path(
+        "pipeline/metrics",
+        PlagiarismPipelineMetricsView.as_view(),
+        name="pipeline-metrics-plagiarism",
+    ),
 ]
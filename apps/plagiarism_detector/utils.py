@@ -1,25 +1,81 @@
+import hashlib
+import os
 import re
+from collections import defaultdict
 from random import choice
 from string import ascii_lowercase
 
 import joblib
 import numpy as np
-import plotly.graph_objects as go
 import pypandoc
-from nltk.lm import WittenBellInterpolated
+from django.db.models import Q
 from nltk.tokenize import word_tokenize
-from nltk.util import everygrams, pad_sequence
+from nltk.util import pad_sequence
 from pdfminer.high_level import extract_text
 
 from apps.classroom_contents.models import (
-    ClassworkHasSubmission,
-    Submission,
+    Attachment,
+    ClassworkHasAttachment,
     SubmissionHasAttachment,
 )
-from apps.plagiarism_detector.models import PlagiarismInfo
-from configs.definitions import BASE_DIR, MEDIA_URL
+from apps.classroom_contents.storage import get_blob_hash
+from apps.core.exceptions import NoneExistenceError, UrlParameterError
+from apps.plagiarism_detector.boilerplate import (
+    BOILERPLATE_CODE_K,
+    BOILERPLATE_K,
+    load_boilerplate,
+    store_boilerplate,
+    strip_boilerplate,
+)
+from apps.plagiarism_detector.hashing import PAD_SYMBOL
+from apps.plagiarism_detector.heatmap import invalidate_heatmaps
+from apps.plagiarism_detector.metrics import (
+    StageTimer,
+    get_peak_rss,
+    reset_peak_rss,
+    save_pipeline_metrics,
+)
+from apps.plagiarism_detector.minhash import (
+    get_candidate_submission_ids,
+    index_submission,
+    prune_candidates,
+)
+from apps.plagiarism_detector.models import PlagiarismInfo, SubmissionDocument
+from apps.plagiarism_detector.ngram_model import (
+    CompactNgramModel,
+    NgramCounter,
+    iter_blocks,
+)
+from apps.plagiarism_detector.pool import run_in_pool
+from apps.plagiarism_detector.scores import upsert_plagiarism_infos
+from apps.plagiarism_detector.source_code import (
+    CODE_WINNOW_K,
+    CODE_WINNOW_WINDOW,
+    get_code_tokens,
+    is_source_code,
+    read_source_code,
+)
+from apps.plagiarism_detector.text_cache import (
+    cache_text,
+    get_cached_text,
+    get_file_hash,
+)
+from apps.plagiarism_detector.winnowing import check_fingerprints
+from configs.definitions import (
+    BASE_DIR,
+    MEDIA_URL,
+    PLAGIARISM_CANDIDATE_MIN_CONTAINMENT,
+)
 
 Ngram_N = 10
+DUMPS_DIR = str(BASE_DIR) + "/media/trained_models/"
+TEXT_CHUNK_SIZE = 1024 * 1024  # characters cleaned and tokenized at once
+
+BRACKETS_PATTERN = re.compile(r"\[.*\]|\{.*\}")
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+HTML_PATTERN = re.compile(
+    "<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});|(?:\n|\t|\r|\xa0|\x0c)"
+)
 
 
 def open_file(attachment_path, content_type):
@@ -35,47 +91,212 @@ def open_file(attachment_path, content_type):
     return train_text
 
 
+def open_file_measured(attachment_path, content_type):
+    """open_file run in a pool process, also returning the peak RSS it reached"""
+
+    reset_peak_rss()
+    return open_file(attachment_path, content_type), get_peak_rss()
+
+
+def extract_attachment_text(attachment_path, content_type, timer=None, file_hash=None):
+    """
+    text of an attachment file, extracted only if the same contents weren't before.
+    The file is hashed unless its `file_hash` is known
+    """
+
+    if file_hash is None:
+        file_hash = get_file_hash(attachment_path)
+
+    text = get_cached_text(file_hash)
+    if text is None:
+        text, peak_rss = run_in_pool(open_file_measured, attachment_path, content_type)
+        cache_text(file_hash, text)
+
+        if timer is not None:
+            timer.record_peak_rss(peak_rss)
+
+    return text
+
+
 def clean_text(raw_text):
     """ """
 
-    cleaned_text = re.sub(r"\[.*\]|\{.*\}", "", raw_text)
-    cleaned_text = re.sub(r"[^\w\s]", "", cleaned_text)
+    cleaned_text = BRACKETS_PATTERN.sub("", raw_text)
+    cleaned_text = PUNCTUATION_PATTERN.sub("", cleaned_text)
     return cleaned_text
 
 
 def clean_html(raw_html):
-    cleanr = re.compile(
-        "<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});|(?:\n|\t|\r|\xa0|\x0c)"
-    )
-    cleantext = re.sub(cleanr, "", raw_html)
+    cleantext = HTML_PATTERN.sub("", raw_html)
     return cleantext
 
 
-def create_model(raw_text):
-    train_text = clean_text(raw_text)
-    train_text = clean_html(train_text)
+def iter_text_chunks(text, size=TEXT_CHUNK_SIZE):
+    """
+    pieces of about `size` characters of a text, each ending with a newline
+    except the last, so no cleaning pattern (none matches across a newline) is
+    cut in two
+    """
+
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start + size)
+        end = len(text) if end == -1 else end + 1
+        yield text[start:end]
+        start = end
+
+
+def iter_tokens(raw_text, timer=None):
+    """
+    cleans and tokenizes a text a chunk at a time, yielding the same tokens as
+    `word_tokenize(clean_html(clean_text(raw_text)))` without copying the whole
+    text. Equal tokens are yielded as the same string, so a token list keeps
+    one copy of every distinct word
+    """
+
+    timer = timer or StageTimer()
+    interned = {}
+    carry = ""
+
+    for chunk in iter_text_chunks(raw_text):
+        with timer.stage("cleaning"):
+            cleaned = carry + clean_html(clean_text(chunk))
+
+            # lines are joined without space, so the last word may go on in the
+            # next chunk
+            split = len(cleaned)
+            while split and not cleaned[split - 1].isspace():
+                split -= 1
+            cleaned, carry = cleaned[:split], cleaned[split:]
+
+        with timer.stage("tokenization"):
+            tokens = word_tokenize(cleaned)
+        for token in tokens:
+            yield interned.setdefault(token, token)
+
+    with timer.stage("tokenization"):
+        tokens = word_tokenize(carry) if carry else []
+    for token in tokens:
+        yield interned.setdefault(token, token)
+
+
+def create_model(raw_text, timer=None):
+    timer = timer or StageTimer()
     n = Ngram_N
 
-    training_data = list(
-        pad_sequence(word_tokenize(train_text), n, pad_left=True, left_pad_symbol="<s>")
+    # cleaning and tokenization are timed by iter_tokens. The model is fitted a
+    # block at a time as the text is tokenized, only the token list is kept whole
+    tokens = pad_sequence(
+        iter_tokens(raw_text, timer), n, pad_left=True, left_pad_symbol=PAD_SYMBOL
     )
-    ngrams = list(everygrams(training_data, max_len=n))
-    model = WittenBellInterpolated(n)
-    model.fit([ngrams], vocabulary_text=training_data)
+    training_data = []
+    counter = NgramCounter(n)
+    for block in iter_blocks(tokens):
+        training_data.extend(block)
+        with timer.stage("fit"):
+            counter.update(block)
+
+    with timer.stage("fit"):
+        model = counter.model()
     return training_data, model
 
 
-def calculate_scores(testing_tokenized_data, model):
+def score_per_token(testing_tokenized_data, model) -> np.ndarray:
+    """
+    probability the model gives each token of the testing data, one lookup per
+    token. Kept for pickled nltk models and as the baseline of the benchmark
+    """
+
     n = Ngram_N
+
     scores = []
     for i, item in enumerate(testing_tokenized_data[n - 1 :]):
         s = model.score(item, testing_tokenized_data[i : i + n - 1])
         scores.append(s)
-    scores_np = np.array(scores)
+
+    return np.array(scores)
+
+
+def iter_segments(tokenized_data):
+    """
+    runs of tokens between padding: the parts of a merged document and the
+    passages left around stripped template spans
+    """
+
+    segment = []
+    for token in tokenized_data:
+        if token != PAD_SYMBOL:
+            segment.append(token)
+        elif segment:
+            yield segment
+            segment = []
+
+    if segment:
+        yield segment
+
+
+def calculate_scores(testing_tokenized_data, model):
+    """
+    average probability (in percent) the model gives each token of the testing
+    data after the Ngram_N - 1 tokens before it. Every segment is scored on its
+    own, padded as the parts the model was trained on, so that no n-gram spans
+    two of them
+    """
+
+    padding = [PAD_SYMBOL] * (Ngram_N - 1)
+    segments = [padding + segment for segment in iter_segments(testing_tokenized_data)]
+
+    if isinstance(model, CompactNgramModel):
+        scores = [model.score_sequence(segment, Ngram_N) for segment in segments]
+    else:
+        # pickled nltk models dumped before the compact format
+        scores = [score_per_token(segment, model) for segment in segments]
+    scores_np = np.concatenate(scores + [np.empty(0, dtype=np.float64)])
+
+    if len(scores_np) == 0:  # nothing left e.g. once the template is stripped
+        return 0.0
+
     arr_sum = np.sum(scores_np)
     return (arr_sum / len(scores_np)) * 100
 
 
+def get_url_id_plagiarism_or_raise(id=None):
+    """ """
+
+    try:
+        return PlagiarismInfo.objects.get(id=id)
+
+    except (TypeError, ValueError, OverflowError, PlagiarismInfo.DoesNotExist):
+        raise NoneExistenceError(
+            cause="PlagiarismInfo",
+            status_code=400,
+            message="Non existence",
+            verbose=f"PlagiarismInfo(id={id}) does not exist!",
+        )
+
+
+def get_query_min_score_or_raise(min_score=None):
+    """ """
+
+    if min_score is None:
+        return None
+
+    try:
+        min_score = float(min_score)
+        if 0 <= min_score <= 100:
+            return min_score
+
+    except (TypeError, ValueError, OverflowError):
+        pass
+
+    raise UrlParameterError(
+        cause="min_score in URL",
+        status_code=400,
+        message="URL parameter wrong",
+        verbose="[min_score] must be a number between 0 and 100!",
+    )
+
+
 def random_string() -> str:
     """
     generates random string
@@ -83,42 +304,528 @@ def random_string() -> str:
     return "".join(choice(ascii_lowercase) for i in range(15))
 
 
+def touch_dump(item_location):
+    """marks a dump as used now, its modification time being its last use"""
+
+    try:
+        os.utime(item_location)
+    except OSError:
+        pass
+
+
 def joblib_dump(model):
-    path = str(BASE_DIR) + "/media/trained_models/" + random_string() + ".sav"
+    path = DUMPS_DIR + random_string() + ".sav"
     joblib.dump(model, path)
     return path
 
 
 def joblib_load(item_location):
+    touch_dump(item_location)
     return joblib.load(item_location)
 
 
-def check_plagiarism(attachment_instance, submission):
-    """"""
-    # hello =
+def ngram_model_dump(model):
+    path = DUMPS_DIR + random_string()
+    model.save(path)
+    return path
+
+
+def ngram_model_load(item_location):
+    """
+    loads a memory mapped compact model. Models dumped before the compact format
+    are pickled `WittenBellInterpolated` files which score the same way
+    """
+
+    if os.path.isdir(item_location):
+        touch_dump(item_location)
+        return CompactNgramModel.load(item_location)
+    return joblib_load(item_location)
+
+
+def get_dump_size(item_location) -> int:
+    """bytes taken on disk by a dump, file or directory"""
+
+    if not os.path.isdir(item_location):
+        return os.path.getsize(item_location)
+
+    return sum(entry.stat().st_size for entry in os.scandir(item_location))
 
+
+def check_plagiarism(submission, timer=None):
+    """
+    Incrementally updates the plagiarism scores of a new or resubmitted submission.
+
+    The submission is scored as one document merging all of its attachments and
+    its answer (see `get_submission_documents`), against the documents of the
+    candidates found through the persisted MinHash/LSH signatures and sharing
+    enough of their shingles to be worth a score. Only the submission's own row
+    (its model scoring the candidates) and column (the candidates' models scoring
+    it) are computed, nothing else is rescored.
+
+    Returns
+    ---
+    dict(candidate_count, pruned_count)
+    """
+
+    timer = timer or StageTimer()
     classwork = submission.submission_classwork.get().classwork
 
-    other_submissions_list = ClassworkHasSubmission.objects.filter(classwork=classwork)[
-        :5
-    ]
-    target_submissions = [item.submission for item in other_submissions_list]
+    document = get_submission_documents([submission.id], timer).get(submission.id)
+    if document is None:  # nothing but source code
+        return dict(candidate_count=0, pruned_count=0)
 
-    training_model = joblib_load(attachment_instance.model_dump)
+    with timer.stage("load"):
+        tokenized_data = joblib_load(document.tokenized_dump)
 
-    for target_submission in target_submissions:
-        if not target_submission.attachments:
-            break
+    with timer.stage("boilerplate"):
+        boilerplate = get_classwork_boilerplate(classwork)
+        tokenized_data = strip_boilerplate(tokenized_data, boilerplate)
 
-        attachment = target_submission.submission_attachment.get().attachment
-        tokenized_data = joblib_load(attachment.tokenized_dump)
+    with timer.stage("candidates"):
+        signature = index_submission(submission, classwork, tokenized_data)
+        candidate_ids = get_candidate_submission_ids(signature)
 
-        plagiarism_score = calculate_scores(tokenized_data, training_model)
+        # cheap pre-filter, most LSH candidates share too little to be worth a score
+        scored_ids = prune_candidates(
+            signature, candidate_ids, PLAGIARISM_CANDIDATE_MIN_CONTAINMENT
+        )
 
-        PlagiarismInfo.objects.create(
-            submission_agent=submission,
-            submission_target=target_submission,
-            percentage_plagiarized=plagiarism_score,
+        # pairs which stopped being scored after a resubmission are stale
+        PlagiarismInfo.objects.filter(
+            method=PlagiarismInfo.MethodChoices.LANGUAGE_MODEL
+        ).filter(
+            (Q(submission_agent=submission) & ~Q(submission_target__in=scored_ids))
+            | (Q(submission_target=submission) & ~Q(submission_agent__in=scored_ids))
+        ).delete()
+        invalidate_heatmaps([submission.id])
+
+    with timer.stage("load"):
+        training_model = ngram_model_load(document.model_dump)
+
+    target_documents = get_submission_documents(scored_ids, timer)
+
+    scores = {}
+    for target_id, target_document in target_documents.items():
+        with timer.stage("load"):
+            target_tokenized_data = joblib_load(target_document.tokenized_dump)
+            target_model = ngram_model_load(target_document.model_dump)
+
+        with timer.stage("boilerplate"):
+            target_tokenized_data = strip_boilerplate(
+                target_tokenized_data, boilerplate
+            )
+
+        with timer.stage("scoring"):
+            scores[submission.id, target_id] = calculate_scores(
+                target_tokenized_data, training_model
+            )
+            scores[target_id, submission.id] = calculate_scores(
+                tokenized_data, target_model
+            )
+
+    with timer.stage("scoring"):
+        upsert_plagiarism_infos(scores)
+
+    return dict(
+        candidate_count=len(candidate_ids),
+        pruned_count=len(candidate_ids) - len(scored_ids),
+    )
+
+
+def build_model_dumps(raw_text):
+    """
+    Trains the model of a text and dumps it along with its tokens. Run in the
+    process pool, only the dump paths and tokens are sent back
+
+    Returns
+    ---
+    (tokenized data, tokenized dump path, model dump path, StageTimer of the stages)
+    """
+
+    reset_peak_rss()
+    timer = StageTimer()
+
+    tokenized_data, model = create_model(raw_text, timer)
+    with timer.stage("dump"):
+        tokenized_dump = joblib_dump(tokenized_data)
+        model_dump = ngram_model_dump(model)
+
+    timer.record_peak_rss(get_peak_rss())
+    return tokenized_data, tokenized_dump, model_dump, timer
+
+
+def build_code_dumps(attachment, timer=None):
+    """
+    Lexes a source code attachment and dumps its normalized tokens, source code
+    has no model (see source_code.py)
+
+    Returns
+    ---
+    (tokenized data, tokenized dump path, None)
+    """
+
+    timer = timer or StageTimer()
+
+    with timer.stage("extraction"):
+        text = read_source_code(attachment.attachment.path)
+    with timer.stage("tokenization"):
+        tokenized_data = get_code_tokens(
+            text, attachment.attachment.name, attachment.mime_type
+        )
+    with timer.stage("dump"):
+        tokenized_dump = joblib_dump(tokenized_data)
+
+    return tokenized_data, tokenized_dump, None
+
+
+def _is_source_code(attachment):
+    return is_source_code(attachment.attachment.name, attachment.mime_type)
+
+
+def get_sibling_attachment_ids(attachment, submission) -> list:
+    """
+    ids of the attachments of a submission of the same kind, source code or
+    prose, as the given one, itself included
+    """
+
+    code = _is_source_code(attachment)
+    return [
+        sibling.id
+        for sibling in Attachment.objects.filter(
+            attachment_submission__submission=submission
+        )
+        if _is_source_code(sibling) == code
+    ] or [attachment.id]
+
+
+def iter_document_parts(tokenized_dumps, answer, timer=None):
+    """
+    tokens of every part of a submission's document, its attachments' in order
+    then its answer's, each padded on its own
+    """
+
+    timer = timer or StageTimer()
+
+    for tokenized_dump in tokenized_dumps:
+        with timer.stage("load"):
+            tokens = joblib_load(tokenized_dump)
+        yield tokens
+
+    if answer.strip():
+        yield list(
+            pad_sequence(
+                iter_tokens(answer, timer),
+                Ngram_N,
+                pad_left=True,
+                left_pad_symbol=PAD_SYMBOL,
+            )
+        )
+
+
+def build_document_dumps(tokenized_dumps, answer):
+    """
+    Trains the model of the merged attachments and answer of a submission and
+    dumps it along with the merged tokens, every part padded on its own so no
+    n-gram spans two of them. Run in the process pool
+
+    Returns
+    ---
+    (tokenized dump path, model dump path, StageTimer of the stages)
+    """
+
+    reset_peak_rss()
+    timer = StageTimer()
+
+    interned = {}
+    training_data = []
+
+    for part in iter_document_parts(tokenized_dumps, answer, timer):
+        training_data.extend(interned.setdefault(token, token) for token in part)
+
+    with timer.stage("fit"):
+        model = CompactNgramModel.fit(training_data, Ngram_N)
+    with timer.stage("dump"):
+        tokenized_dump = joblib_dump(training_data)
+        model_dump = ngram_model_dump(model)
+
+    timer.record_peak_rss(get_peak_rss())
+    return tokenized_dump, model_dump, timer
+
+
+def _get_document_sources(attachments, answer) -> str:
+    sources = [attachment.tokenized_dump for attachment in attachments] + [answer]
+    return hashlib.sha256("\n".join(sources).encode("utf-8")).hexdigest()
+
+
+def get_submission_documents(submission_ids, timer=None) -> dict:
+    """
+    The documents of given submissions having analysed prose attachments, the
+    merged tokens and model of all of their attachments and answer. Built once,
+    when missing or stale, and reused by every comparison. A submission with a
+    single attachment and no answer uses the attachment's dumps as they are
+
+    Returns
+    ---
+    {submission id: SubmissionDocument}
+    """
+
+    timer = timer or StageTimer()
+
+    relations = (
+        SubmissionHasAttachment.objects.filter(
+            get_analysed_filter(), submission__in=submission_ids
+        )
+        .select_related("attachment", "submission")
+        .order_by("attachment")
+    )
+
+    attachments = defaultdict(list)
+    submissions = {}
+    for relation in relations:
+        if _is_source_code(relation.attachment):  # fingerprinted, has no model
+            continue
+        attachments[relation.submission_id].append(relation.attachment)
+        submissions[relation.submission_id] = relation.submission
+
+    documents = {
+        document.submission_id: document
+        for document in SubmissionDocument.objects.filter(
+            submission__in=attachments.keys()
+        )
+    }
+
+    for submission_id, submission_attachments in attachments.items():
+        with timer.stage("load"):
+            for attachment in submission_attachments:
+                get_attachment_dumps(attachment)
+
+        answer = submissions[submission_id].answer
+        sources = _get_document_sources(submission_attachments, answer)
+        document = documents.get(submission_id)
+        if document is not None and document.sources == sources:
+            continue
+
+        if len(submission_attachments) == 1 and not answer.strip():
+            dumps = (
+                submission_attachments[0].tokenized_dump,
+                submission_attachments[0].model_dump,
+            )
+        else:
+            *dumps, pool_timer = run_in_pool(
+                build_document_dumps,
+                [attachment.tokenized_dump for attachment in submission_attachments],
+                answer,
+            )
+            timer.update(pool_timer.timings)
+            timer.record_peak_rss(pool_timer.peak_rss)
+
+        documents[submission_id], _ = SubmissionDocument.objects.update_or_create(
+            submission_id=submission_id,
+            defaults=dict(
+                sources=sources, tokenized_dump=dumps[0], model_dump=dumps[1]
+            ),
+        )
+
+    return documents
+
+
+def get_shared_dumps(attachment):
+    """
+    (tokenized dump path, model dump path) of another analysed attachment stored
+    as the same blob, None if there is none
+    """
+
+    if get_blob_hash(attachment.attachment.name) is None:
+        return None
+
+    shared = Attachment.objects.filter(
+        attachment=attachment.attachment.name, tokenized_dump__isnull=False
+    ).exclude(id=attachment.id)
+    if not _is_source_code(attachment):
+        shared = shared.filter(model_dump__isnull=False)
+
+    return shared.values_list("tokenized_dump", "model_dump").first()
+
+
+def get_classwork_boilerplate(classwork):
+    """
+    ignore set of a classwork's template (see boilerplate.py), built from its
+    title, description and attachments on first use
+    """
+
+    boilerplate = load_boilerplate(classwork)
+    if boilerplate is not None:
+        return boilerplate
+
+    documents = [list(iter_tokens(f"{classwork.title} {classwork.description}"))]
+    code_documents = []
+
+    relations = ClassworkHasAttachment.objects.filter(
+        classwork=classwork
+    ).select_related("attachment")
+    for relation in relations:
+        attachment = relation.attachment
+        try:
+            if _is_source_code(attachment):
+                code_documents.append(
+                    get_code_tokens(
+                        read_source_code(attachment.attachment.path),
+                        attachment.attachment.name,
+                        attachment.mime_type,
+                    )
+                )
+            else:
+                text = extract_attachment_text(
+                    attachment.attachment.path,
+                    attachment.mime_type,
+                    file_hash=get_blob_hash(attachment.attachment.name),
+                )
+                documents.append(list(iter_tokens(text)))
+        except Exception:  # an unreadable template mustn't fail every submission
+            continue
+
+    return store_boilerplate(classwork, documents, code_documents)
+
+
+def strip_attachment_boilerplate(attachment, tokenized_data, boilerplate):
+    """tokens of an attachment not covered by its classwork's template"""
+
+    k = BOILERPLATE_CODE_K if _is_source_code(attachment) else BOILERPLATE_K
+    return strip_boilerplate(tokenized_data, boilerplate, k)
+
+
+def get_analysed_filter(prefix="attachment__"):
+    """
+    filter of analysed attachments, also those whose dumps were evicted by the
+    dump budget (see dumps.py)
+    """
+
+    return Q(**{f"{prefix}tokenized_dump__isnull": False}) | Q(
+        **{f"{prefix}plagiarism_status": Attachment.PlagiarismStatusChoices.DONE}
+    )
+
+
+def has_attachment_dumps(attachment) -> bool:
+    """whether the dumps of an attachment are built and weren't evicted"""
+
+    return bool(
+        attachment.tokenized_dump
+        and (attachment.model_dump or _is_source_code(attachment))
+    )
+
+
+def get_attachment_dumps(attachment):
+    """
+    (tokenized dump path, model dump path) of an analysed attachment. Dumps
+    evicted by the dump budget are rebuilt from the attachment's (cached) text,
+    which runs the pipeline in this process: requests queue a job instead
+    """
+
+    if has_attachment_dumps(attachment):
+        return attachment.tokenized_dump, attachment.model_dump
+
+    dumps = get_shared_dumps(attachment)
+    if dumps is None and _is_source_code(attachment):
+        dumps = build_code_dumps(attachment)[1:]
+    elif dumps is None:
+        text = extract_attachment_text(
+            attachment.attachment.path,
+            attachment.mime_type,
+            file_hash=get_blob_hash(attachment.attachment.name),
         )
+        _, tokenized_dump, model_dump, _ = run_in_pool(build_model_dumps, text)
+        dumps = (tokenized_dump, model_dump)
+
+    attachment.tokenized_dump, attachment.model_dump = dumps
+    Attachment.objects.filter(id=attachment.id).update(
+        tokenized_dump=attachment.tokenized_dump, model_dump=attachment.model_dump
+    )
+
+    return dumps
+
+
+def analyse_attachment(attachment, submission):
+    """
+    Runs the full plagiarism pipeline for an attachment of given submission i.e.
+    text extraction, model training, dumping and scoring against other submissions.
+    Source code is only lexed and fingerprinted. The submission is scored as a
+    whole, along with its other attachments and answer. Attachments stored as the
+    same blob as an analysed one reuse its dumps. The time taken by every stage is
+    stored as the attachment's PipelineMetrics, also when a stage fails
+    """
 
-    return
+    timer = StageTimer()
+    metrics = dict()
+    succeeded = False
+
+    try:
+        path = attachment.attachment.path
+        metrics["file_size"] = os.path.getsize(path)
+        code = _is_source_code(attachment)
+
+        relation = submission.submission_classwork.first()
+        boilerplate = None
+        if relation is not None:
+            with timer.stage("boilerplate"):
+                boilerplate = get_classwork_boilerplate(relation.classwork)
+
+        shared = get_shared_dumps(attachment)
+        if shared is not None:
+            tokenized_dump, model_dump = shared
+            with timer.stage("load"):
+                tokenized_data = joblib_load(tokenized_dump)
+
+        elif code:
+            tokenized_data, tokenized_dump, model_dump = build_code_dumps(
+                attachment, timer
+            )
+
+        else:
+            with timer.stage("extraction"):
+                text = extract_attachment_text(
+                    path,
+                    attachment.mime_type,
+                    timer,
+                    file_hash=get_blob_hash(attachment.attachment.name),
+                )
+
+            tokenized_data, tokenized_dump, model_dump, pool_timer = run_in_pool(
+                build_model_dumps, text
+            )
+            timer.update(pool_timer.timings)
+            timer.record_peak_rss(pool_timer.peak_rss)
+
+        metrics["token_count"] = len(tokenized_data)
+        metrics["model_size"] = get_dump_size(model_dump) if model_dump else 0
+
+        attachment.tokenized_dump = tokenized_dump
+        attachment.model_dump = model_dump
+        attachment.save(update_fields=["tokenized_dump", "model_dump"])
+
+        if code:
+            with timer.stage("fingerprints"):
+                check_fingerprints(
+                    attachment,
+                    submission,
+                    tokenized_data,
+                    k=CODE_WINNOW_K,
+                    window=CODE_WINNOW_WINDOW,
+                    method=PlagiarismInfo.MethodChoices.CODE_FINGERPRINTS,
+                    boilerplate=boilerplate,
+                    attachment_ids=get_sibling_attachment_ids(attachment, submission),
+                )
+        else:
+            metrics.update(check_plagiarism(submission, timer))
+            with timer.stage("fingerprints"):
+                check_fingerprints(
+                    attachment,
+                    submission,
+                    tokenized_data,
+                    boilerplate=boilerplate,
+                    attachment_ids=get_sibling_attachment_ids(attachment, submission),
+                )
+
+        succeeded = True
+
+    finally:
+        save_pipeline_metrics(attachment, timer, succeeded, **metrics)
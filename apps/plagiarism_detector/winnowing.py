@@ -0,0 +1,208 @@
+"""
+MOSS style winnowing fingerprints.
+
+Hashed word k-grams of a document are winnowed (the minimum hash of every window
+is kept) and stored as postings in an indexed table. A new document is checked
+against every past submission of every classroom with one `IN` query over its
+own fingerprints, without touching any earlier file. The containment of both
+documents of a pair is counted from the postings, so a pair is scored the same
+whichever was uploaded first.
+"""
+import numpy as np
+from django.db.models import Count
+from numpy.lib.stride_tricks import sliding_window_view
+
+from apps.classroom_contents.models import Attachment
+from apps.plagiarism_detector.hashing import PAD_SYMBOL, hash_ngrams, hash_tokens
+from apps.plagiarism_detector.models import Fingerprint, PlagiarismInfo
+from apps.plagiarism_detector.scores import (
+    clear_plagiarism_scores,
+    upsert_plagiarism_infos,
+)
+from apps.plagiarism_detector.source_code import is_source_code
+
+WINNOW_K = 5  # words per hashed k-gram
+WINNOW_WINDOW = 4  # guarantees any match of WINNOW_K + WINNOW_WINDOW - 1 words
+WINNOW_REPORT_THRESHOLD = 10  # percentage of shared fingerprints worth reporting
+BULK_BATCH_SIZE = 1000
+
+
+def winnow(hashes: np.ndarray, window: int = WINNOW_WINDOW):
+    """
+    Robust winnowing i.e. the rightmost minimum hash of every window, each
+    selected position recorded once
+
+    Returns
+    ---
+    (fingerprints, token positions) arrays
+    """
+
+    if len(hashes) == 0:
+        return hashes, np.empty(0, dtype=np.int64)
+
+    if len(hashes) < window:
+        window = len(hashes)
+
+    windows = sliding_window_view(hashes, window)
+    rightmost_min = window - 1 - np.argmin(windows[:, ::-1], axis=1)
+    positions = np.unique(np.arange(len(windows)) + rightmost_min)
+
+    return hashes[positions], positions
+
+
+def get_fingerprints(tokenized_data, k=WINNOW_K, window=WINNOW_WINDOW):
+    """winnowed fingerprints of a tokenized document as signed 64 bit ints"""
+
+    tokens = [token for token in tokenized_data if token != PAD_SYMBOL]
+    kgram_hashes = hash_ngrams(hash_tokens(tokens), k).view(np.int64)
+
+    return winnow(kgram_hashes, window)
+
+
+def index_attachment(attachment, submission, fingerprints, positions):
+    """replaces the fingerprint postings of an attachment"""
+
+    Fingerprint.objects.filter(attachment=attachment).delete()
+
+    # a posting per distinct fingerprint, pointing at its first occurrence
+    fingerprints, first_index = np.unique(fingerprints, return_index=True)
+    Fingerprint.objects.bulk_create(
+        [
+            Fingerprint(
+                fingerprint=int(fingerprint),
+                position=int(position),
+                attachment=attachment,
+                submission=submission,
+            )
+            for fingerprint, position in zip(fingerprints, positions[first_index])
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+
+def get_fingerprint_counts(submission_ids, code=False) -> dict:
+    """
+    number of distinct fingerprints of the source code or prose attachments of
+    every given submission
+    """
+
+    attachments = (
+        Attachment.objects.filter(attachment_fingerprint__submission__in=submission_ids)
+        .distinct()
+        .only("attachment", "mime_type")
+    )
+    attachment_ids = [
+        attachment.id
+        for attachment in attachments
+        if is_source_code(attachment.attachment.name, attachment.mime_type) == code
+    ]
+
+    counts = (
+        Fingerprint.objects.filter(
+            submission__in=submission_ids, attachment__in=attachment_ids
+        )
+        .values("submission")
+        .annotate(count=Count("fingerprint", distinct=True))
+    )
+    return {count["submission"]: count["count"] for count in counts}
+
+
+def search_fingerprints(fingerprints, exclude_submission=None, code=False):
+    """
+    Submissions of any classroom sharing fingerprints with a document, given
+    whether it is source code
+
+    Returns
+    ---
+    list of (submission id, percentage of the document's fingerprints shared,
+    percentage of the submission's fingerprints shared), most similar first
+    """
+
+    fingerprints = [int(fingerprint) for fingerprint in np.unique(fingerprints)]
+    if not fingerprints:
+        return []
+
+    matches = list(
+        Fingerprint.objects.filter(fingerprint__in=fingerprints)
+        .exclude(submission=exclude_submission)
+        .values("submission")
+        .annotate(shared=Count("fingerprint", distinct=True))
+        .order_by("-shared")
+    )
+    counts = get_fingerprint_counts(
+        [match["submission"] for match in matches], code=code
+    )
+
+    results = []
+    for match in matches:
+        shared = match["shared"]
+        # a submission holds at least the fingerprints it shares
+        count = max(counts.get(match["submission"], 0), shared)
+        results.append(
+            (
+                match["submission"],
+                shared / len(fingerprints) * 100,
+                shared / count * 100,
+            )
+        )
+
+    return results
+
+
+def check_fingerprints(
+    attachment,
+    submission,
+    tokenized_data,
+    k=WINNOW_K,
+    window=WINNOW_WINDOW,
+    method=PlagiarismInfo.MethodChoices.WINNOWING,
+    boilerplate=None,
+    attachment_ids=None,
+):
+    """
+    Indexes an attachment's fingerprints and records submissions of any classroom
+    sharing at least WINNOW_REPORT_THRESHOLD percent of either document's
+    fingerprints, scored both ways with given method. Source code (see
+    source_code.py) is winnowed over longer k-grams of normalized tokens, which
+    don't collide with the word k-grams of prose.
+    Fingerprints in `boilerplate`, the ignore set of the classwork's template (see
+    boilerplate.py), are left out. The submission is searched with the merged
+    fingerprints of `attachment_ids`, its analysed attachments of the same kind.
+    Earlier pairs of the submission by the method which no longer match are
+    deleted, a direction below the threshold is cleared
+    """
+
+    fingerprints, positions = get_fingerprints(tokenized_data, k, window)
+    if boilerplate is not None:
+        kept = ~np.isin(fingerprints.view(np.uint64), boilerplate)
+        fingerprints, positions = fingerprints[kept], positions[kept]
+    index_attachment(attachment, submission, fingerprints, positions)
+
+    if attachment_ids:
+        fingerprints = list(
+            Fingerprint.objects.filter(attachment__in=attachment_ids).values_list(
+                "fingerprint", flat=True
+            )
+        )
+    matches = search_fingerprints(
+        fingerprints,
+        exclude_submission=submission,
+        code=method == PlagiarismInfo.MethodChoices.CODE_FINGERPRINTS,
+    )
+
+    def reported(percentage):
+        return percentage if percentage >= WINNOW_REPORT_THRESHOLD else None
+
+    scores, matched_ids = {}, []
+    for submission_id, percentage, reverse in matches:
+        if max(percentage, reverse) < WINNOW_REPORT_THRESHOLD:
+            continue
+        matched_ids.append(submission_id)
+        scores[(submission.id, submission_id)] = reported(percentage)
+        scores[(submission_id, submission.id)] = reported(reverse)
+
+    # pairs no longer matching e.g. since the submission was resubmitted, both
+    # directions depend on its fingerprints
+    clear_plagiarism_scores(submission.id, matched_ids, method, reverse=True)
+
+    upsert_plagiarism_infos(scores, method=method)
@@ -5,6 +5,19 @@ from .settings.settings import (
     TIME_ZONE,
     MEDIA_URL,
     MEDIA_ROOT,
+    PLAGIARISM_CANDIDATE_MIN_CONTAINMENT,
+    PLAGIARISM_CLUSTER_THRESHOLD,
+    PLAGIARISM_DUMP_BUDGET,
+    PLAGIARISM_DUMP_GRACE_PERIOD,
+    PLAGIARISM_JOB_BACKOFF,
+    PLAGIARISM_JOB_MAX_ATTEMPTS,
+    PLAGIARISM_JOB_TIMEOUT,
+    PLAGIARISM_TASK_MEMORY_LIMIT,
+    PLAGIARISM_TASK_TIMEOUT,
+    PLAGIARISM_TEXT_CACHE_SIZE,
+    PLAGIARISM_TFIDF_MIN_SCORE,
+    PLAGIARISM_WORKER_POLL_INTERVAL,
+    PLAGIARISM_WORKER_PROCESSES,
 )
 
 DEVELOPMENT = True
@@ -218,3 +218,22 @@ SPECTACULAR_SETTINGS = {
     "DESCRIPTION": "Backend for Scholarr Mobile",
     # OTHER SETTINGS
 }
+
+# Plagiarism Detector
+# processes extracting text and building models, also the number of concurrent jobs
+PLAGIARISM_WORKER_PROCESSES = int(
+    os.environ.get("PLAGIARISM_WORKER_PROCESSES", os.cpu_count() or 1)
+)
+PLAGIARISM_WORKER_POLL_INTERVAL = 5  # seconds between polls of an empty queue
+PLAGIARISM_JOB_MAX_ATTEMPTS = 5
+PLAGIARISM_JOB_BACKOFF = 30  # seconds, doubled on every retry
+PLAGIARISM_JOB_TIMEOUT = 60 * 10  # requeued after this long without a heartbeat
+PLAGIARISM_TASK_TIMEOUT = 60 * 2  # seconds per extraction/model building task
+PLAGIARISM_TASK_MEMORY_LIMIT = 2 * 1024 * 1024 * 1024  # bytes per pool process
+PLAGIARISM_TEXT_CACHE_SIZE = 512 * 1024 * 1024  # bytes of extracted text to keep
+# candidates sharing less than this estimated share of the smaller document aren't scored
+PLAGIARISM_CANDIDATE_MIN_CONTAINMENT = 0.1
+PLAGIARISM_DUMP_BUDGET = 10 * 1024 * 1024 * 1024  # bytes of media/trained_models
+PLAGIARISM_DUMP_GRACE_PERIOD = 60 * 60  # seconds, newer dumps are never collected
+PLAGIARISM_CLUSTER_THRESHOLD = 50  # percentage linking two submissions into a cluster
+PLAGIARISM_TFIDF_MIN_SCORE = 20  # percentage, less similar TF-IDF pairs aren't stored